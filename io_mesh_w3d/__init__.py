@@ -87,15 +87,35 @@ class ExportW3D(bpy.types.Operator, ExportHelper, ReportHelper):
         name='Compression',
         items=(('U', 'Uncompressed', 'This will not compress the animations'),
                ('TC', 'TimeCoded', 'This will export the animation with keyframes'),
-               # ('AD', 'AdaptiveDelta',
-               # 'This will use adaptive delta compression to reduce size'),
+               ('AD', 'AdaptiveDelta', 'This will use adaptive delta compression to reduce size'),
+               ('AUTO', 'Automatic', 'This will use the smallest encoding within the max error for each channel'),
                ),
         description='The method used for compressing the animation data',
         default='U')
 
+    animation_max_error: FloatProperty(
+        name='Max error',
+        description='The max deviation of compressed animation values, timecoded keyframes are only removed and '
+                    'adaptive delta channels only used within this limit. Use 0 for a lossless timecoded export',
+        default=0.01,
+        min=0.0,
+        precision=4)
+
     force_vertex_materials: BoolProperty(
         name='Force Vertex Materials', description='Export all materials as Vertex Materials only', default=False)
 
+    exact_bounding_spheres: BoolProperty(
+        name='Exact bounding spheres',
+        description='Calculate the minimal bounding sphere of each mesh instead of an approximation, '
+                    'which is slower but results in better culling',
+        default=False)
+
+    create_aabbtrees: BoolProperty(
+        name='Create AABB trees',
+        description='Create an axis aligned bounding box tree for each rigid mesh, which is used by the engine '
+                    'to speed up ray tests (collision and picking) against the mesh triangles',
+        default=False)
+
     individual_files: BoolProperty(
         name='Individual files',
         description='Creates an individual file for each mesh, boundingbox and the hierarchy',
@@ -137,9 +157,12 @@ class ExportW3D(bpy.types.Operator, ExportHelper, ReportHelper):
 
         export_settings = {'mode': self.export_mode,
                            'compression': self.animation_compression,
+                           'animation_max_error': self.animation_max_error,
                            'use_existing_skeleton': self.use_existing_skeleton,
                            'individual_files': self.individual_files,
-                           'create_texture_xmls': self.create_texture_xmls}
+                           'create_texture_xmls': self.create_texture_xmls,
+                           'exact_bounding_spheres': self.exact_bounding_spheres,
+                           'create_aabbtrees': self.create_aabbtrees}
 
         return save_data(self, export_settings)
 
@@ -156,6 +179,10 @@ class ExportW3D(bpy.types.Operator, ExportHelper, ReportHelper):
         if self.file_format == 'W3D' and 'M' in self.export_mode:
             self.draw_force_vertex_materials()
 
+        if 'M' in self.export_mode:
+            self.draw_exact_bounding_spheres()
+            self.draw_create_aabbtrees()
+
         if (self.export_mode == 'A' or self.export_mode == 'HAM') \
                 and not self.file_format == 'W3X':
             self.draw_animation_settings()
@@ -173,11 +200,21 @@ class ExportW3D(bpy.types.Operator, ExportHelper, ReportHelper):
     def draw_animation_settings(self):
         col = self.layout.box().column()
         col.prop(self, 'animation_compression')
+        if self.animation_compression in ['TC', 'AD', 'AUTO']:
+            col.prop(self, 'animation_max_error')
 
     def draw_force_vertex_materials(self):
         col = self.layout.box().column()
         col.prop(self, 'force_vertex_materials')
 
+    def draw_exact_bounding_spheres(self):
+        col = self.layout.box().column()
+        col.prop(self, 'exact_bounding_spheres')
+
+    def draw_create_aabbtrees(self):
+        col = self.layout.box().column()
+        col.prop(self, 'create_aabbtrees')
+
     def draw_individual_files(self):
         col = self.layout.box().column()
         col.prop(self, 'individual_files')
@@ -27,31 +27,29 @@ class ExportBoneVolumeData(bpy.types.Operator, ExportHelper, ReportHelper):
 def export_bone_volume_data(context, filepath):
     context.info(f'exporting bone volume data to xml: {filepath}')
 
-    root = create_named_root('BoneVolumes')
+    with writing_root(open_named_root(filepath, 'BoneVolumes')) as root:
+        for mesh in get_objects('MESH'):
+            if not mesh.data.object_type == 'BONE_VOLUME':
+                continue
+
+            node = create_node(root, 'BoneVolume')
+            node.set('BoneName', mesh.name)
+            node.set('ContactTag', mesh.data.contact_tag)
+            node.set('Mass', format_str(mesh.data.mass))
+            node.set('Spinniness', format_str(mesh.data.spinniness))
+
+            location, rotation, scale = mesh.matrix_world.decompose()
+            extend = get_aa_box(mesh.data.vertices)
+            halfX = extend.x * scale.x * 0.5
+            halfY = extend.y * scale.y * 0.5
+            halfZ = extend.z * scale.z * 0.5
+
+            box = create_node(node, 'Box')
+            box.set('HalfSizeX', format_str(halfX))
+            box.set('HalfSizeY', format_str(halfY))
+            box.set('HalfSizeZ', format_str(halfZ))
+
+            create_vector(location, box, 'Translation')
+            create_quaternion(rotation, box, 'Rotation')
 
-    for mesh in get_objects('MESH'):
-        if not mesh.data.object_type == 'BONE_VOLUME':
-            continue
-
-        node = create_node(root, 'BoneVolume')
-        node.set('BoneName', mesh.name)
-        node.set('ContactTag', mesh.data.contact_tag)
-        node.set('Mass', format_str(mesh.data.mass))
-        node.set('Spinniness', format_str(mesh.data.spinniness))
-
-        location, rotation, scale = mesh.matrix_world.decompose()
-        extend = get_aa_box(mesh.data.vertices)
-        halfX = extend.x * scale.x * 0.5
-        halfY = extend.y * scale.y * 0.5
-        halfZ = extend.z * scale.z * 0.5
-
-        box = create_node(node, 'Box')
-        box.set('HalfSizeX', format_str(halfX))
-        box.set('HalfSizeY', format_str(halfY))
-        box.set('HalfSizeZ', format_str(halfZ))
-
-        create_vector(location, box, 'Translation')
-        create_quaternion(rotation, box, 'Rotation')
-
-    write(root, filepath)
     context.info('exporting bone volume data finished')
@@ -120,11 +120,9 @@ class AnimationChannel:
             result.type = CHANNEL_Q
 
         if xml_channel.tag == 'ChannelScalar':
-            for value in xml_channel:
-                result.data.append(parse_float_value(value))
+            result.data = parse_values(xml_channel, 'Frame')
         else:
-            for value in xml_channel:
-                result.data.append(parse_quaternion(value))
+            result.data = parse_quaternions(xml_channel, 'Frame')
 
         result.last_frame = result.first_frame + len(result.data) - 1
         return result
@@ -146,11 +144,9 @@ class AnimationChannel:
         channel.set('FirstFrame', str(self.first_frame))
 
         if self.type < CHANNEL_Q:
-            for value in self.data:
-                create_value(value, channel, 'Frame')
+            create_values(channel, self.data, 'Frame')
         else:
-            for value in self.data:
-                create_quaternion(value, channel, 'Frame')
+            create_vectors(channel, self.data, 'Frame', QUATERNION)
 
 
 W3D_CHUNK_ANIMATION_BIT_CHANNEL = 0x00000203
@@ -215,8 +211,7 @@ class AnimationBitChannel:
             type=0,
             default=True)
 
-        for value in xml_bit_channel:
-            result.data.append(parse_float_value(value))
+        result.data = parse_values(xml_bit_channel, 'Frame')
 
         result.last_frame = result.first_frame + len(result.data) - 1
         return result
@@ -228,8 +223,7 @@ class AnimationBitChannel:
         channel.set('Pivot', str(self.pivot))
         channel.set('FirstFrame', str(self.first_frame))
 
-        for value in self.data:
-            create_value(value, channel, 'Frame')
+        create_values(channel, [float(value) for value in self.data], 'Frame')
 
 
 W3D_CHUNK_ANIMATION = 0x00000200
@@ -213,12 +213,12 @@ class Mesh:
             (chunk_type, chunk_size, subchunk_end) = read_chunk_head(io_stream)
 
             if chunk_type == W3D_CHUNK_VERTICES:
-                result.verts = read_list(io_stream, subchunk_end, read_vector)
+                result.verts = VectorArray.read(io_stream, subchunk_end)
             elif chunk_type == W3D_CHUNK_VERTICES_2:
                 context.info('-> vertices 2 chunk is not supported')
                 io_stream.seek(chunk_size, 1)
             elif chunk_type == W3D_CHUNK_VERTEX_NORMALS:
-                result.normals = read_list(io_stream, subchunk_end, read_vector)
+                result.normals = VectorArray.read(io_stream, subchunk_end)
             elif chunk_type == W3D_CHUNK_NORMALS_2:
                 context.info('-> normals 2 chunk is not supported')
                 io_stream.seek(chunk_size, 1)
@@ -229,9 +229,9 @@ class Mesh:
             elif chunk_type == W3D_CHUNK_MESH_HEADER:
                 result.header = MeshHeader.read(io_stream)
             elif chunk_type == W3D_CHUNK_TRIANGLES:
-                result.triangles = read_list(io_stream, subchunk_end, Triangle.read)
+                result.triangles = TriangleArray.read(io_stream, subchunk_end)
             elif chunk_type == W3D_CHUNK_VERTEX_SHADE_INDICES:
-                result.shade_ids = read_list(io_stream, subchunk_end, read_long)
+                result.shade_ids = read_long_array(io_stream, subchunk_end)
             elif chunk_type == W3D_CHUNK_MATERIAL_INFO:
                 result.mat_info = MaterialInfo.read(io_stream)
             elif chunk_type == W3D_CHUNK_SHADERS:
@@ -284,7 +284,7 @@ class Mesh:
             size += vec_list_size(self.normals_2)
         size += vec_list_size(self.tangents)
         size += vec_list_size(self.bitangents)
-        size += list_size(self.triangles)
+        size += data_list_size(self.triangles, True, Triangle.size())
         size += list_size(self.vert_infs)
         size += list_size(self.shaders)
         size += list_size(self.textures)
@@ -318,29 +318,29 @@ class Mesh:
             write_string(self.user_text, io_stream)
 
         write_chunk_head(W3D_CHUNK_VERTICES, io_stream, vec_list_size(self.verts, False))
-        write_list(self.verts, io_stream, write_vector)
+        write_vectors(self.verts, io_stream)
 
         if self.multi_bone_skinned and self.verts_2:
             write_chunk_head(W3D_CHUNK_VERTICES_2, io_stream, vec_list_size(self.verts_2, False))
-            write_list(self.verts_2, io_stream, write_vector)
+            write_vectors(self.verts_2, io_stream)
 
         write_chunk_head(W3D_CHUNK_VERTEX_NORMALS, io_stream, vec_list_size(self.normals, False))
-        write_list(self.normals, io_stream, write_vector)
+        write_vectors(self.normals, io_stream)
 
         if self.multi_bone_skinned and self.normals_2:
             write_chunk_head(W3D_CHUNK_NORMALS_2, io_stream, vec_list_size(self.normals_2, False))
-            write_list(self.normals_2, io_stream, write_vector)
+            write_vectors(self.normals_2, io_stream)
 
         if self.tangents:
             write_chunk_head(W3D_CHUNK_TANGENTS, io_stream, vec_list_size(self.tangents, False))
-            write_list(self.tangents, io_stream, write_vector)
+            write_vectors(self.tangents, io_stream)
 
         if self.bitangents:
             write_chunk_head(W3D_CHUNK_BITANGENTS, io_stream, vec_list_size(self.bitangents, False))
-            write_list(self.bitangents, io_stream, write_vector)
+            write_vectors(self.bitangents, io_stream)
 
-        write_chunk_head(W3D_CHUNK_TRIANGLES, io_stream, list_size(self.triangles, False))
-        write_list(self.triangles, io_stream, Triangle.write)
+        write_chunk_head(W3D_CHUNK_TRIANGLES, io_stream, data_list_size(self.triangles, False, Triangle.size()))
+        write_triangles(self.triangles, io_stream)
 
         if self.vert_infs:
             write_chunk_head(W3D_CHUNK_VERTEX_INFLUENCES, io_stream, list_size(self.vert_infs, False))
@@ -438,24 +438,24 @@ class Mesh:
             elif child.tag == 'Vertices':
                 if not result.verts:
                     result.header.vert_channel_flags |= VERTEX_CHANNEL_LOCATION
-                    result.verts = parse_objects(child, 'V', parse_vector)
+                    result.verts = VectorArray(3, parse_float_array(child, 'V'))
                     result.header.vert_count = len(result.verts)
                 else:
                     context.info('secondary vertices are not supported')
             elif child.tag == 'Normals':
                 if not result.normals:
                     result.header.vert_channel_flags |= VERTEX_CHANNEL_NORMAL
-                    result.normals = parse_objects(child, 'N', parse_vector)
+                    result.normals = VectorArray(3, parse_float_array(child, 'N'))
                 else:
                     context.info('secondary normals are not supported')
             elif child.tag == 'Tangents':
                 result.header.vert_channel_flags |= VERTEX_CHANNEL_TANGENT
-                result.tangents = parse_objects(child, 'T', parse_vector)
+                result.tangents = VectorArray(3, parse_float_array(child, 'T'))
             elif child.tag == 'Binormals':
                 result.header.vert_channel_flags |= VERTEX_CHANNEL_BITANGENT
-                result.bitangents = parse_objects(child, 'B', parse_vector)
+                result.bitangents = VectorArray(3, parse_float_array(child, 'B'))
             elif child.tag == 'Triangles':
-                result.triangles = parse_objects(child, 'T', Triangle.parse)
+                result.triangles = TriangleArray.from_triangles(parse_objects(child, 'T', Triangle.parse))
                 result.header.face_count = len(result.triangles)
             elif child.tag == 'VertexColors':
                 mat_pass = result.get_material_pass()
@@ -463,7 +463,7 @@ class Mesh:
             elif child.tag == 'TexCoords':
                 mat_pass = result.get_material_pass()
                 if not mat_pass.tx_coords:
-                    mat_pass.tx_coords = parse_objects(child, 'T', parse_vector2)
+                    mat_pass.tx_coords = parse_vectors(child, 'T', VECTOR2)
                 else:
                     context.warning('multiple uv coords are not yet supported!')
             elif child.tag == 'ShadeIndices':
@@ -524,38 +524,39 @@ class Mesh:
             radius=self.header.sph_radius)
         sphere.create(xml_mesh)
 
-        create_object_list(xml_mesh, 'Vertices', self.verts, create_vector, 'V')
+        create_vector_list(xml_mesh, 'Vertices', self.verts, 'V')
 
         if self.multi_bone_skinned and self.verts_2:
-            create_object_list(xml_mesh, 'Vertices', self.verts_2, create_vector, 'V')
+            create_vector_list(xml_mesh, 'Vertices', self.verts_2, 'V')
 
-        create_object_list(xml_mesh, 'Normals', self.normals, create_vector, 'N')
+        create_vector_list(xml_mesh, 'Normals', self.normals, 'N')
 
         if self.multi_bone_skinned and self.normals_2:
-            create_object_list(xml_mesh, 'Normals', self.normals_2, create_vector, 'N')
+            create_vector_list(xml_mesh, 'Normals', self.normals_2, 'N')
 
         if self.tangents:
-            create_object_list(xml_mesh, 'Tangents', self.tangents, create_vector, 'T')
+            create_vector_list(xml_mesh, 'Tangents', self.tangents, 'T')
 
         if self.bitangents:
-            create_object_list(xml_mesh, 'Binormals', self.bitangents, create_vector, 'B')
+            create_vector_list(xml_mesh, 'Binormals', self.bitangents, 'B')
 
         if self.material_passes:
             if self.material_passes[0].dcg:
                 create_object_list(xml_mesh, 'VertexColors', self.get_material_pass().dcg, RGBA.create)
 
-            create_object_list(xml_mesh, 'TexCoords', self.material_passes[0].tx_coords, create_vector2, 'T')
+            create_vector_list(xml_mesh, 'TexCoords', self.material_passes[0].tx_coords, 'T', VECTOR2)
 
         if self.vert_infs:
             vertex_influences = create_node(xml_mesh, 'BoneInfluences')
-            vertex_influences2 = None
+            for vert_inf in self.vert_infs:
+                vert_inf.create(vertex_influences)
+
             if self.multi_bone_skinned:
                 vertex_influences2 = create_node(xml_mesh, 'BoneInfluences')
+                for vert_inf in self.vert_infs:
+                    vert_inf.create_extra(vertex_influences2)
 
-            for vert_inf in self.vert_infs:
-                vert_inf.create(vertex_influences, vertex_influences2)
-
-        create_object_list(xml_mesh, 'ShadeIndices', self.shade_ids, create_value, 'I')
+        create_value_list(xml_mesh, 'ShadeIndices', self.shade_ids, 'I')
 
         create_object_list(xml_mesh, 'Triangles', self.triangles, Triangle.create)
 
@@ -8,6 +8,8 @@ from io_mesh_w3d.w3x.io_xml import *
 
 W3D_CHUNK_AABBTREE_HEADER = 0x00000091
 
+AABBTREE_LEAF_FLAG = 0x80000000
+
 
 class AABBTreeHeader:
     def __init__(self, node_count=0, poly_count=0):
@@ -81,9 +83,13 @@ class AABBTreeNode:
         node = AABBTreeNode(
             min=read_vector(io_stream),
             max=read_vector(io_stream))
-        node.children = Children(
-            front=read_long(io_stream),
-            back=read_long(io_stream))
+        front = read_ulong(io_stream)
+        back = read_ulong(io_stream)
+        # the high bit of the front index marks leaf nodes, which store the first polygon and the polygon count
+        if front & AABBTREE_LEAF_FLAG:
+            node.polys = Polys(begin=front & ~AABBTREE_LEAF_FLAG, count=back)
+        else:
+            node.children = Children(front=front, back=back)
         return node
 
     @staticmethod
@@ -93,8 +99,12 @@ class AABBTreeNode:
     def write(self, io_stream):
         write_vector(self.min, io_stream)
         write_vector(self.max, io_stream)
-        write_long(self.children.front, io_stream)
-        write_long(self.children.back, io_stream)
+        if self.polys is not None:
+            write_ulong(self.polys.begin | AABBTREE_LEAF_FLAG, io_stream)
+            write_ulong(self.polys.count, io_stream)
+        else:
+            write_ulong(self.children.front, io_stream)
+            write_ulong(self.children.back, io_stream)
 
     @staticmethod
     def parse(xml_node):
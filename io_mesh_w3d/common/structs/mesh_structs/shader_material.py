@@ -167,11 +167,13 @@ class ShaderMaterialProperty:
     def create(self, parent):
         if self.type == 1:
             xml_constant = create_node(parent, 'Texture')
+            xml_constant.set('Name', self.name)
             xml_value = create_node(xml_constant, 'Value')
             xml_value.text = self.value
 
         elif self.type in [FLOAT_PROPERTY, VEC2_PROPERTY, VEC3_PROPERTY, VEC4_PROPERTY]:
             xml_constant = create_node(parent, 'Float')
+            xml_constant.set('Name', self.name)
             xml_value = create_node(xml_constant, 'Value')
             if self.type == FLOAT_PROPERTY:
                 xml_value.text = format(self.value)
@@ -192,16 +194,16 @@ class ShaderMaterialProperty:
 
         elif self.type == LONG_PROPERTY:
             xml_constant = create_node(parent, 'Int')
+            xml_constant.set('Name', self.name)
             xml_value = create_node(xml_constant, 'Value')
             xml_value.text = str(self.value)
 
         else:
             xml_constant = create_node(parent, 'Bool')
+            xml_constant.set('Name', self.name)
             xml_value = create_node(xml_constant, 'Value')
             xml_value.text = str(self.value).lower()
 
-        xml_constant.set('Name', self.name)
-
 
 W3D_CHUNK_SHADER_MATERIAL = 0x51
 
@@ -2,7 +2,7 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 from mathutils import Vector
-from io_mesh_w3d.w3d.io_binary import *
+from io_mesh_w3d.common.structs.mesh_structs.vector_array import *
 from io_mesh_w3d.w3x.io_xml import *
 
 
@@ -105,3 +105,89 @@ class Triangle:
         create_vector(self.normal, triangle, 'Nrm')
         xml_distance = create_node(triangle, 'Dist')
         xml_distance.text = format(self.distance)
+
+
+# triangles stored in flat arrays instead of Triangle objects
+# indexing and iterating creates Triangle objects on the fly, so changes to those are not stored
+class TriangleArray:
+    def __init__(self, vert_ids=None, surface_types=None, normals=None, distances=None):
+        self.vert_ids = vert_ids if vert_ids is not None else array('I')
+        self.surface_types = surface_types if surface_types is not None else array('I')
+        self.normals = normals if normals is not None else VectorArray()
+        self.distances = distances if distances is not None else array('f')
+
+    @staticmethod
+    def from_triangles(triangles):
+        result = TriangleArray()
+        for triangle in triangles:
+            result.append(triangle)
+        return result
+
+    @staticmethod
+    def read(io_stream, chunk_end):
+        ints = read_typed_array(io_stream, chunk_end, 'I')
+        count = len(ints) // 8
+        floats = array('f')
+        floats.frombytes(ints[:count * 8].tobytes())
+
+        result = TriangleArray(
+            vert_ids=array('I', bytes(12 * count)),
+            surface_types=ints[3:count * 8:8],
+            normals=VectorArray(3, array('f', bytes(12 * count))),
+            distances=floats[7::8])
+        for i in range(3):
+            result.vert_ids[i::3] = ints[i:count * 8:8]
+            result.normals.data[i::3] = floats[4 + i::8]
+        return result
+
+    def write(self, io_stream):
+        count = len(self)
+        data = array('I', bytes(32 * count))
+        normals = array('I')
+        normals.frombytes(self.normals.data.tobytes())
+        distances = array('I')
+        distances.frombytes(self.distances.tobytes())
+
+        for i in range(3):
+            data[i::8] = self.vert_ids[i::3]
+            data[4 + i::8] = normals[i::3]
+        data[3::8] = self.surface_types
+        data[7::8] = distances
+        write_typed_array(data, io_stream)
+
+    def append(self, triangle):
+        self.vert_ids.extend(triangle.vert_ids)
+        self.surface_types.append(triangle.surface_type)
+        self.normals.append(triangle.normal)
+        self.distances.append(triangle.distance)
+
+    def __len__(self):
+        return len(self.surface_types)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('TriangleArray index out of range')
+        return Triangle(
+            vert_ids=list(self.vert_ids[index * 3:index * 3 + 3]),
+            surface_type=self.surface_types[index],
+            normal=self.normals[index],
+            distance=self.distances[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def write_triangles(triangles, io_stream):
+    if isinstance(triangles, TriangleArray):
+        triangles.write(io_stream)
+    else:
+        write_list(triangles, io_stream, Triangle.write)
+
+
+def flat_vert_ids(triangles):
+    if isinstance(triangles, TriangleArray):
+        return array('i', triangles.vert_ids)
+    return array('i', [vert_id for triangle in triangles for vert_id in triangle.vert_ids])
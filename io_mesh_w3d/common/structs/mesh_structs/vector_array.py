@@ -0,0 +1,70 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+from array import array
+from mathutils import Vector
+from io_mesh_w3d.w3d.io_binary import *
+
+
+# list of vectors stored in one flat float array (size floats per vector) instead of Vector objects,
+# behaves like a list of Vectors, so the struct code works with both
+class VectorArray:
+    def __init__(self, size=3, data=None):
+        self.size = size
+        self.data = data if data is not None else array('f')
+
+    @staticmethod
+    def from_vectors(vectors, size=3):
+        return VectorArray(size, array('f', [vec[i] for vec in vectors for i in range(size)]))
+
+    @staticmethod
+    def read(io_stream, chunk_end, size=3):
+        data = read_typed_array(io_stream, chunk_end, 'f')
+        return VectorArray(size, data[:len(data) - len(data) % size])
+
+    def write(self, io_stream):
+        write_typed_array(self.data, io_stream)
+
+    def flat(self):
+        return self.data
+
+    def copy(self):
+        return VectorArray(self.size, array('f', self.data))
+
+    def append(self, vec):
+        self.data.extend(vec[i] for i in range(self.size))
+
+    def __len__(self):
+        return len(self.data) // self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('VectorArray index out of range')
+        return Vector(self.data[index * self.size:(index + 1) * self.size])
+
+    def __setitem__(self, index, vec):
+        if index < 0:
+            index += len(self)
+        for i in range(self.size):
+            self.data[index * self.size + i] = vec[i]
+
+    def __iter__(self):
+        data = self.data
+        size = self.size
+        for i in range(0, len(data), size):
+            yield Vector(data[i:i + size])
+
+
+def write_vectors(vectors, io_stream):
+    if isinstance(vectors, VectorArray):
+        vectors.write(io_stream)
+    else:
+        write_list(vectors, io_stream, write_vector)
+
+
+def flat_vectors(vectors, size=3):
+    if isinstance(vectors, VectorArray) and vectors.size == size:
+        return vectors.flat()
+    return array('f', [vec[i] for vec in vectors for i in range(size)])
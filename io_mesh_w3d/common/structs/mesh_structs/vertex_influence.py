@@ -47,6 +47,9 @@ class VertexInfluence:
         influence.set('Weight', format(self.bone_inf))
 
         if parent2 is not None:
-            influence2 = create_node(parent2, 'I')
-            influence2.set('Bone', str(self.xtra_idx))
-            influence2.set('Weight', format(self.xtra_inf))
+            self.create_extra(parent2)
+
+    def create_extra(self, parent):
+        influence = create_node(parent, 'I')
+        influence.set('Bone', str(self.xtra_idx))
+        influence.set('Weight', format(self.xtra_inf))
@@ -0,0 +1,232 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+# queries against the triangles of a mesh using its aabb tree, without blender or the engine
+# the nodes are traversed with an explicit stack, the triangles of a leaf node are tested at once with numpy
+
+import numpy as np
+from io_mesh_w3d.common.structs.mesh import *
+from io_mesh_w3d.common.utils.bounding_volume import *
+
+
+def aabbtree_arrays(aabbtree):
+    # node bounds (n, 2, 3) and links (n, 2) of an AABBTree struct, in the format of build_aabbtree
+    bounds = np.array([(tuple(node.min), tuple(node.max)) for node in aabbtree.nodes], dtype=np.float64)
+    links = np.array([(node.polys.begin | AABBTREE_LEAF_FLAG, node.polys.count) if node.polys is not None
+                      else (node.children.front, node.children.back) for node in aabbtree.nodes], dtype=np.int64)
+    return bounds.reshape(-1, 2, 3), links.reshape(-1, 2)
+
+
+def ray_triangles(origin, direction, corners, t_max):
+    # moeller-trumbore for both triangle sides, returns the ray parameters (inf for no hit)
+    edges_1 = corners[:, 1] - corners[:, 0]
+    edges_2 = corners[:, 2] - corners[:, 0]
+    p = np.cross(direction, edges_2)
+    determinants = (edges_1 * p).sum(axis=1)
+    valid = np.abs(determinants) > EPSILON
+    inverse = 1.0 / np.where(valid, determinants, 1.0)
+
+    s = origin - corners[:, 0]
+    u = (s * p).sum(axis=1) * inverse
+    q = np.cross(s, edges_1)
+    v = (q * direction).sum(axis=1) * inverse
+    t = (edges_2 * q).sum(axis=1) * inverse
+
+    hit = valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t >= 0.0) & (t <= t_max)
+    return np.where(hit, t, np.inf)
+
+
+def triangles_overlap_box(corners, low, high):
+    # separating axis test of the triangles against the box: box normals, triangle normals and the 9 edge cross products
+    center = (low + high) / 2
+    half = (high - low) / 2
+    vertices = corners - center
+
+    separated = (vertices.min(axis=1) > half).any(axis=1) | (vertices.max(axis=1) < -half).any(axis=1)
+
+    edges = vertices[:, [1, 2, 0]] - vertices
+    normals = np.cross(edges[:, 0], edges[:, 1])
+    axes = np.concatenate((normals[:, None], np.cross(edges[:, :, None], np.eye(3)[None, None]).reshape(-1, 9, 3)),
+                          axis=1)
+    projections = np.einsum('nij,nkj->nki', vertices, axes)
+    radii = (np.abs(axes) * half).sum(axis=2)
+    separated |= ((projections.min(axis=2) > radii) | (projections.max(axis=2) < -radii)).any(axis=1)
+    return ~separated
+
+
+def closest_points_on_triangles(point, corners):
+    # the projection onto the triangle plane if it lies inside the triangle, otherwise the closest point on the edges
+    a = corners[:, 0]
+    normals = np.cross(corners[:, 1] - a, corners[:, 2] - a)
+    lengths = (normals * normals).sum(axis=1)
+    valid = lengths > EPSILON * EPSILON
+    projections = point - normals * (((point - a) * normals).sum(axis=1) / np.where(valid, lengths, 1.0))[:, None]
+
+    inside = valid
+    candidates = []
+    for i in range(3):
+        start = corners[:, i]
+        edge = corners[:, (i + 1) % 3] - start
+        inside = inside & ((np.cross(edge, projections - start) * normals).sum(axis=1) >= 0.0)
+        t = np.clip(((point - start) * edge).sum(axis=1) / np.maximum((edge * edge).sum(axis=1), EPSILON), 0.0, 1.0)
+        candidates.append(start + edge * t[:, None])
+
+    candidates = np.stack(candidates, axis=1)
+    nearest = np.argmin(((candidates - point) ** 2).sum(axis=2), axis=1)
+    result = candidates[np.arange(len(corners)), nearest]
+    result[inside] = projections[inside]
+    return result
+
+
+class AABBTreeQuery:
+    def __init__(self, positions, triangles, poly_indices, bounds, links):
+        # positions (n, 3), triangles (m, 3 vertex indices), poly_indices map the leaf ranges to the triangles
+        self.poly_indices = np.asarray(poly_indices, dtype=np.int64)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.corners = positions[triangles[self.poly_indices]]
+
+        bounds = np.asarray(bounds, dtype=np.float64)
+        links = np.asarray(links, dtype=np.int64)
+        self.mins = [tuple(low) for low in bounds[:, 0].tolist()]
+        self.maxs = [tuple(high) for high in bounds[:, 1].tolist()]
+        self.leaves = ((links[:, 0] & AABBTREE_LEAF_FLAG) != 0).tolist()
+        self.fronts = np.where(self.leaves, links[:, 0] & ~AABBTREE_LEAF_FLAG, links[:, 0]).tolist()
+        self.backs = links[:, 1].tolist()
+        self.nodes_visited = 0
+
+    @staticmethod
+    def from_mesh(mesh):
+        positions = np.frombuffer(flat_vectors(mesh.verts), dtype=np.float32).reshape(-1, 3)
+        triangles = [triangle.vert_ids for triangle in mesh.triangles]
+        (bounds, links) = aabbtree_arrays(mesh.aabbtree)
+        return AABBTreeQuery(positions, triangles, mesh.aabbtree.poly_indices, bounds, links)
+
+    def leaf(self, node):
+        begin = self.fronts[node]
+        return self.poly_indices[begin:begin + self.backs[node]], self.corners[begin:begin + self.backs[node]]
+
+    def ray_box(self, node, origin, inverse, t_max):
+        # slab test, returns the entry parameter or None
+        (low, high) = (self.mins[node], self.maxs[node])
+        (t_near, t_far) = (0.0, t_max)
+        for i in range(3):
+            if inverse[i] is None:
+                if origin[i] < low[i] or origin[i] > high[i]:
+                    return None
+                continue
+            t_0 = (low[i] - origin[i]) * inverse[i]
+            t_1 = (high[i] - origin[i]) * inverse[i]
+            if t_0 > t_1:
+                (t_0, t_1) = (t_1, t_0)
+            t_near = max(t_near, t_0)
+            t_far = min(t_far, t_1)
+            if t_near > t_far:
+                return None
+        return t_near
+
+    def cast(self, origin, direction, t_max, any_hit):
+        origin = tuple(float(x) for x in origin)
+        direction = tuple(float(x) for x in direction)
+        inverse = tuple(1.0 / x if x != 0.0 else None for x in direction)
+        self.nodes_visited = 0
+        best = (None, t_max)
+        if not self.leaves:
+            return best
+
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            self.nodes_visited += 1
+            if self.ray_box(node, origin, inverse, best[1]) is None:
+                continue
+
+            if self.leaves[node]:
+                (polys, corners) = self.leaf(node)
+                distances = ray_triangles(np.array(origin), np.array(direction), corners, best[1])
+                index = np.argmin(distances)
+                if np.isfinite(distances[index]):
+                    best = (int(polys[index]), float(distances[index]))
+                    if any_hit:
+                        return best
+                continue
+
+            # the nearer child is visited first, which allows to skip the other one more often
+            hits = []
+            for child in (self.fronts[node], self.backs[node]):
+                near = self.ray_box(child, origin, inverse, best[1])
+                if near is not None:
+                    hits.append((near, child))
+            stack.extend(child for (_, child) in sorted(hits, reverse=True))
+        return best
+
+    def ray_cast(self, origin, direction, max_distance=np.inf):
+        # the closest triangle hit by the ray and the hit distance in units of the direction, or (None, max_distance)
+        return self.cast(origin, direction, max_distance, any_hit=False)
+
+    def segment_test(self, start, end):
+        # whether any triangle intersects the segment
+        start = np.asarray(start, dtype=np.float64)
+        (index, _) = self.cast(start, np.asarray(end, dtype=np.float64) - start, 1.0, any_hit=True)
+        return index is not None
+
+    def box_overlap(self, low, high):
+        # all triangles overlapping the axis aligned box
+        low = np.asarray(low, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        (box_min, box_max) = (tuple(low.tolist()), tuple(high.tolist()))
+        self.nodes_visited = 0
+        result = []
+        stack = [0] if self.leaves else []
+
+        while stack:
+            node = stack.pop()
+            self.nodes_visited += 1
+            (node_min, node_max) = (self.mins[node], self.maxs[node])
+            if any(node_min[i] > box_max[i] or node_max[i] < box_min[i] for i in range(3)):
+                continue
+
+            if self.leaves[node]:
+                (polys, corners) = self.leaf(node)
+                result.extend(polys[triangles_overlap_box(corners, low, high)].tolist())
+            else:
+                stack.extend((self.backs[node], self.fronts[node]))
+        return sorted(result)
+
+    def box_distance(self, node, point):
+        (low, high) = (self.mins[node], self.maxs[node])
+        distance = 0.0
+        for i in range(3):
+            delta = max(low[i] - point[i], 0.0, point[i] - high[i])
+            distance += delta * delta
+        return distance
+
+    def closest_triangle(self, point, max_distance=np.inf):
+        # the closest triangle to the point, the closest point on it and its distance, or (None, None, max_distance)
+        location = np.asarray(point, dtype=np.float64)
+        point = tuple(location.tolist())
+        self.nodes_visited = 0
+        best = (None, None, max_distance * max_distance)
+        stack = [0] if self.leaves else []
+
+        while stack:
+            node = stack.pop()
+            self.nodes_visited += 1
+            if self.box_distance(node, point) > best[2]:
+                continue
+
+            if self.leaves[node]:
+                (polys, corners) = self.leaf(node)
+                closest = closest_points_on_triangles(location, corners)
+                distances = ((closest - location) ** 2).sum(axis=1)
+                index = np.argmin(distances)
+                if distances[index] <= best[2]:
+                    best = (int(polys[index]), closest[index], float(distances[index]))
+                continue
+
+            children = (self.fronts[node], self.backs[node])
+            if self.box_distance(children[0], point) <= self.box_distance(children[1], point):
+                children = children[::-1]
+            stack.extend(children)
+
+        return best[0], best[1], best[2] ** 0.5
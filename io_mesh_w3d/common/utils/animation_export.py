@@ -2,10 +2,14 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import bpy
+import numpy as np
 from mathutils import Quaternion
 from io_mesh_w3d.common.utils.helpers import *
 from io_mesh_w3d.common.structs.animation import *
 from io_mesh_w3d.w3d.structs.compressed_animation import *
+from io_mesh_w3d.w3d.adaptive_delta import encode
+
+ANIMATION_MAX_ERROR = 0.01
 
 
 def is_translation(channel_type):
@@ -20,14 +24,121 @@ def is_visibility(fcu):
     return 'visibility' in fcu.data_path or 'hide' in fcu.data_path
 
 
+def get_keyframes(fcu, attribute, size=2, dtype=np.float64):
+    result = np.empty(len(fcu.keyframe_points) * size, dtype=dtype)
+    fcu.keyframe_points.foreach_get(attribute, result)
+    if size == 1:
+        return result
+    return result.reshape(-1, size)
+
+
+def bezier(p1, p2, p3, p4, u):
+    v = 1.0 - u
+    return v * v * v * p1 + 3.0 * v * v * u * p2 + 3.0 * v * u * u * p3 + u * u * u * p4
+
+
+def sample_bezier(p1, p2, p3, p4, frames):
+    # limit the handles to the segment like blender does, so x(u) is monotonic
+    h1 = p1 - p2
+    h2 = p4 - p3
+    length = p4[:, 0] - p1[:, 0]
+    handle_length = np.abs(h1[:, 0]) + np.abs(h2[:, 0])
+    too_long = handle_length > length
+    fac = np.ones(len(frames))
+    fac[too_long] = length[too_long] / handle_length[too_long]
+    p2 = p1 - fac[:, None] * h1
+    p3 = p4 - fac[:, None] * h2
+
+    # solve x(u) = frame by bisection
+    lower = np.zeros(len(frames))
+    upper = np.ones(len(frames))
+    for _ in range(32):
+        u = (lower + upper) * 0.5
+        below = bezier(p1[:, 0], p2[:, 0], p3[:, 0], p4[:, 0], u) < frames
+        lower = np.where(below, u, lower)
+        upper = np.where(below, upper, u)
+    return bezier(p1[:, 1], p2[:, 1], p3[:, 1], p4[:, 1], (lower + upper) * 0.5)
+
+
+def sample_fcurve(fcu, frames):
+    if len(fcu.keyframe_points) == 0 or len(fcu.modifiers) > 0 or fcu.extrapolation != 'CONSTANT':
+        return np.array([fcu.evaluate(frame) for frame in frames])
+
+    interpolation = get_keyframes(fcu, 'interpolation', size=1, dtype=np.int32)
+    if not np.isin(interpolation[:-1], [INTERPOLATION_CONSTANT, INTERPOLATION_LINEAR, INTERPOLATION_BEZIER]).all():
+        return np.array([fcu.evaluate(frame) for frame in frames])
+
+    co = get_keyframes(fcu, 'co')
+    segments = np.searchsorted(co[:, 0], frames, side='right') - 1
+
+    result = np.empty(len(frames))
+    result[segments < 0] = co[0, 1]
+    result[segments >= len(co) - 1] = co[-1, 1]
+
+    inside = (segments >= 0) & (segments < len(co) - 1)
+    segments = segments[inside]
+    frames = frames[inside]
+    p1 = co[segments]
+    p4 = co[segments + 1]
+    modes = interpolation[segments]
+
+    values = p1[:, 1].copy()
+    linear = modes == INTERPOLATION_LINEAR
+    fac = (frames[linear] - p1[linear, 0]) / (p4[linear, 0] - p1[linear, 0])
+    values[linear] = p1[linear, 1] + fac * (p4[linear, 1] - p1[linear, 1])
+
+    curved = modes == INTERPOLATION_BEZIER
+    if curved.any():
+        p2 = get_keyframes(fcu, 'handle_right')[segments[curved]]
+        p3 = get_keyframes(fcu, 'handle_left')[segments[curved] + 1]
+        values[curved] = sample_bezier(p1[curved], p2, p3, p4[curved], frames[curved])
+
+    result[inside] = values
+    return result
+
+
+def sample_fcurves(fcurves, first_frame, last_frame):
+    # samples all fcurves over the frame range into a frames x fcurves array
+    frames = np.arange(first_frame, last_frame + 1, dtype=np.float64)
+    result = np.empty((len(frames), len(fcurves)))
+    for i, fcu in enumerate(fcurves):
+        result[:, i] = sample_fcurve(fcu, frames)
+    return result
+
+
+def get_frame_range(fcu):
+    range_ = fcu.range()
+    if range_[0] == range_[1]:
+        return bpy.context.scene.frame_start, bpy.context.scene.frame_end
+    return int(range_[0]), int(range_[1])
+
+
+def to_quaternions(values):
+    norms = np.linalg.norm(values, axis=1)
+    norms[norms == 0.0] = 1.0
+    return [Quaternion(value) for value in (values / norms[:, None]).tolist()]
+
+
 def retrieve_channels(obj, hierarchy, timecoded, name=None):
     if obj.animation_data is None or obj.animation_data.action is None:
         return []
 
+    fcurves = list(obj.animation_data.action.fcurves)
+    if not fcurves:
+        return []
+
+    if not timecoded:
+        frame_ranges = [get_frame_range(fcu) for fcu in fcurves]
+        start_frame = min(first for (first, _) in frame_ranges)
+        end_frame = max(last for (_, last) in frame_ranges)
+        samples = sample_fcurves(fcurves, start_frame, end_frame)
+
     channel = None
     channels = []
+    frames = None
+    quaternions = None
 
-    for fcu in obj.animation_data.action.fcurves:
+    for index, fcu in enumerate(fcurves):
         if name is None:
             values = fcu.data_path.split('"')
             if len(values) == 1:
@@ -52,6 +163,13 @@ def retrieve_channels(obj, hierarchy, timecoded, name=None):
         if is_visibility(fcu):
             channel_type = CHANNEL_VIS
 
+        if timecoded:
+            keyframes = get_keyframes(fcu, 'co')
+            values = keyframes[:, 1]
+            steps = get_keyframes(fcu, 'interpolation', size=1, dtype=np.int32) == INTERPOLATION_CONSTANT
+        else:
+            (first_frame, last_frame) = frame_ranges[index]
+
         if not (channel_type == 6 and fcu.array_index > 0):
             if timecoded:
                 channel = TimeCodedAnimationChannel(
@@ -59,65 +177,115 @@ def retrieve_channels(obj, hierarchy, timecoded, name=None):
                     type=channel_type,
                     pivot=pivot_index)
 
-                num_keyframes = len(fcu.keyframe_points)
-                channel.time_codes = [None] * num_keyframes
-                channel.num_time_codes = num_keyframes
+                frames = keyframes[:, 0].astype(int).tolist()
+                channel.num_time_codes = len(frames)
+                interpolated = np.ones(len(frames), dtype=bool)
             else:
-                range_ = fcu.range()
-
                 if is_visibility(fcu):
                     channel = AnimationBitChannel()
                 else:
                     channel = AnimationChannel(vector_len=vec_len, type=channel_type)
 
-                channel.data = []
                 channel.pivot = pivot_index
-                num_frames = range_[1] + 1 - range_[0]
-                if num_frames == 1:
-                    channel.first_frame = bpy.context.scene.frame_start
-                    channel.last_frame = bpy.context.scene.frame_end
-                else:
-                    channel.first_frame = int(range_[0])
-                    channel.last_frame = int(range_[1])
-                num_frames = channel.last_frame + 1 - channel.first_frame
-                channel.data = [None] * num_frames
+                channel.first_frame = first_frame
+                channel.last_frame = last_frame
+                frames = range(first_frame, last_frame + 1)
 
-        if timecoded:
-            for i, keyframe in enumerate(fcu.keyframe_points):
-                frame = int(keyframe.co.x)
-                val = keyframe.co.y
-
-                if is_visibility(fcu) or is_translation(channel_type):
-                    channel.time_codes[i] = TimeCodedDatum(time_code=frame, value=val)
-                else:
-                    if channel.time_codes[i] is None:
-                        channel.time_codes[i] = TimeCodedDatum(time_code=frame, value=Quaternion())
-                    channel.time_codes[i].value[fcu.array_index] = val
-
-                if fcu.array_index == 3:
-                    channel.time_codes[i].value.normalize()
+            if channel_type == 6:
+                quaternions = np.zeros((len(frames), 4))
+                quaternions[:, 0] = 1.0
 
+        if timecoded:
+            # a key is not interpolated if the previous key of any of its fcurves holds its value
+            count = min(len(steps), len(frames))
+            interpolated[1:count] &= ~steps[:count - 1]
         else:
-            for frame in range(channel.first_frame, channel.last_frame + 1):
-                val = fcu.evaluate(frame)
-                i = frame - channel.first_frame
-
-                if is_visibility(fcu) or is_translation(channel_type):
-                    channel.data[i] = val
-                else:
-                    if channel.data[i] is None:
-                        channel.data[i] = Quaternion()
-                    channel.data[i][fcu.array_index] = val
+            offset = channel.first_frame - start_frame
+            values = samples[offset:offset + len(frames), index]
 
-                if fcu.array_index == 3:
-                    channel.data[i].normalize()
-
-        if is_translation(channel_type) or fcu.array_index == 3 or is_visibility(fcu):
-            channels.append(channel)
+        if is_visibility(fcu) or is_translation(channel_type):
+            data = values.tolist()
+        else:
+            count = min(len(values), len(quaternions))
+            quaternions[:count, fcu.array_index] = values[:count]
+            if fcu.array_index < 3:
+                continue
+            data = to_quaternions(quaternions)
+
+        if timecoded and is_visibility(fcu):
+            channel = create_time_coded_bit_channel(pivot_index, frames, data)
+        elif timecoded:
+            channel.time_codes = [TimeCodedDatum(time_code=frame, interpolated=bool(interpolated[i]), value=value)
+                                  for i, (frame, value) in enumerate(zip(frames, data))]
+        else:
+            channel.data = data
+        channels.append(channel)
     return channels
 
 
-def retrieve_animation(context, animation_name, hierarchy, rig, timecoded):
+def slerp(start, end, factors):
+    # start and end are quaternion arrays in the same hemisphere, returns one quaternion for each factor
+    dot = min(float(start.dot(end)), 1.0)
+    if dot > 0.9995:
+        result = start + (end - start) * factors[:, None]
+    else:
+        theta = np.arccos(dot)
+        result = np.sin((1.0 - factors) * theta)[:, None] * start + np.sin(factors * theta)[:, None] * end
+    return result / np.linalg.norm(result, axis=1)[:, None]
+
+
+def interpolation_errors(frames, values, start, end, quaternions):
+    # deviation of the keys between start and end from the interpolation of those two keys
+    factors = (frames[start + 1:end] - frames[start]) / (frames[end] - frames[start])
+    actual = values[start + 1:end]
+    if not quaternions:
+        return np.abs(values[start] + (values[end] - values[start]) * factors[:, None] - actual).max(axis=1)
+
+    target = values[end] if values[start].dot(values[end]) >= 0.0 else -values[end]
+    expected = slerp(values[start], target, factors)
+    # q and -q are the same rotation
+    signs = np.where((actual * expected).sum(axis=1) < 0.0, -1.0, 1.0)
+    return np.abs(actual * signs[:, None] - expected).max(axis=1)
+
+
+def reduce_keyframes(channel, max_error):
+    # drops the keys which are reproduced within max_error by interpolating the remaining keys (linear for
+    # translation, slerp for rotation channels), the keys are split douglas-peucker like at the largest deviation
+    # steps are kept, as the value is held up to the step and not interpolated
+    keys = channel.time_codes
+    if len(keys) < 3:
+        return
+
+    quaternions = channel.type == CHANNEL_Q
+    frames = np.array([key.time_code for key in keys], dtype=np.float64)
+    values = np.array([tuple(key.value) if quaternions else (key.value,) for key in keys], dtype=np.float64)
+
+    keep = np.zeros(len(keys), dtype=bool)
+    keep[[0, -1]] = True
+    steps = np.flatnonzero([not key.interpolated for key in keys])
+    steps = steps[steps > 0]
+    keep[steps] = True
+    keep[steps - 1] = True
+
+    anchors = np.flatnonzero(keep).tolist()
+    stack = list(zip(anchors[:-1], anchors[1:]))
+    while stack:
+        (start, end) = stack.pop()
+        if end - start < 2:
+            continue
+
+        errors = interpolation_errors(frames, values, start, end, quaternions)
+        index = int(np.argmax(errors))
+        if errors[index] > max_error:
+            split = start + 1 + index
+            keep[split] = True
+            stack.extend(((start, split), (split, end)))
+
+    channel.time_codes = [key for (key, kept) in zip(keys, keep) if kept]
+    channel.num_time_codes = len(channel.time_codes)
+
+
+def retrieve_animation(context, animation_name, hierarchy, rig, timecoded, max_error=0.0):
     channels = []
 
     for mesh in get_objects('MESH'):
@@ -131,7 +299,15 @@ def retrieve_animation(context, animation_name, hierarchy, rig, timecoded):
     if timecoded:
         ani_struct = CompressedAnimation(
             header=CompressedAnimationHeader(flavor=TIME_CODED_FLAVOR),
-            time_coded_channels=channels)
+            time_coded_channels=[channel for channel in channels if isinstance(channel, TimeCodedAnimationChannel)],
+            time_coded_bit_channels=[channel for channel in channels if isinstance(channel, TimeCodedBitChannel)])
+
+        num_keys = sum(channel.num_time_codes for channel in ani_struct.time_coded_channels)
+        for channel in ani_struct.time_coded_channels:
+            reduce_keyframes(channel, max_error)
+        num_reduced = sum(channel.num_time_codes for channel in ani_struct.time_coded_channels)
+        if num_reduced < num_keys:
+            context.info(f'keyframe reduction removed {num_keys - num_reduced} of {num_keys} keys')
     else:
         ani_struct = Animation(header=AnimationHeader(), channels=channels)
 
@@ -144,3 +320,285 @@ def retrieve_animation(context, animation_name, hierarchy, rig, timecoded):
     ani_struct.header.num_frames = end_frame + 1 - start_frame
     ani_struct.header.frame_rate = bpy.context.scene.render.fps
     return ani_struct
+
+
+def channel_values(channel_type, values):
+    # values as (n, vector_len) array, quaternions are flipped into the hemisphere of the first one
+    if channel_type != CHANNEL_Q:
+        return np.array(values, dtype=np.float64).reshape(-1, 1)
+    result = np.array([tuple(value) for value in values], dtype=np.float64).reshape(-1, 4)
+    return result * np.where(result @ result[0] < 0.0, -1.0, 1.0)[:, None]
+
+
+def is_rest_pose(channel_type, values, max_error):
+    # channels are applied relative to the pivot transforms of the hierarchy, so no offset restates the rest pose
+    if channel_type != CHANNEL_Q:
+        return np.abs(values).max() <= max_error
+    identity = np.array([1.0, 0.0, 0.0, 0.0])
+    return min(np.abs(values - identity).max(), np.abs(values + identity).max()) <= max_error
+
+
+def pivot_sizes(channels):
+    result = {}
+    for channel in channels:
+        result[channel.pivot] = result.get(channel.pivot, 0) + channel.size()
+    return result
+
+
+def remove_redundant_channels(context, animation, hierarchy, max_error=0.0):
+    # channels restating the rest pose of their pivot are dropped and constant timecoded channels are collapsed
+    # to their first key, which is held for the whole animation
+    # uncompressed channels have a value for each frame of their range, so constant ones are kept as they are
+    timecoded = isinstance(animation, CompressedAnimation)
+    channels = animation.time_coded_channels if timecoded else animation.channels
+    # values are stored as 32 bit floats
+    max_error = max(max_error, 1e-6)
+    sizes = pivot_sizes(channels)
+    result = []
+
+    for channel in channels:
+        if isinstance(channel, AnimationBitChannel):
+            result.append(channel)
+            continue
+
+        data = [datum.value for datum in channel.time_codes] if timecoded else channel.data
+        if not data:
+            result.append(channel)
+            continue
+
+        values = channel_values(channel.type, data)
+        if is_rest_pose(channel.type, values, max_error):
+            continue
+        if timecoded and len(data) > 1 and np.abs(values - values[0]).max() <= max_error:
+            channel.time_codes = channel.time_codes[:1]
+            channel.num_time_codes = 1
+        result.append(channel)
+
+    # an animation without any channels is not valid
+    if not result and channels:
+        result = channels[:1]
+
+    if timecoded:
+        animation.time_coded_channels = result
+    else:
+        animation.channels = result
+
+    reduced_sizes = pivot_sizes(result)
+    for (pivot, size) in sorted(sizes.items()):
+        saved = size - reduced_sizes.get(pivot, 0)
+        if saved > 0:
+            name = hierarchy.pivots[pivot].name if pivot < len(hierarchy.pivots) else str(pivot)
+            context.info(f'removed redundant animation channels of pivot \'{name}\': {saved} bytes saved')
+
+
+def create_time_coded_bit_channel(pivot, frames, values):
+    # only the frames where the visibility changes are stored, the default value holds before the first one
+    values = [bool(value) for value in values]
+    result = TimeCodedBitChannel(pivot=pivot, default_value=int(values[0]) if values else 1)
+    for i, (frame, value) in enumerate(zip(frames, values)):
+        if i > 0 and value != values[i - 1]:
+            result.time_codes.append(TimeCodedBitDatum(time_code=frame, value=value))
+    result.num_time_codes = len(result.time_codes)
+    return result
+
+
+def adaptive_delta_values(channel):
+    # adaptive delta channels start at frame 0, so the first value is repeated up to the first frame of the channel
+    return [channel.data[0]] * max(0, channel.first_frame) + list(channel.data)
+
+
+def create_adaptive_delta_channel(context, channel, max_error):
+    values = adaptive_delta_values(channel)
+
+    (scale, data, error) = encode(channel.type, channel.vector_len, values, num_bits=4)
+    if error <= max_error:
+        return AdaptiveDeltaAnimationChannel(
+            num_time_codes=len(values),
+            pivot=channel.pivot,
+            vector_len=channel.vector_len,
+            type=channel.type,
+            scale=scale,
+            data=data)
+
+    # motion channels also support 8 bit deltas or the exact values
+    result = MotionChannel(
+        vector_len=channel.vector_len,
+        type=channel.type,
+        num_time_codes=len(values),
+        pivot=channel.pivot)
+
+    (scale, data, error) = encode(channel.type, channel.vector_len, values, num_bits=8)
+    if error <= max_error:
+        result.delta_type = 2
+        result.data = AdaptiveDeltaMotionAnimationChannel(scale=scale, data=data)
+    else:
+        context.info(f'animation channel of pivot {channel.pivot} exceeds the max error of adaptive delta '
+                     f'compression ({error:.5f}) and is stored uncompressed')
+        result.delta_type = 0
+        result.data = [TimeCodedDatum(time_code=i, interpolated=True, value=value) for i, value in enumerate(values)]
+    return result
+
+
+def compress_adaptive_delta(context, animation, max_error=ANIMATION_MAX_ERROR):
+    # converts the per frame channels of an uncompressed animation into an adaptive delta compressed animation,
+    # channels whose decoded values would deviate by more than max_error are stored as motion channels
+    result = CompressedAnimation(
+        header=CompressedAnimationHeader(
+            name=animation.header.name,
+            hierarchy_name=animation.header.hierarchy_name,
+            num_frames=animation.header.num_frames,
+            frame_rate=animation.header.frame_rate,
+            flavor=ADAPTIVE_DELTA_FLAVOR))
+
+    for channel in animation.channels:
+        if isinstance(channel, AnimationBitChannel):
+            frames = range(channel.first_frame, channel.last_frame + 1)
+            result.time_coded_bit_channels.append(create_time_coded_bit_channel(channel.pivot, frames, channel.data))
+            continue
+
+        ad_channel = create_adaptive_delta_channel(context, channel, max_error)
+        if isinstance(ad_channel, MotionChannel):
+            result.motion_channels.append(ad_channel)
+        else:
+            result.adaptive_delta_channels.append(ad_channel)
+
+    if result.motion_channels:
+        result.header.version = Version(major=1, minor=0)
+    return result
+
+
+MOTION_CHANNEL_MAX_TIME_CODE = 0x7FFF
+CHANNEL_NAMES = {CHANNEL_X: 'X', CHANNEL_Y: 'Y', CHANNEL_Z: 'Z', CHANNEL_Q: 'Q', CHANNEL_VIS: 'visibility'}
+
+
+def create_time_coded_channel(channel, max_error):
+    result = TimeCodedAnimationChannel(
+        num_time_codes=len(channel.data),
+        pivot=channel.pivot,
+        vector_len=channel.vector_len,
+        type=channel.type,
+        time_codes=[TimeCodedDatum(time_code=channel.first_frame + i, interpolated=True, value=value)
+                    for i, value in enumerate(channel.data)])
+    reduce_keyframes(result, max_error)
+    return result
+
+
+def channel_encodings(channel, max_error):
+    # all encodings of the channel within max_error, each for the time coded and the adaptive delta flavor
+    # motion channels are supported by both flavors
+    time_coded = create_time_coded_channel(channel, max_error)
+    time_coded_encodings = [('TC', time_coded)]
+    adaptive_delta_encodings = []
+
+    if time_coded.time_codes[-1].time_code <= MOTION_CHANNEL_MAX_TIME_CODE:
+        motion = MotionChannel(
+            delta_type=0,
+            vector_len=channel.vector_len,
+            type=channel.type,
+            num_time_codes=time_coded.num_time_codes,
+            pivot=channel.pivot,
+            data=time_coded.time_codes)
+        time_coded_encodings.append(('MOTION_TC', motion))
+        adaptive_delta_encodings.append(('MOTION_TC', motion))
+
+    values = adaptive_delta_values(channel)
+    for num_bits in [4, 8]:
+        (scale, data, error) = encode(channel.type, channel.vector_len, values, num_bits=num_bits)
+        if error > max_error:
+            continue
+
+        if num_bits == 4:
+            adaptive_delta_encodings.append(('AD', AdaptiveDeltaAnimationChannel(
+                num_time_codes=len(values),
+                pivot=channel.pivot,
+                vector_len=channel.vector_len,
+                type=channel.type,
+                scale=scale,
+                data=data)))
+
+        if len(values) <= MOTION_CHANNEL_MAX_TIME_CODE:
+            motion = MotionChannel(
+                delta_type=num_bits // 4,
+                vector_len=channel.vector_len,
+                type=channel.type,
+                num_time_codes=len(values),
+                pivot=channel.pivot,
+                data=AdaptiveDeltaMotionAnimationChannel(scale=scale, data=data))
+            time_coded_encodings.append((f'MOTION_AD{num_bits}', motion))
+            adaptive_delta_encodings.append((f'MOTION_AD{num_bits}', motion))
+
+    return time_coded_encodings, adaptive_delta_encodings
+
+
+def smallest_encoding(encodings):
+    return min(encodings, key=lambda encoding: encoding[1].size())
+
+
+def channel_name(hierarchy, channel):
+    name = hierarchy.pivots[channel.pivot].name if channel.pivot < len(hierarchy.pivots) else str(channel.pivot)
+    return f'\'{name}\' {CHANNEL_NAMES.get(channel.type, channel.type)}'
+
+
+def compress_auto(context, animation, hierarchy, max_error=ANIMATION_MAX_ERROR):
+    # chooses the smallest encoding within max_error for each channel of an uncompressed animation
+    # a file contains either an uncompressed or a compressed animation and the compressed animation either
+    # time coded or adaptive delta channels, so the smallest of these three options is used
+    time_coded = CompressedAnimation(
+        header=CompressedAnimationHeader(
+            name=animation.header.name,
+            hierarchy_name=animation.header.hierarchy_name,
+            num_frames=animation.header.num_frames,
+            frame_rate=animation.header.frame_rate,
+            flavor=TIME_CODED_FLAVOR))
+    adaptive_delta = CompressedAnimation(
+        header=CompressedAnimationHeader(
+            name=animation.header.name,
+            hierarchy_name=animation.header.hierarchy_name,
+            num_frames=animation.header.num_frames,
+            frame_rate=animation.header.frame_rate,
+            flavor=ADAPTIVE_DELTA_FLAVOR))
+    choices = {TIME_CODED_FLAVOR: [], ADAPTIVE_DELTA_FLAVOR: []}
+    adaptive_delta_supported = True
+
+    for channel in animation.channels:
+        if isinstance(channel, AnimationBitChannel):
+            frames = range(channel.first_frame, channel.last_frame + 1)
+            bit_channel = create_time_coded_bit_channel(channel.pivot, frames, channel.data)
+            for result in [time_coded, adaptive_delta]:
+                result.time_coded_bit_channels.append(bit_channel)
+            continue
+
+        (time_coded_encodings, adaptive_delta_encodings) = channel_encodings(channel, max_error)
+        if not adaptive_delta_encodings:
+            # neither 4 nor 8 bit deltas are within max_error and the channel is too long for a motion channel
+            adaptive_delta_supported = False
+        for (result, encodings) in [(time_coded, time_coded_encodings), (adaptive_delta, adaptive_delta_encodings)]:
+            if not encodings:
+                continue
+            (choice, encoded) = smallest_encoding(encodings)
+            choices[result.header.flavor].append((channel, choice, encoded))
+            if isinstance(encoded, MotionChannel):
+                result.motion_channels.append(encoded)
+            elif isinstance(encoded, TimeCodedAnimationChannel):
+                result.time_coded_channels.append(encoded)
+            else:
+                result.adaptive_delta_channels.append(encoded)
+
+    for result in [time_coded, adaptive_delta]:
+        if result.motion_channels:
+            result.header.version = Version(major=1, minor=0)
+
+    # a time coded animation needs at least one time coded channel, otherwise the adaptive delta one is the same
+    options = [(animation.size(), 'U', animation, [(channel, 'U', channel) for channel in animation.channels])]
+    if time_coded.time_coded_channels:
+        options.append((time_coded.size() + HEAD, 'TC', time_coded, choices[TIME_CODED_FLAVOR]))
+    if adaptive_delta_supported and (adaptive_delta.adaptive_delta_channels or adaptive_delta.motion_channels):
+        options.append((adaptive_delta.size() + HEAD, 'AD', adaptive_delta, choices[ADAPTIVE_DELTA_FLAVOR]))
+    (size, flavor, result, channels) = min(options, key=lambda option: option[0])
+
+    for (channel, choice, encoded) in channels:
+        if not isinstance(channel, AnimationBitChannel):
+            context.info(f'animation channel {channel_name(hierarchy, channel)}: {choice} ({encoded.size()} bytes)')
+    context.info(f'animation size: {size} bytes ({flavor}), uncompressed: {animation.size()} bytes '
+                 f'({100.0 * size / max(animation.size(), 1):.1f}%)')
+    return result
@@ -2,6 +2,8 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import bpy
+import numpy as np
+from io_mesh_w3d.common.utils.helpers import *
 from io_mesh_w3d.w3d.adaptive_delta import decode
 from io_mesh_w3d.common.structs.animation import *
 from io_mesh_w3d.w3d.structs.compressed_animation import *
@@ -16,7 +18,7 @@ def is_translation(channel):
 
 
 def is_visibility(channel):
-    return isinstance(channel, AnimationBitChannel) or channel.type == CHANNEL_VIS
+    return isinstance(channel, (AnimationBitChannel, TimeCodedBitChannel)) or channel.type == CHANNEL_VIS
 
 
 def get_bone(context, rig, hierarchy, channel):
@@ -43,64 +45,108 @@ def setup_animation(animation):
     bpy.context.scene.frame_end = animation.header.num_frames - 1
 
 
-creation_options = {'INSERTKEY_NEEDED'}
+def get_action(owner):
+    if owner.animation_data is None:
+        owner.animation_data_create()
+    if owner.animation_data.action is None:
+        owner.animation_data.action = bpy.data.actions.new(owner.name + 'Action')
+    return owner.animation_data.action
 
 
-def set_translation(bone, index, frame, value):
-    bone.location[index] = value
-    bone.keyframe_insert(data_path='location', index=index, frame=frame, options=creation_options)
+def needed_keys(values):
+    # same as the INSERTKEY_NEEDED option: only the first and last key of a run of equal values are kept
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:-1] = (values[1:-1] != values[:-2]) | (values[1:-1] != values[2:])
+    return keep
 
 
-def set_rotation(bone, frame, value):
-    bone.rotation_quaternion = value
-    bone.keyframe_insert(data_path='rotation_quaternion', frame=frame)
+def insert_keyframes(owner, data_path, index, frames, values, group='', interpolation=INTERPOLATION_BEZIER):
+    action = get_action(owner)
+    fcurve = action.fcurves.find(data_path, index=index)
 
+    if fcurve is not None:
+        # merge with the existing keyframes, new keyframes replace existing ones on the same frame
+        co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+        fcurve.keyframe_points.foreach_get('co', co)
+        frames = np.concatenate((co[0::2], frames))[::-1]
+        values = np.concatenate((co[1::2], values))[::-1]
+        frames, unique = np.unique(frames, return_index=True)
+        values = values[unique]
+        action.fcurves.remove(fcurve)
+
+    fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    fcurve.keyframe_points.add(len(frames))
+
+    co = np.empty(len(frames) * 2, dtype=np.float32)
+    co[0::2] = frames
+    co[1::2] = values
+    fcurve.keyframe_points.foreach_set('co', co)
+    fcurve.keyframe_points.foreach_set('interpolation', np.full(len(frames), interpolation, dtype=np.int32))
+    fcurve.update()
 
-def set_visibility(bone, frame, value):
-    if isinstance(bone, bpy.types.Bone):
-        bone.visibility = value
-        bone.keyframe_insert(data_path='visibility', frame=frame, options=creation_options)
-    else:
-        bone.hide_viewport = bool(value)
-        bone.keyframe_insert(data_path='hide_viewport', frame=frame, options=creation_options)
 
+def set_keyframes(bone, channel, frames, values):
+    frames = np.asarray(frames, dtype=np.float32)
+    owner = bone.id_data
+    group = '' if isinstance(bone, bpy.types.ID) else bone.name
 
-def set_keyframe(bone, channel, frame, value):
     if is_visibility(channel):
-        set_visibility(bone, frame, value)
+        values = np.asarray(values, dtype=np.float32)
+        if isinstance(bone, bpy.types.Bone):
+            data_path = bone.path_from_id('visibility')
+        else:
+            data_path = bone.path_from_id('hide_viewport')
+            values = (values != 0).astype(np.float32)
+        keep = needed_keys(values)
+        insert_keyframes(owner, data_path, 0, frames[keep], values[keep], group, INTERPOLATION_CONSTANT)
     elif is_translation(channel):
-        set_translation(bone, channel.type, frame, value)
+        values = np.asarray(values, dtype=np.float32).reshape(-1)
+        keep = needed_keys(values)
+        insert_keyframes(owner, bone.path_from_id('location'), channel.type, frames[keep], values[keep], group)
     else:
-        set_rotation(bone, frame, value)
+        if not isinstance(values, np.ndarray):
+            values = [tuple(value) for value in values]
+        values = np.asarray(values, dtype=np.float32).reshape(-1, 4)
+        data_path = bone.path_from_id('rotation_quaternion')
+        for index in range(4):
+            insert_keyframes(owner, data_path, index, frames, values[:, index], group)
 
 
 def apply_timecoded(bone, channel):
-    for key in channel.time_codes:
-        set_keyframe(bone, channel, key.time_code, key.value)
+    set_keyframes(bone, channel,
+                  [key.time_code for key in channel.time_codes],
+                  [key.value for key in channel.time_codes])
+
+
+def apply_timecoded_bit(bone, channel):
+    frames = [key.time_code for key in channel.time_codes]
+    values = [key.value for key in channel.time_codes]
+    # the default value only applies until the first time code
+    if not frames or frames[0] > 0:
+        frames = [0] + frames
+        values = [channel.default_value] + values
+    set_keyframes(bone, channel, frames, values)
 
 
 def apply_motion_channel_time_coded(bone, channel):
-    for datum in channel.data:
-        set_keyframe(bone, channel, datum.time_code, datum.value)
+    set_keyframes(bone, channel,
+                  [datum.time_code for datum in channel.data],
+                  [datum.value for datum in channel.data])
 
 
 def apply_motion_channel_adaptive_delta(bone, channel):
     data = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.data.scale, channel.data.data)
-    for i in range(channel.num_time_codes):
-        set_keyframe(bone, channel, i, data[i])
+    set_keyframes(bone, channel, np.arange(channel.num_time_codes), data)
 
 
 def apply_adaptive_delta(bone, channel):
     data = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.scale, channel.data)
-    for i in range(channel.num_time_codes):
-        set_keyframe(bone, channel, i, data[i])
+    set_keyframes(bone, channel, np.arange(channel.num_time_codes), data)
 
 
 def apply_uncompressed(bone, channel):
-    for index in range(channel.last_frame - channel.first_frame + 1):
-        data = channel.data[index]
-        frame = index + channel.first_frame
-        set_keyframe(bone, channel, frame, data)
+    num_frames = channel.last_frame - channel.first_frame + 1
+    set_keyframes(bone, channel, np.arange(num_frames) + channel.first_frame, channel.data[:num_frames])
 
 
 def process_channels(context, hierarchy, channels, rig, apply_func):
@@ -133,6 +179,7 @@ def create_animation(context, rig, animation, hierarchy):
     if isinstance(animation, CompressedAnimation):
         process_channels(context, hierarchy, animation.time_coded_channels, rig, apply_timecoded)
         process_channels(context, hierarchy, animation.adaptive_delta_channels, rig, apply_adaptive_delta)
+        process_channels(context, hierarchy, animation.time_coded_bit_channels, rig, apply_timecoded_bit)
         process_motion_channels(context, hierarchy, animation.motion_channels, rig)
     else:
         process_channels(context, hierarchy, animation.channels, rig, apply_uncompressed)
@@ -0,0 +1,246 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+# bounding volumes of point sets, the points are (n, 3) numpy arrays as returned by foreach_get
+
+import numpy as np
+from io_mesh_w3d.common.structs.mesh_structs.aabbtree import AABBTREE_LEAF_FLAG
+
+EPSILON = 1e-7
+AABBTREE_LEAF_SIZE = 4
+SAH_BINS = 16
+
+
+def contains(center, radius, points):
+    return np.linalg.norm(points - center, axis=-1) <= radius * (1.0 + EPSILON) + EPSILON
+
+
+def ritter_sphere(points, max_iterations=100):
+    # Ritter's approximation: start with the sphere around two distant points and grow it towards
+    # the farthest point outside until all points are inside, each growing step is one vectorized pass
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) == 0:
+        return np.zeros(3), 0.0
+
+    x = points[np.argmax(np.linalg.norm(points - points[0], axis=1))]
+    y = points[np.argmax(np.linalg.norm(points - x, axis=1))]
+    center = (x + y) / 2
+    radius = np.linalg.norm(x - y) / 2
+
+    for _ in range(max_iterations):
+        distances = np.linalg.norm(points - center, axis=1)
+        index = np.argmax(distances)
+        dist = distances[index]
+        if dist <= radius:
+            return center, float(radius)
+
+        delta = (dist - radius) / 2
+        radius += delta
+        center = center + (points[index] - center) / dist * delta
+
+    return center, float(np.linalg.norm(points - center, axis=1).max())
+
+
+def circumsphere(boundary):
+    # smallest sphere with all (up to four) boundary points on its surface
+    if len(boundary) == 0:
+        return np.zeros(3), -1.0
+    if len(boundary) == 1:
+        return boundary[0], 0.0
+    if len(boundary) == 2:
+        return (boundary[0] + boundary[1]) / 2, np.linalg.norm(boundary[0] - boundary[1]) / 2
+
+    origin = boundary[0]
+    if len(boundary) == 3:
+        a = boundary[1] - origin
+        b = boundary[2] - origin
+        normal = np.cross(a, b)
+        denominator = 2 * normal.dot(normal)
+        if denominator < EPSILON:
+            return smallest_enclosing(boundary)
+        offset = (np.cross(normal, a) * b.dot(b) + np.cross(b, normal) * a.dot(a)) / denominator
+        return origin + offset, np.linalg.norm(offset)
+
+    edges = np.array([point - origin for point in boundary[1:]])
+    if abs(np.linalg.det(edges)) < EPSILON:
+        return smallest_enclosing(boundary)
+    offset = np.linalg.solve(2 * edges, (edges * edges).sum(axis=1))
+    return origin + offset, np.linalg.norm(offset)
+
+
+def smallest_enclosing(boundary):
+    # degenerated boundary (collinear or coplanar points), use the smallest sphere of a subset containing all points
+    best = None
+    for skip in range(len(boundary)):
+        center, radius = circumsphere(boundary[:skip] + boundary[skip + 1:])
+        if contains(center, radius, np.array(boundary)).all() and (best is None or radius < best[1]):
+            best = (center, radius)
+    if best is None:
+        return ritter_sphere(np.array(boundary))
+    return best
+
+
+def welzl(points, boundary, count):
+    center, radius = circumsphere(boundary)
+    if len(boundary) == 4:
+        return center, radius
+
+    for i in range(count):
+        if radius < 0 or not contains(center, radius, points[i]):
+            center, radius = welzl(points, boundary + [points[i]], i)
+    return center, radius
+
+
+def minimal_sphere(points):
+    # exact minimal enclosing sphere: Welzl's algorithm on a small support set, which is extended by the
+    # farthest point outside until the sphere contains all points
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) == 0:
+        return np.zeros(3), 0.0
+
+    center, _ = ritter_sphere(points)
+    support = [points[np.argmax(np.linalg.norm(points - center, axis=1))]]
+
+    while True:
+        center, radius = welzl(support, [], len(support))
+        distances = np.linalg.norm(points - center, axis=1)
+        index = np.argmax(distances)
+        if distances[index] <= radius * (1.0 + EPSILON) + EPSILON:
+            return center, float(radius)
+        support.insert(0, points[index])
+
+
+def bounding_sphere(points, exact=False):
+    if exact:
+        return minimal_sphere(points)
+    return ritter_sphere(points)
+
+
+def surface_area(extents):
+    with np.errstate(invalid='ignore'):
+        return 2.0 * (extents[..., 0] * extents[..., 1] + extents[..., 1] * extents[..., 2]
+                      + extents[..., 2] * extents[..., 0])
+
+
+def segments(order, begins, counts):
+    # the triangles of the given ranges of order, along with the index of their range and the range starts
+    starts = np.cumsum(counts) - counts
+    labels = np.repeat(np.arange(len(counts)), counts)
+    indices = np.arange(len(labels)) + (begins - starts)[labels]
+    return indices, order[indices], labels, starts
+
+
+def median_split(centers, labels, starts, counts):
+    # splits each range at the median of the longest axis of its triangle centers
+    extents = np.maximum.reduceat(centers, starts) - np.minimum.reduceat(centers, starts)
+    values = centers[np.arange(len(centers)), np.argmax(extents, axis=1)[labels]]
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[np.lexsort((values, labels))] = np.arange(len(values))
+    return ranks - starts[labels] < (counts // 2)[labels]
+
+
+def sah_split(centers, mins, maxs, labels, starts, counts):
+    # binned surface area heuristic: the triangle centers of each range are sorted into bins along each axis and
+    # the cheapest border between two bins is used, ranges whose centers can not be separated are marked invalid
+    count = len(counts)
+    low = np.minimum.reduceat(centers, starts)
+    extents = np.maximum.reduceat(centers, starts) - low
+    best_costs = np.full(count, np.inf)
+    best_axes = np.zeros(count, dtype=np.int64)
+    best_borders = np.zeros(count, dtype=np.int64)
+    all_bins = []
+
+    for axis in range(3):
+        scale = np.where(extents[:, axis] > EPSILON, SAH_BINS / np.maximum(extents[:, axis], EPSILON), 0.0)
+        bins = np.minimum(((centers[:, axis] - low[labels, axis]) * scale[labels]).astype(np.int64), SAH_BINS - 1)
+        all_bins.append(bins)
+
+        keys = labels * SAH_BINS + bins
+        bin_counts = np.bincount(keys, minlength=count * SAH_BINS).reshape(count, SAH_BINS)
+        bin_mins = np.full((count * SAH_BINS, 3), np.inf)
+        bin_maxs = np.full((count * SAH_BINS, 3), -np.inf)
+        np.minimum.at(bin_mins, keys, mins)
+        np.maximum.at(bin_maxs, keys, maxs)
+        bin_mins = bin_mins.reshape(count, SAH_BINS, 3)
+        bin_maxs = bin_maxs.reshape(count, SAH_BINS, 3)
+
+        left_counts = np.cumsum(bin_counts, axis=1)[:, :-1]
+        left_areas = surface_area(np.maximum.accumulate(bin_maxs, axis=1)[:, :-1]
+                                  - np.minimum.accumulate(bin_mins, axis=1)[:, :-1])
+        right_areas = surface_area(np.maximum.accumulate(bin_maxs[:, ::-1], axis=1)[:, -2::-1]
+                                   - np.minimum.accumulate(bin_mins[:, ::-1], axis=1)[:, -2::-1])
+
+        with np.errstate(invalid='ignore'):
+            costs = left_counts * left_areas + (counts[:, None] - left_counts) * right_areas
+        costs[(left_counts == 0) | (left_counts == counts[:, None])] = np.inf
+
+        borders = np.argmin(costs, axis=1)
+        axis_costs = costs[np.arange(count), borders]
+        better = axis_costs < best_costs
+        best_costs[better] = axis_costs[better]
+        best_axes[better] = axis
+        best_borders[better] = borders[better]
+
+    left = np.stack(all_bins)[best_axes[labels], np.arange(len(labels))] <= best_borders[labels]
+    return left, np.isfinite(best_costs)
+
+
+def build_aabbtree(positions, triangles, leaf_size=AABBTREE_LEAF_SIZE, method='SAH'):
+    # builds an axis aligned bounding box tree over the triangles (n, 3 vertex indices) using the surface area
+    # heuristic ('SAH') or median splits ('MEDIAN'), all nodes of a tree level are split at once
+    # returns the triangle order, the node bounds (n, 2, 3) and the node links (n, 2) which are either
+    # (front, back) or (first triangle | AABBTREE_LEAF_FLAG, triangle count) like in the w3d file format,
+    # leaf nodes refer to a range of the triangles in the returned order
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    order = np.arange(len(triangles))
+    if len(triangles) == 0:
+        return order, np.empty((0, 2, 3)), np.empty((0, 2), dtype=np.int64)
+
+    corners = positions[triangles]
+    mins = corners.min(axis=1)
+    maxs = corners.max(axis=1)
+    centers = (mins + maxs) / 2
+    leaf_size = max(1, leaf_size)
+
+    bounds = np.empty((2 * len(triangles) - 1, 2, 3))
+    links = np.empty((2 * len(triangles) - 1, 2), dtype=np.int64)
+    node_count = 1
+    nodes = np.zeros(1, dtype=np.int64)
+    begins = np.zeros(1, dtype=np.int64)
+    counts = np.array([len(triangles)])
+
+    while len(nodes):
+        (_, tris, _, starts) = segments(order, begins, counts)
+        bounds[nodes, 0] = np.minimum.reduceat(mins[tris], starts)
+        bounds[nodes, 1] = np.maximum.reduceat(maxs[tris], starts)
+
+        leaves = counts <= leaf_size
+        links[nodes[leaves], 0] = begins[leaves] | AABBTREE_LEAF_FLAG
+        links[nodes[leaves], 1] = counts[leaves]
+
+        (nodes, begins, counts) = (nodes[~leaves], begins[~leaves], counts[~leaves])
+        if len(nodes) == 0:
+            break
+
+        (indices, tris, labels, starts) = segments(order, begins, counts)
+        if method == 'SAH':
+            (left, valid) = sah_split(centers[tris], mins[tris], maxs[tris], labels, starts, counts)
+            if not valid.all():
+                left = np.where(valid[labels], left, median_split(centers[tris], labels, starts, counts))
+        else:
+            left = median_split(centers[tris], labels, starts, counts)
+
+        order[indices] = tris[np.lexsort((~left, labels))]
+        left_counts = np.bincount(labels, weights=left, minlength=len(nodes)).astype(np.int64)
+
+        fronts = node_count + 2 * np.arange(len(nodes))
+        links[nodes, 0] = fronts
+        links[nodes, 1] = fronts + 1
+        node_count += 2 * len(nodes)
+
+        nodes = np.column_stack((fronts, fronts + 1)).ravel()
+        begins = np.column_stack((begins, begins + left_counts)).ravel()
+        counts = np.column_stack((left_counts, counts - left_counts)).ravel()
+
+    return order, bounds[:node_count], links[:node_count]
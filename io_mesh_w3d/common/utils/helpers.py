@@ -4,8 +4,17 @@
 import bpy
 import os
 import sys
+import numpy as np
+from array import array
 from mathutils import Quaternion, Matrix, Vector
 from bpy_extras.image_utils import load_image
+from io_mesh_w3d.common.structs.mesh_structs.vector_array import *
+from io_mesh_w3d.w3d.io_binary import insensitive_path
+
+# values of the Keyframe.interpolation enum, as used by foreach_get and foreach_set
+INTERPOLATION_CONSTANT = 0
+INTERPOLATION_LINEAR = 1
+INTERPOLATION_BEZIER = 2
 
 
 def make_transform_matrix(loc, rot):
@@ -26,17 +35,6 @@ def switch_to_pose(rig, pose):
         bpy.context.view_layer.update()
 
 
-def insensitive_path(path):
-    # find the io_stream on unix
-    directory = os.path.dirname(path)
-    name = os.path.basename(path)
-
-    for io_stream_name in os.listdir(directory):
-        if io_stream_name.lower() == name.lower():
-            path = os.path.join(directory, io_stream_name)
-    return path
-
-
 def get_collection(hlod=None, index=''):
     if hlod is not None:
         name = hlod.model_name() + index
@@ -66,7 +64,25 @@ def rig_object(obj, hierarchy, rig, sub_object):
     obj.parent_type = 'BONE'
 
 
-def create_uvlayer(context, mesh, b_mesh, tris, mat_pass):
+def get_loop_vertex_indices(mesh):
+    indices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', indices)
+    return indices
+
+
+def get_vectors(collection, attribute, size=3):
+    result = np.empty(len(collection) * size, dtype=np.float32)
+    collection.foreach_get(attribute, result)
+    return result.reshape(-1, size)
+
+
+def to_vector_array(values):
+    data = array('f')
+    data.frombytes(np.ascontiguousarray(values, dtype=np.float32).tobytes())
+    return VectorArray(values.shape[1], data)
+
+
+def create_uvlayer(context, mesh, mat_pass, loop_vertex_indices=None):
     tx_coords = None
     if mat_pass.tx_coords:
         tx_coords = mat_pass.tx_coords
@@ -84,11 +100,13 @@ def create_uvlayer(context, mesh, b_mesh, tris, mat_pass):
     if tx_coords is None:
         return
 
+    if loop_vertex_indices is None:
+        loop_vertex_indices = get_loop_vertex_indices(mesh)
+
+    # gather the per vertex coordinates for each loop and write all of them at once
+    uvs = np.frombuffer(flat_vectors(tx_coords, 2), dtype=np.float32).reshape(-1, 2)
     uv_layer = mesh.uv_layers.new(do_init=False)
-    for i, face in enumerate(b_mesh.faces):
-        for loop in face.loops:
-            idx = tris[i][loop.index % 3]
-            uv_layer.data[loop.index].uv = tx_coords[idx].xy
+    uv_layer.data.foreach_set('uv', uvs[loop_vertex_indices].ravel())
 
 
 extensions = ['.dds', '.tga', '.jpg', '.jpeg', '.png', '.bmp']
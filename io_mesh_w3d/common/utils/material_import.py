@@ -13,14 +13,14 @@ from io_mesh_w3d.w3d.structs.mesh_structs.vertex_material import *
 # vertex material
 ##########################################################################
 
-def create_vertex_material(context, principleds, structure, mesh, b_mesh, name, triangles):
+def create_vertex_material(context, principleds, structure, mesh, name, loop_vertex_indices=None):
     for vertMat in structure.vert_materials:
         (material, principled) = create_material_from_vertex_material(name, vertMat)
         mesh.materials.append(material)
         principleds.append(principled)
 
     for mat_pass in structure.material_passes:
-        create_uvlayer(context, mesh, b_mesh, triangles, mat_pass)
+        create_uvlayer(context, mesh, mat_pass, loop_vertex_indices)
 
         if mat_pass.tx_stages:
             tx_stage = mat_pass.tx_stages[0]
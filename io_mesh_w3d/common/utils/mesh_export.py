@@ -3,15 +3,18 @@
 
 import bpy
 import bmesh
+import numpy as np
 from mathutils import Vector, Matrix
 from bpy_extras import node_shader_utils
 
 from io_mesh_w3d.common.structs.mesh import *
 from io_mesh_w3d.common.utils.helpers import *
+from io_mesh_w3d.common.utils.bounding_volume import *
 from io_mesh_w3d.common.utils.material_export import *
 
 
-def retrieve_meshes(context, hierarchy, rig, container_name, force_vertex_materials=False):
+def retrieve_meshes(context, hierarchy, rig, container_name, force_vertex_materials=False, exact_spheres=False,
+                    create_aabbtrees=False):
     mesh_structs = []
     used_textures = []
 
@@ -49,117 +52,25 @@ def retrieve_meshes(context, hierarchy, rig, container_name, force_vertex_materi
 
         mesh_object = mesh_object.evaluated_get(depsgraph)
         mesh = mesh_object.data
-        b_mesh = prepare_bmesh(context, mesh)
+        prepare_bmesh(context, mesh)
 
         if len(mesh.vertices) == 0:
             context.warning(f'mesh \'{mesh.name}\' does not have a single vertex!')
             continue
 
-        center, radius = calculate_mesh_sphere(mesh)
+        center, radius = calculate_mesh_sphere(mesh, exact_spheres)
         header.sph_center = center
         header.sph_radius = radius
 
         if mesh.uv_layers:
             mesh.calc_tangents()
 
-        header.vert_count = len(mesh.vertices)
-
-        loop_dict = dict()
-        for loop in mesh.loops:
-            loop_dict[loop.vertex_index] = loop
-
-        _, _, scale = mesh_object.matrix_local.decompose()
-
-        is_skinned = False
-        for vertex in mesh.vertices:
-            if vertex.groups:
-                is_skinned = True
-
-        unskinned_vertices_error = False
-        overskinned_vertices_error = False
-
-        for i, vertex in enumerate(mesh.vertices):
-            mesh_struct.shade_ids.append(i)
-            matrix = Matrix.Identity(4)
-            matrix_2 = Matrix.Identity(4)
-
-            if vertex.groups:
-                vert_inf = VertexInfluence()
-                vert_inf.bone_idx = find_bone_index(hierarchy, mesh_object, vertex.groups[0].group)
-                vert_inf.bone_inf = vertex.groups[0].weight
-
-                # add extra influenced bones
-                if len(vertex.groups) > 1:
-                    mesh_struct.multi_bone_skinned = True
-                    vert_inf.xtra_idx = find_bone_index(hierarchy, mesh_object, vertex.groups[1].group)
-                    vert_inf.xtra_inf = vertex.groups[1].weight
-                if len(vertex.groups) > 2:
-                    overskinned_vertices_error = True
-                    context.error(
-                        f'mesh \'{mesh_object.name}\' vertex {i} is influenced by more than 2 bones ({len(vertex.groups)})! Make sure you do weight painting on vertex basis not per face.')
-
-                if vert_inf.bone_inf < 0.01 and vert_inf.xtra_inf < 0.01:
-                    context.warning(f'mesh \'{mesh_object.name}\' vertex {i} both bone weights where 0!')
-                    vert_inf.bone_inf = 1.0
-                    vert_inf.xtra_inf = 0.0
-
-                if abs(vert_inf.bone_inf + vert_inf.xtra_inf - 1.0) > 0.1:
-                    context.warning(
-                        f'mesh \'{mesh_object.name}\' vertex {i} both bone weights did not add up to 100%! ({vert_inf.bone_inf:.{2}f}, {vert_inf.xtra_inf:.{2}f}). Will be normalized!')
-                    _bone_inf = vert_inf.bone_inf / (vert_inf.xtra_inf + vert_inf.bone_inf)
-                    _xtra_inf = vert_inf.xtra_inf / (vert_inf.xtra_inf + vert_inf.bone_inf)
-                    vert_inf.bone_inf = _bone_inf
-                    vert_inf.xtra_inf = _xtra_inf
-
-                mesh_struct.vert_infs.append(vert_inf)
-
-                if vert_inf.bone_idx > 0:
-                    matrix = matrix @ rig.data.bones[hierarchy.pivots[vert_inf.bone_idx].name].matrix_local.inverted()
-                else:
-                    matrix = matrix @ rig.matrix_local.inverted()
-
-                if vert_inf.xtra_inf > 0:
-                    if vert_inf.xtra_idx > 0:
-                        matrix_2 = matrix_2 @ rig.data.bones[hierarchy.pivots[vert_inf.xtra_idx].name].matrix_local.inverted()
-                    else:
-                        matrix_2 = matrix_2 @ rig.matrix_local.inverted()
-                else:
-                    matrix_2 = matrix
-
-            elif is_skinned:
-                unskinned_vertices_error = True
-                context.error(f'skinned mesh \'{mesh_object.name}\' vertex {i} is not rigged to any bone!')
-
-            vertex.co.x *= scale.x
-            vertex.co.y *= scale.y
-            vertex.co.z *= scale.z
-            mesh_struct.verts.append(matrix @ vertex.co)
-            mesh_struct.verts_2.append(matrix_2 @ vertex.co)
-
-            _, rotation, _ = matrix.decompose()
-            _, rotation_2, _ = matrix_2.decompose()
-
-            if i in loop_dict:
-                loop = loop_dict[i]
-                # do NOT use loop.normal here! that might result in weird shading issues
-                mesh_struct.normals.append(rotation @ vertex.normal)
-                mesh_struct.normals_2.append(rotation_2 @ vertex.normal)
-
-                if mesh.uv_layers:
-                    # in order to adapt to 3ds max orientation
-                    mesh_struct.tangents.append((rotation @ loop.bitangent) * -1)
-                    mesh_struct.bitangents.append((rotation @ loop.tangent))
-            else:
-                context.warning(f'mesh \'{mesh_object.name}\' vertex {i} is not connected to any face!')
-                mesh_struct.normals.append(rotation @ vertex.normal)
-                mesh_struct.normals_2.append(rotation_2 @ vertex.normal)
-
-                if mesh.uv_layers:
-                    # only dummys
-                    mesh_struct.tangents.append((rotation @ vertex.normal) * -1)
-                    mesh_struct.bitangents.append((rotation @ vertex.normal))
+        loop_vertex_indices = get_loop_vertex_indices(mesh)
+        source_vertices, loop_vertices = split_multi_uv_vertices(context, mesh, loop_vertex_indices)
+        header.vert_count = len(source_vertices)
 
-        if unskinned_vertices_error or overskinned_vertices_error:
+        if not retrieve_vertices(context, mesh_struct, mesh_object, mesh, hierarchy, rig, source_vertices,
+                                 loop_vertices):
             return ([], [])
 
         header.min_corner = Vector(
@@ -171,17 +82,15 @@ def retrieve_meshes(context, hierarchy, rig, container_name, force_vertex_materi
              mesh_object.bound_box[6][1],
              mesh_object.bound_box[6][2]))
 
-        for poly in mesh.polygons:
-            triangle = Triangle(
-                vert_ids=list(poly.vertices),
-                normal=Vector(poly.normal))
+        loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loop_starts)
+        triangle_loops = loop_starts[:, None] + np.arange(3)
+        centers = get_vectors(mesh.vertices, 'co')[loop_vertex_indices[triangle_loops]].mean(axis=1)
 
-            vec1 = mesh.vertices[poly.vertices[0]].co
-            vec2 = mesh.vertices[poly.vertices[1]].co
-            vec3 = mesh.vertices[poly.vertices[2]].co
-            tri_pos = (vec1 + vec2 + vec3) / 3.0
-            triangle.distance = tri_pos.length
-            mesh_struct.triangles.append(triangle)
+        for (vert_ids, normal, distance) in zip(loop_vertices[triangle_loops].tolist(),
+                                                get_vectors(mesh.polygons, 'normal').tolist(),
+                                                np.linalg.norm(centers, axis=1).tolist()):
+            mesh_struct.triangles.append(Triangle(vert_ids=vert_ids, normal=Vector(normal), distance=distance))
 
         if context.file_format == 'W3X' and len(mesh_object.face_maps) > 0:
             context.warning('triangle surface types (mesh face maps) are not supported in W3X file format!')
@@ -193,25 +102,17 @@ def retrieve_meshes(context, hierarchy, rig, container_name, force_vertex_materi
                 for i, val in enumerate(map.data):
                     mesh_struct.triangles[i].set_surface_type(face_map_names[val.value])
 
-        header.face_count = len(mesh_struct.triangles)
+        # skinned vertices are moved by the bones, so only rigid meshes get a tree
+        if create_aabbtrees and not mesh_struct.vert_infs:
+            create_aabbtree(mesh_struct)
 
-        center, radius = calculate_mesh_sphere(mesh)
-        header.sphCenter = center
-        header.sphRadius = radius
+        header.face_count = len(mesh_struct.triangles)
 
         tx_stages = []
         for i, uv_layer in enumerate(mesh.uv_layers):
-            stage = TextureStage(
-                tx_ids=[[i]],
-                tx_coords=[[Vector((0.0, 0.0))] * len(mesh_struct.verts)])
-
-            for j, face in enumerate(b_mesh.faces):
-                for loop in face.loops:
-                    vert_index = mesh_struct.triangles[j].vert_ids[loop.index % 3]
-                    stage.tx_coords[0][vert_index] = uv_layer.data[loop.index].uv.copy()
-            tx_stages.append(stage)
-
-        b_mesh.free()
+            tx_coords = np.zeros((len(source_vertices), 2), dtype=np.float32)
+            tx_coords[loop_vertices] = get_vectors(uv_layer.data, 'uv', 2)
+            tx_stages.append(TextureStage(tx_ids=[[i]], tx_coords=[to_vector_array(tx_coords)]))
 
         for i, material in enumerate(mesh.materials):
             mat_pass = MaterialPass()
@@ -340,98 +241,216 @@ def retrieve_meshes(context, hierarchy, rig, container_name, force_vertex_materi
 
 
 def prepare_bmesh(context, mesh):
-    b_mesh = bmesh.new()
-    b_mesh.from_mesh(mesh)
-    bmesh.ops.triangulate(b_mesh, faces=b_mesh.faces)
-    b_mesh.to_mesh(mesh)
-    mesh.update()
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    if (loop_totals == 3).all():
+        return
 
     b_mesh = bmesh.new()
     b_mesh.from_mesh(mesh)
-    b_mesh = split_multi_uv_vertices(context, mesh, b_mesh)
+    bmesh.ops.triangulate(b_mesh, faces=b_mesh.faces)
     b_mesh.to_mesh(mesh)
+    b_mesh.free()
     mesh.update()
-    return b_mesh
 
 
-def find_bone_index(hierarchy, mesh_object, group):
-    indices = [i for i, pivot in enumerate(hierarchy.pivots) if pivot.name.lower()
-               == mesh_object.vertex_groups[group].name.lower()]
-    if indices:
-        return indices[0]
-    raise Exception(f'no matching armature bone found for vertex group \'{mesh_object.vertex_groups[group].name}\'')
-
-
-def split_multi_uv_vertices(context, mesh, b_mesh):
-    b_mesh.verts.ensure_lookup_table()
-
-    for ver in b_mesh.verts:
-        ver.select_set(False)
+def get_vertex_groups(mesh_object, mesh):
+    # vertex group memberships are not accessible with foreach_get, so the first two of each vertex are gathered here
+    count = len(mesh.vertices)
+    group_counts = np.zeros(count, dtype=np.int32)
+    groups = np.full((count, 2), -1, dtype=np.int32)
+    weights = np.zeros((count, 2), dtype=np.float32)
+
+    if len(mesh_object.vertex_groups) == 0:
+        return group_counts, groups, weights
+
+    for i, vertex in enumerate(mesh.vertices):
+        vertex_groups = vertex.groups
+        group_counts[i] = len(vertex_groups)
+        for j, group in enumerate(vertex_groups[:2]):
+            groups[i, j] = group.group
+            weights[i, j] = group.weight
+    return group_counts, groups, weights
+
+
+def get_bone_indices(hierarchy, mesh_object, groups):
+    pivot_indices = dict()
+    for i, pivot in enumerate(hierarchy.pivots):
+        pivot_indices.setdefault(pivot.name.lower(), i)
+    # the trailing entry maps the -1 of vertices without a second group to the roottransform
+    table = np.array([pivot_indices.get(group.name.lower(), -1) for group in mesh_object.vertex_groups] + [0],
+                     dtype=np.int32)
+
+    result = table[groups]
+    invalid = (groups >= 0) & (result < 0)
+    if invalid.any():
+        group = mesh_object.vertex_groups[int(groups[invalid][0])]
+        raise Exception(f'no matching armature bone found for vertex group \'{group.name}\'')
+    return result
 
-    for i, uv_layer in enumerate(mesh.uv_layers):
-        tx_coords = [None] * len(uv_layer.data)
-        for j, face in enumerate(b_mesh.faces):
-            for loop in face.loops:
-                vert_index = mesh.polygons[j].vertices[loop.index % 3]
-                if tx_coords[vert_index] is None:
-                    tx_coords[vert_index] = uv_layer.data[loop.index].uv
-                elif tx_coords[vert_index] != uv_layer.data[loop.index].uv:
-                    b_mesh.verts[vert_index].select_set(True)
-                    vert_index2 = mesh.polygons[j].vertices[(loop.index + 1) % 3]
-                    b_mesh.verts[vert_index2].select_set(True)
-                    vert_index3 = mesh.polygons[j].vertices[(loop.index - 1) % 3]
-                    b_mesh.verts[vert_index3].select_set(True)
 
-    split_edges = [e for e in b_mesh.edges if e.verts[0].select and e.verts[1].select]
+def get_bone_palette(hierarchy, rig, bone_indices):
+    # inverted rest pose matrices of the used bones and their rotations, the last entry is the identity
+    matrices = np.tile(np.identity(4), (len(hierarchy.pivots) + 1, 1, 1))
+    rotations = np.tile(np.identity(3), (len(hierarchy.pivots) + 1, 1, 1))
 
-    if len(split_edges) > 0:
-        bmesh.ops.split_edges(b_mesh, edges=split_edges)
+    for index in np.unique(bone_indices).tolist():
+        if index > 0:
+            matrix = rig.data.bones[hierarchy.pivots[index].name].matrix_local.inverted()
+        else:
+            matrix = rig.matrix_local.inverted()
+        _, rotation, _ = matrix.decompose()
+        matrices[index] = np.array(matrix)
+        rotations[index] = np.array(rotation.to_matrix())
+    return matrices, rotations
+
+
+def retrieve_vertices(context, mesh_struct, mesh_object, mesh, hierarchy, rig, source_vertices, loop_vertices):
+    # the data is gathered per blender vertex and then copied to the (split) exported vertices
+    count = len(source_vertices)
+    valid = True
+
+    _, _, scale = mesh_object.matrix_local.decompose()
+    positions = get_vectors(mesh.vertices, 'co') * np.array(scale, dtype=np.float32)
+    mesh.vertices.foreach_set('co', positions.ravel())
+    normals = get_vectors(mesh.vertices, 'normal')
+
+    group_counts, groups, weights = get_vertex_groups(mesh_object, mesh)
+    skinned = group_counts > 0
+    primary = np.full(len(mesh.vertices), -1, dtype=np.int32)
+    secondary = primary
+
+    if skinned.any():
+        for i in np.flatnonzero(group_counts > 2).tolist():
+            valid = False
+            context.error(
+                f'mesh \'{mesh_object.name}\' vertex {i} is influenced by more than 2 bones ({group_counts[i]})! '
+                f'Make sure you do weight painting on vertex basis not per face.')
+
+        for i in np.flatnonzero(~skinned).tolist():
+            valid = False
+            context.error(f'skinned mesh \'{mesh_object.name}\' vertex {i} is not rigged to any bone!')
+
+        bone_indices = get_bone_indices(hierarchy, mesh_object, groups)
+        bone_inf = weights[:, 0].astype(np.float64)
+        xtra_inf = weights[:, 1].astype(np.float64)
+
+        zero = skinned & (bone_inf < 0.01) & (xtra_inf < 0.01)
+        for i in np.flatnonzero(zero).tolist():
+            context.warning(f'mesh \'{mesh_object.name}\' vertex {i} both bone weights where 0!')
+        bone_inf[zero] = 1.0
+        xtra_inf[zero] = 0.0
+
+        total = bone_inf + xtra_inf
+        unnormalized = skinned & (np.abs(total - 1.0) > 0.1)
+        for i in np.flatnonzero(unnormalized).tolist():
+            context.warning(
+                f'mesh \'{mesh_object.name}\' vertex {i} both bone weights did not add up to 100%! '
+                f'({bone_inf[i]:.{2}f}, {xtra_inf[i]:.{2}f}). Will be normalized!')
+        bone_inf[unnormalized] /= total[unnormalized]
+        xtra_inf[unnormalized] /= total[unnormalized]
+
+        mesh_struct.multi_bone_skinned = bool((group_counts > 1).any())
+        influences = source_vertices[skinned[source_vertices]]
+        mesh_struct.vert_infs = [
+            VertexInfluence(bone_idx=bone_idx, xtra_idx=xtra_idx, bone_inf=bone_weight, xtra_inf=xtra_weight)
+            for (bone_idx, xtra_idx, bone_weight, xtra_weight) in zip(
+                bone_indices[influences, 0].tolist(), bone_indices[influences, 1].tolist(),
+                bone_inf[influences].tolist(), xtra_inf[influences].tolist())]
+
+        primary = np.where(skinned, bone_indices[:, 0], -1)
+        secondary = np.where(skinned & (xtra_inf > 0), bone_indices[:, 1], primary)
+        matrices, rotations = get_bone_palette(hierarchy, rig, np.concatenate((primary[skinned], secondary[skinned])))
+    else:
+        matrices = np.identity(4)[None]
+        rotations = np.identity(3)[None]
+
+    def transform(palette, vectors):
+        return np.einsum('nij,nj->ni', palette[:, :3, :3], vectors) + palette[:, :3, 3]
+
+    def rotate(palette, vectors):
+        return np.einsum('nij,nj->ni', palette, vectors)
+
+    positions = positions[source_vertices]
+    normals = normals[source_vertices]
+    primary = primary[source_vertices]
+    secondary = secondary[source_vertices]
+
+    mesh_struct.shade_ids = list(range(count))
+    mesh_struct.verts = to_vector_array(transform(matrices[primary], positions))
+    mesh_struct.verts_2 = to_vector_array(transform(matrices[secondary], positions))
+    mesh_struct.normals = to_vector_array(rotate(rotations[primary], normals))
+    mesh_struct.normals_2 = to_vector_array(rotate(rotations[secondary], normals))
+
+    # do NOT use the loop normals here! that might result in weird shading issues
+    vertices_with_loops, first = np.unique(loop_vertices[::-1], return_index=True)
+    last_loops = np.full(count, -1, dtype=np.int64)
+    last_loops[vertices_with_loops] = len(loop_vertices) - 1 - first
+
+    for i in np.flatnonzero(last_loops < 0).tolist():
+        context.warning(f'mesh \'{mesh_object.name}\' vertex {i} is not connected to any face!')
+
+    if mesh.uv_layers:
+        # in order to adapt to 3ds max orientation, vertices without a face only get dummys
+        has_loop = last_loops >= 0
+        tangents = normals.copy()
+        tangents[has_loop] = get_vectors(mesh.loops, 'bitangent')[last_loops[has_loop]]
+        bitangents = normals.copy()
+        bitangents[has_loop] = get_vectors(mesh.loops, 'tangent')[last_loops[has_loop]]
+        mesh_struct.tangents = to_vector_array(rotate(rotations[primary], tangents) * -1)
+        mesh_struct.bitangents = to_vector_array(rotate(rotations[primary], bitangents))
+
+    return valid
+
+
+def split_multi_uv_vertices(context, mesh, loop_vertex_indices):
+    # a vertex whose loops have different uv coordinates (in any uv layer) is split into one vertex per
+    # distinct set of uv coordinates, one of them keeps the index and the others are appended
+    # returns the blender vertex of each exported vertex and the exported vertex of each loop
+    count = len(mesh.vertices)
+    if not mesh.uv_layers or len(loop_vertex_indices) == 0:
+        return np.arange(count), loop_vertex_indices
+
+    keys = np.column_stack([loop_vertex_indices.astype(np.float64)]
+                           + [get_vectors(uv_layer.data, 'uv', 2) for uv_layer in mesh.uv_layers])
+    _, first_loops, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+    vertices = loop_vertex_indices[first_loops]
+    split = np.zeros(len(vertices), dtype=bool)
+    split[1:] = vertices[1:] == vertices[:-1]
+
+    exported = vertices.copy()
+    exported[split] = count + np.arange(np.count_nonzero(split))
+
+    if split.any():
         context.info(f'mesh \'{mesh.name}\' vertices have been split because of multiple uv coordinates per vertex!')
 
-    return b_mesh
-
+    return np.concatenate((np.arange(count), vertices[split])), exported[inverse.ravel()]
 
-def vertices_to_vectors(vertices):
-    vectors = []
-    for vert in vertices:
-        vectors.append(Vector(vert.co.xyz))
-    return vectors
 
+def create_aabbtree(mesh_struct, leaf_size=AABBTREE_LEAF_SIZE, method='SAH'):
+    # the triangles are reordered to match the leaf nodes, so the poly indices of the tree are the identity
+    positions = np.frombuffer(flat_vectors(mesh_struct.verts), dtype=np.float32).reshape(-1, 3)
+    triangles = np.array([triangle.vert_ids for triangle in mesh_struct.triangles], dtype=np.int64).reshape(-1, 3)
+    (order, bounds, links) = build_aabbtree(positions, triangles, leaf_size, method)
 
-def distance(vec1, vec2):
-    x = (vec1.x - vec2.x) ** 2
-    y = (vec1.y - vec2.y) ** 2
-    z = (vec1.z - vec2.z) ** 2
-    return (x + y + z) ** 0.5
+    mesh_struct.triangles = [mesh_struct.triangles[i] for i in order.tolist()]
 
+    nodes = []
+    for ((low, high), (front, back)) in zip(bounds.tolist(), links.tolist()):
+        node = AABBTreeNode(min=Vector(low), max=Vector(high))
+        if front & AABBTREE_LEAF_FLAG:
+            node.polys = Polys(begin=front & ~AABBTREE_LEAF_FLAG, count=back)
+        else:
+            node.children = Children(front=front, back=back)
+        nodes.append(node)
 
-def find_most_distant_point(vertex, vertices):
-    result = vertices[0]
-    dist = 0
-    for x in vertices:
-        curr_dist = distance(x, vertex)
-        if curr_dist > dist:
-            dist = curr_dist
-            result = x
-    return result
-
-
-def validate_all_points_inside_sphere(center, radius, vertices):
-    for vertex in vertices:
-        curr_dist = distance(vertex, center)
-        if curr_dist > radius:
-            delta = (curr_dist - radius) / 2
-            radius += delta
-            center += (vertex - center).normalized() * delta
-    return center, radius
-
+    mesh_struct.aabbtree = AABBTree(
+        header=AABBTreeHeader(node_count=len(nodes), poly_count=len(order)),
+        poly_indices=list(range(len(order))),
+        nodes=nodes)
 
-def calculate_mesh_sphere(mesh):
-    vertices = vertices_to_vectors(mesh.vertices)
-    x = find_most_distant_point(vertices[0], vertices)
-    y = find_most_distant_point(x, vertices)
-    z = (x - y) / 2
-    center = y + z
-    radius = z.length
 
-    return validate_all_points_inside_sphere(center, radius, vertices)
+def calculate_mesh_sphere(mesh, exact=False):
+    center, radius = bounding_sphere(get_vectors(mesh.vertices, 'co'), exact)
+    return Vector(center), radius
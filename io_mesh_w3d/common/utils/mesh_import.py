@@ -2,19 +2,28 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import bpy
-import bmesh
+import numpy as np
+from array import array
+from io_mesh_w3d.common.structs.mesh_structs.triangle import *
 from io_mesh_w3d.common.utils.material_import import *
 
 
 def create_mesh(context, mesh_struct, coll):
     context.info(f'creating mesh \'{mesh_struct.name()}\'')
 
-    triangles = []
-    for triangle in mesh_struct.triangles:
-        triangles.append(tuple(triangle.vert_ids))
+    # fill the mesh from flat buffers instead of from_pydata, which iterates over python tuples
+    vert_ids = flat_vert_ids(mesh_struct.triangles)
+    face_count = len(mesh_struct.triangles)
 
     mesh = bpy.data.meshes.new(mesh_struct.name())
-    mesh.from_pydata(mesh_struct.verts, [], triangles)
+    mesh.vertices.add(len(mesh_struct.verts))
+    mesh.vertices.foreach_set('co', flat_vectors(mesh_struct.verts))
+    mesh.loops.add(len(vert_ids))
+    mesh.loops.foreach_set('vertex_index', vert_ids)
+    mesh.polygons.add(face_count)
+    mesh.polygons.foreach_set('loop_start', array('i', range(0, len(vert_ids), 3)))
+    mesh.polygons.foreach_set('loop_total', array('i', [3]) * face_count)
+    mesh.update(calc_edges=True)
 
     mesh.normals_split_custom_set_from_vertices(mesh_struct.normals)
     mesh.use_auto_smooth = True
@@ -48,33 +57,36 @@ def create_mesh(context, mesh_struct, coll):
         constraint.track_axis = 'TRACK_X'
 
     if context.file_format == 'W3D':
+        faces_per_surface_type = dict()
         for i, triangle in enumerate(mesh_struct.triangles):
             surface_type_name = triangle.get_surface_type_name(context, i)
+            faces_per_surface_type.setdefault(surface_type_name, []).append(i)
+
+        for surface_type_name, faces in faces_per_surface_type.items():
             if surface_type_name not in mesh_ob.face_maps:
                 mesh_ob.face_maps.new(name=surface_type_name)
+            mesh_ob.face_maps[surface_type_name].add(faces)
 
-            mesh_ob.face_maps[surface_type_name].add([i])
+    loop_vertex_indices = get_loop_vertex_indices(mesh)
 
     for i, mat_pass in enumerate(mesh_struct.material_passes):
-        create_vertex_color_layer(mesh, mat_pass.dcg, 'DCG', i)
-        create_vertex_color_layer(mesh, mat_pass.dig, 'DIG', i)
-        create_vertex_color_layer(mesh, mat_pass.scg, 'SCG', i)
+        create_vertex_color_layer(mesh, mat_pass.dcg, 'DCG', i, loop_vertex_indices)
+        create_vertex_color_layer(mesh, mat_pass.dig, 'DIG', i, loop_vertex_indices)
+        create_vertex_color_layer(mesh, mat_pass.scg, 'SCG', i, loop_vertex_indices)
 
     principleds = []
 
     # vertex material stuff
     name = mesh_struct.name()
-    b_mesh = bmesh.new()
-    b_mesh.from_mesh(mesh)
 
     if mesh_struct.vert_materials:
-        create_vertex_material(context, principleds, mesh_struct, mesh, b_mesh, name, triangles)
+        create_vertex_material(context, principleds, mesh_struct, mesh, name, loop_vertex_indices)
 
         for i, shader in enumerate(mesh_struct.shaders):
             set_shader_properties(mesh.materials[min(i, len(mesh.materials) - 1)], shader)
 
     elif mesh_struct.prelit_vertex:
-        create_vertex_material(context, principleds, mesh_struct.prelit_vertex, mesh, b_mesh, name, triangles)
+        create_vertex_material(context, principleds, mesh_struct.prelit_vertex, mesh, name, loop_vertex_indices)
 
         for i, shader in enumerate(mesh_struct.prelit_vertex.shaders):
             set_shader_properties(mesh.materials[i], shader)
@@ -88,7 +100,7 @@ def create_mesh(context, mesh_struct, coll):
             principleds.append(principled)
 
         for mat_pass in mesh_struct.material_passes:
-            create_uvlayer(context, mesh, b_mesh, triangles, mat_pass)
+            create_uvlayer(context, mesh, mat_pass, loop_vertex_indices)
 
     mesh.update()
     if mesh.validate(verbose=True):
@@ -103,34 +115,50 @@ def rig_mesh(mesh_struct, hierarchy, rig, sub_object=None):
 
     if mesh_struct.is_skin():
         mesh = bpy.data.meshes[mesh_ob.name]
-        normals = mesh_struct.normals.copy()
-        for i, vert_inf in enumerate(mesh_struct.vert_infs):
-            weight = vert_inf.bone_inf
-            xtra_weight = vert_inf.xtra_inf
-
-            if weight < 0.01 and xtra_weight < 0.01:
-                weight = 1.0
-
-            pivot = hierarchy.pivots[vert_inf.bone_idx]
-            if vert_inf.bone_idx == 0 and rig is not None:
+        vert_infs = mesh_struct.vert_infs
+        count = len(vert_infs)
+
+        bone_ids = np.array([vert_inf.bone_idx for vert_inf in vert_infs], dtype=np.int32)
+        xtra_ids = np.array([vert_inf.xtra_idx for vert_inf in vert_infs], dtype=np.int32)
+        weights = np.array([vert_inf.bone_inf for vert_inf in vert_infs], dtype=np.float32)
+        xtra_weights = np.array([vert_inf.xtra_inf for vert_inf in vert_infs], dtype=np.float32)
+        weights[(weights < 0.01) & (xtra_weights < 0.01)] = 1.0
+
+        # create the vertex groups in the order the bones are referenced
+        referenced = np.stack([bone_ids, np.where(xtra_ids > 0, xtra_ids, -1)], axis=1).ravel()
+        referenced = referenced[referenced >= 0]
+        _, first_references = np.unique(referenced, return_index=True)
+        for bone_idx in referenced[np.sort(first_references)].tolist():
+            name = hierarchy.pivots[bone_idx].name
+            if name not in mesh_ob.vertex_groups:
+                mesh_ob.vertex_groups.new(name=name)
+
+        # one add call per unique (bone, weight) pair instead of one per vertex
+        add_weights(mesh_ob, hierarchy, bone_ids, weights, np.arange(count), 'REPLACE')
+        has_xtra = xtra_ids > 0
+        add_weights(mesh_ob, hierarchy, xtra_ids[has_xtra], xtra_weights[has_xtra], np.flatnonzero(has_xtra), 'ADD')
+
+        # matrix palette with one entry per pivot, indexed by the bone of each vertex
+        matrices = np.zeros((len(hierarchy.pivots), 4, 4), dtype=np.float32)
+        rotations = np.zeros((len(hierarchy.pivots), 3, 3), dtype=np.float32)
+        for bone_idx in np.unique(bone_ids).tolist():
+            if bone_idx == 0 and rig is not None:
                 matrix = rig.matrix_local
             else:
-                matrix = rig.data.bones[pivot.name].matrix_local
-
-            if pivot.name not in mesh_ob.vertex_groups:
-                mesh_ob.vertex_groups.new(name=pivot.name)
-            mesh_ob.vertex_groups[pivot.name].add([i], weight, 'REPLACE')
+                matrix = rig.data.bones[hierarchy.pivots[bone_idx].name].matrix_local
+            _, rotation, _ = matrix.decompose()
+            matrices[bone_idx] = matrix
+            rotations[bone_idx] = rotation.to_matrix()
 
-            if vert_inf.xtra_idx > 0:
-                xtra_pivot = hierarchy.pivots[vert_inf.xtra_idx]
-                if xtra_pivot.name not in mesh_ob.vertex_groups:
-                    mesh_ob.vertex_groups.new(name=xtra_pivot.name)
-                mesh_ob.vertex_groups[xtra_pivot.name].add([i], xtra_weight, 'ADD')
+        positions = np.array(flat_vectors(mesh_struct.verts), dtype=np.float32).reshape(-1, 3)
+        normals = np.array(flat_vectors(mesh_struct.normals), dtype=np.float32).reshape(-1, 3)
 
-            mesh.vertices[i].co = matrix @ mesh_struct.verts[i]
+        vert_matrices = matrices[bone_ids]
+        positions[:count] = np.einsum('nij,nj->ni', vert_matrices[:, :3, :3], positions[:count]) \
+            + vert_matrices[:, :3, 3]
+        normals[:count] = np.einsum('nij,nj->ni', rotations[bone_ids], normals[:count])
 
-            _, rotation, _ = matrix.decompose()
-            normals[i] = rotation @ mesh_struct.normals[i]
+        mesh.vertices.foreach_set('co', positions.ravel())
 
         modifier = mesh_ob.modifiers.new(rig.name, 'ARMATURE')
         modifier.object = rig
@@ -146,10 +174,22 @@ def rig_mesh(mesh_struct, hierarchy, rig, sub_object=None):
         rig_object(mesh_ob, hierarchy, rig, sub_object)
 
 
-def create_vertex_color_layer(mesh, colors, name, index):
+def add_weights(mesh_ob, hierarchy, bone_ids, weights, vertices, type):
+    groups = dict()
+    for (bone_idx, weight, vertex) in zip(bone_ids.tolist(), weights.tolist(), vertices.tolist()):
+        groups.setdefault((bone_idx, weight), []).append(vertex)
+
+    for (bone_idx, weight), indices in groups.items():
+        mesh_ob.vertex_groups[hierarchy.pivots[bone_idx].name].add(indices, weight, type)
+
+
+def create_vertex_color_layer(mesh, colors, name, index, loop_vertex_indices=None):
     if not colors:
         return
     layer = mesh.vertex_colors.new(name=f'{name}_{index}')
 
-    for i, loop in enumerate(mesh.loops):
-        layer.data[i].color = colors[loop.vertex_index].to_vector_rgba()
+    if loop_vertex_indices is None:
+        loop_vertex_indices = get_loop_vertex_indices(mesh)
+
+    values = np.array([(color.r, color.g, color.b, color.a) for color in colors], dtype=np.float32) / 255.0
+    layer.data.foreach_set('color', values[loop_vertex_indices].ravel())
@@ -0,0 +1,282 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+# converts .w3d and .w3x files into each other on struct level, without creating any blender data
+# usage: python -m io_mesh_w3d.convert --to W3X <file or directory>... [-o <output directory>] [-j <workers>]
+# outside of blender, where the addon in io_mesh_w3d/__init__.py can not be imported, use w3d_convert.py instead
+
+import argparse
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from io_mesh_w3d.common.structs.data_context import *
+from io_mesh_w3d.w3d import import_w3d
+from io_mesh_w3d.w3x import import_w3x
+from io_mesh_w3d.w3x.io_xml import *
+
+extensions = {'W3D': '.w3d', 'W3X': '.w3x'}
+
+
+class ConvertContext:
+    def __init__(self, filepath='', file_format='W3D', verbose=False):
+        self.filepath = filepath
+        self.file_format = file_format
+        self.filename_ext = extensions[file_format]
+        self.verbose = verbose
+        self.messages = []
+
+    def log(self, level, msg):
+        self.messages.append((level, msg))
+        if self.verbose:
+            print(f'{level}: {msg}')
+
+    def info(self, msg):
+        self.log('INFO', msg)
+
+    def warning(self, msg):
+        self.log('WARNING', msg)
+
+    def error(self, msg):
+        self.log('ERROR', msg)
+
+    def errors(self):
+        return [msg for (level, msg) in self.messages if level == 'ERROR']
+
+
+def load_structs(context, path):
+    data_context = DataContext()
+    if path.lower().endswith('.w3x'):
+        import_w3x.load_file(context, data_context, path, follow_includes=False)
+    else:
+        import_w3d.load_file(context, data_context, path)
+    return data_context
+
+
+def validate_structs(context, data_context):
+    structs = data_context.meshes + data_context.collision_boxes
+    if data_context.hierarchy is not None:
+        structs.append(data_context.hierarchy)
+    if data_context.hlod is not None:
+        structs.append(data_context.hlod)
+    if data_context.animation is not None:
+        structs.append(data_context.animation)
+
+    return all(struct.validate(context) for struct in structs)
+
+
+def prepare_mesh_for_w3x(context, mesh):
+    if not mesh.vert_materials:
+        return
+
+    context.warning(f'mesh \'{mesh.name()}\' uses vertex materials, which are not supported in W3X file format!')
+    for mat_pass in mesh.material_passes:
+        if not mat_pass.tx_coords and mat_pass.tx_stages and mat_pass.tx_stages[0].tx_coords:
+            mat_pass.tx_coords = mat_pass.tx_stages[0].tx_coords[0]
+
+
+def save_w3d(context, data_context, path):
+    structs = []
+    if data_context.hierarchy is not None:
+        data_context.hierarchy.header.num_pivots = len(data_context.hierarchy.pivots)
+        structs.append(data_context.hierarchy)
+    structs += data_context.collision_boxes
+    structs += data_context.dazzles
+    structs += data_context.meshes
+    if data_context.hlod is not None:
+        structs.append(data_context.hlod)
+    if data_context.animation is not None:
+        structs.append(data_context.animation)
+    if data_context.compressed_animation is not None:
+        structs.append(data_context.compressed_animation)
+
+    try:
+        with open(path, 'wb') as file:
+            for struct in structs:
+                struct.write(file)
+    except BaseException:
+        # like for W3X, no truncated file is left behind
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def save_w3x(context, data_context, path):
+    with writing_root(open_root(path)) as root:
+        if data_context.hierarchy is not None:
+            data_context.hierarchy.create(root)
+
+        for box in data_context.collision_boxes:
+            box.create(root)
+
+        if data_context.dazzles:
+            context.warning('dazzles are not supported in W3X file format!')
+
+        for mesh in data_context.meshes:
+            prepare_mesh_for_w3x(context, mesh)
+            mesh.create(root)
+
+        if data_context.hlod is not None:
+            data_context.hlod.create(root)
+
+        if data_context.animation is not None:
+            data_context.animation.create(root)
+
+        if data_context.compressed_animation is not None:
+            context.warning('compressed animations are not supported in W3X file format!')
+
+
+def convert_file(source, target, file_format, verbose=False):
+    context = ConvertContext(filepath=target, file_format=file_format, verbose=verbose)
+    data_context = load_structs(context, source)
+
+    if context.errors():
+        return context
+
+    if not validate_structs(context, data_context):
+        context.error(f'file \'{source}\' can not be converted to {file_format}')
+        return context
+
+    context.info(f'Saving file: {target}')
+    if file_format == 'W3X':
+        save_w3x(context, data_context, target)
+    else:
+        save_w3d(context, data_context, target)
+    return context
+
+
+def convert_worker(source, target, file_format, verbose=False):
+    # runs in a worker process, so any failure is turned into an error message of that file
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        context = convert_file(source, target, file_format, verbose)
+    except Exception:
+        context = ConvertContext(filepath=target, file_format=file_format, verbose=verbose)
+        context.error(f'failed to convert \'{source}\':\n{traceback.format_exc()}')
+    return source, target, context.messages
+
+
+class ConvertReport:
+    def __init__(self, file_format='W3D'):
+        self.file_format = file_format
+        self.results = []
+        self.duration = 0.0
+
+    def add(self, source, target, messages):
+        self.results.append((source, target, messages))
+
+    def failed(self):
+        return [(source, messages) for (source, _, messages) in self.results
+                if any(level == 'ERROR' for (level, _) in messages)]
+
+    def warnings(self):
+        return sum(1 for (_, _, messages) in self.results for (level, _) in messages if level == 'WARNING')
+
+    def summary(self):
+        lines = []
+        for (source, messages) in self.failed():
+            lines.append(f'failed: {source}')
+            for (level, msg) in messages:
+                if level == 'ERROR':
+                    lines.append(f'    {msg}')
+        lines.append(f'converted {len(self.results) - len(self.failed())} of {len(self.results)} files '
+                     f'to {self.file_format} in {self.duration:.2f}s ({self.warnings()} warnings)')
+        return '\n'.join(lines)
+
+
+def convert_files(files, file_format, workers=None, verbose=False, callback=None):
+    report = ConvertReport(file_format)
+    start = time.perf_counter()
+
+    if workers == 1 or len(files) < 2:
+        for (source, target) in files:
+            result = convert_worker(source, target, file_format, verbose)
+            report.add(*result)
+            if callback is not None:
+                callback(*result)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(convert_worker, source, target, file_format, verbose)
+                       for (source, target) in files]
+            for future in futures:
+                result = future.result()
+                report.add(*result)
+                if callback is not None:
+                    callback(*result)
+
+    report.duration = time.perf_counter() - start
+    return report
+
+
+def target_path(source, source_dir, output_dir, file_format):
+    path = os.path.splitext(source)[0] + extensions[file_format]
+    if output_dir is None:
+        return path
+    return os.path.join(output_dir, os.path.relpath(path, source_dir))
+
+
+def source_extension(file_format):
+    return extensions['W3X' if file_format == 'W3D' else 'W3D']
+
+
+def find_files(sources, output_dir, file_format):
+    source_ext = source_extension(file_format)
+    result = []
+
+    for source in sources:
+        if os.path.isfile(source):
+            if source.lower().endswith(source_ext):
+                result.append((source, target_path(source, os.path.dirname(source), output_dir, file_format)))
+            continue
+
+        for directory, _, files in os.walk(source):
+            for file in sorted(files):
+                if file.lower().endswith(source_ext):
+                    path = os.path.join(directory, file)
+                    result.append((path, target_path(path, source, output_dir, file_format)))
+    return result
+
+
+def invalid_sources(sources, file_format):
+    # files which are not in the source format, these would otherwise be converted onto themselves
+    source_ext = source_extension(file_format)
+    return [source for source in sources if os.path.isfile(source) and not source.lower().endswith(source_ext)]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='w3d_convert.py',
+        description='Converts .w3d and .w3x files into each other without creating any blender data')
+    parser.add_argument('sources', nargs='+', help='files or directories to convert (directories recursively)')
+    parser.add_argument('--to', dest='file_format', choices=['W3D', 'W3X'], type=str.upper, required=True,
+                        help='the target file format')
+    parser.add_argument('-o', '--output', default=None,
+                        help='output directory, the files are written next to their sources if omitted')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes, defaults to the number of processors')
+    parser.add_argument('-v', '--verbose', action='store_true', help='print all messages')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = find_files(args.sources, args.output, args.file_format)
+
+    def print_messages(source, target, messages):
+        for (level, msg) in messages:
+            if level == 'WARNING' or (args.verbose and level == 'INFO'):
+                print(f'{level}: {source}: {msg}')
+
+    invalid = invalid_sources(args.sources, args.file_format)
+    for source in invalid:
+        print(f'ERROR: {source}: is no {source_extension(args.file_format)} file, it is not converted')
+
+    report = convert_files(files, args.file_format, args.jobs, callback=print_messages)
+    print(report.summary())
+    return 1 if report.failed() or invalid else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
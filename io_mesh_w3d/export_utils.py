@@ -57,7 +57,9 @@ def retrieve_data(context, export_settings):
         hlod=hlod)
 
     if 'M' in export_mode:
-        (meshes, textures) = retrieve_meshes(context, hierarchy, rig, container_name)
+        (meshes, textures) = retrieve_meshes(context, hierarchy, rig, container_name,
+                                             exact_spheres=export_settings.get('exact_bounding_spheres', False),
+                                             create_aabbtrees=export_settings.get('create_aabbtrees', False))
         data_context.meshes = meshes
         data_context.textures = textures
         if not data_context.meshes:
@@ -84,8 +86,26 @@ def retrieve_data(context, export_settings):
                 return None
 
     if 'A' in export_mode:
-        timecoded = export_settings['compression'] == 'TC'
-        data_context.animation = retrieve_animation(context, container_name, hierarchy, rig, timecoded)
+        compression = export_settings['compression']
+        if compression == 'AD' and context.file_format == 'W3X':
+            context.warning('adaptive delta compression is not supported in W3X file format, '
+                            'exporting uncompressed animation!')
+            compression = 'U'
+        elif compression == 'AUTO' and context.file_format == 'W3X':
+            context.warning('automatic compression is not supported in W3X file format, '
+                            'exporting uncompressed animation!')
+            compression = 'U'
+
+        timecoded = compression == 'TC'
+        max_error = 0.0
+        if compression != 'U':
+            max_error = export_settings.get('animation_max_error', ANIMATION_MAX_ERROR)
+        data_context.animation = retrieve_animation(context, container_name, hierarchy, rig, timecoded, max_error)
+        remove_redundant_channels(context, data_context.animation, hierarchy, max_error)
+        if compression == 'AD' and data_context.animation.channels:
+            data_context.animation = compress_adaptive_delta(context, data_context.animation, max_error)
+        elif compression == 'AUTO' and data_context.animation.channels:
+            data_context.animation = compress_auto(context, data_context.animation, hierarchy, max_error)
         if not data_context.animation.validate(context):
             context.error('aborting export!')
             return None
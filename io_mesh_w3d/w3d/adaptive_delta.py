@@ -2,6 +2,9 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import math
+import numpy as np
+from mathutils import Quaternion
+from io_mesh_w3d.w3d.structs.compressed_animation import *
 
 
 def fill_with_exponents_of_10(table):
@@ -64,70 +67,125 @@ def set_deltas(bytes, num_bits):
             byte = bytes[i]
             # Bitflip
             byte -= 128
-            if byte < -127:
+            if byte < -128:
                 byte += 256
             result[i] = byte
     return result
 
 
+def unpack_deltas(delta_bytes, num_bits):
+    # blocks x 16 deltas of the delta bytes of all blocks, same as get_deltas
+    data = np.array(delta_bytes, dtype=np.int8).reshape(len(delta_bytes), -1)
+    if num_bits == 4:
+        lower = ((data & 0x0F) ^ 8) - 8
+        upper = data >> 4
+        return np.stack((lower, upper), axis=2).reshape(len(data), -1)
+    return data ^ np.int8(-128)
+
+
 def decode(channel_type, vector_len, num_time_codes, scale, data):
+    # returns a frames x vector_len array, quaternions in blender order (w, x, y, z)
     scale_factor = 1.0
     if data.bit_count == 8:
         scale_factor /= 16.0
 
-    result = [None] * num_time_codes
-    result[0] = data.initial_value
-
-    for i, delta_block in enumerate(data.delta_blocks):
-        delta_scale = scale * scale_factor * DELTA_TABLE[delta_block.block_index]
-        deltas = get_deltas(delta_block.delta_bytes, data.bit_count)
-
-        for j, delta in enumerate(deltas):
-            idx = int(i / vector_len) * 16 + j + 1
-            if idx >= num_time_codes:
-                break
-
-            if channel_type == 6:
-                # shift from wxyz to xyzw
-                index = (delta_block.vector_index + 1) % 4
-                value = result[idx - 1][index] + delta_scale * delta
-                if result[idx] is None:
-                    result[idx] = result[idx - 1].copy()
-                result[idx][index] = value
-            else:
-                result[idx] = result[idx - 1] + delta_scale * delta
+    if channel_type == 6:
+        initial_value = np.array(tuple(data.initial_value), dtype=np.float64)[[1, 2, 3, 0]]
+    else:
+        initial_value = np.full(vector_len, data.initial_value, dtype=np.float64)
+
+    result = np.empty((num_time_codes, vector_len))
+    if num_time_codes == 0:
+        return result
+    result[0] = initial_value
+
+    deltas = np.zeros((num_time_codes - 1, vector_len))
+    if data.delta_blocks:
+        block_indices = np.array([block.block_index for block in data.delta_blocks])
+        steps = scale * scale_factor * np.array(DELTA_TABLE)[block_indices]
+        block_deltas = unpack_deltas([block.delta_bytes for block in data.delta_blocks], data.bit_count)
+        block_deltas = block_deltas * steps[:, None]
+
+        # the blocks are stored per 16 frames, one block for each vector component
+        block_deltas = block_deltas.reshape(-1, vector_len, 16).transpose(0, 2, 1).reshape(-1, vector_len)
+        count = min(len(deltas), len(block_deltas))
+        deltas[:count] = block_deltas[:count]
+
+    result[1:] = initial_value + np.cumsum(deltas, axis=0)
+    if channel_type == 6:
+        # shift from xyzw to wxyz
+        return result[:, [3, 0, 1, 2]]
     return result
 
 
-def encode(channel, num_bits):
-    scale_factor = 1.0
-    if num_bits == 8:
-        scale_factor /= 16.0
-
-    scale = 0.07435  # how to get this ???
-
-    num_time_codes = len(channel.data) - 1  # minus initial value
-    num_delta_blocks = int(num_time_codes / 16) + 1
-    deltas = [0x00] * (num_delta_blocks * 16)
-
-    default_value = None
-
-    for i, value in enumerate(channel.data):
-        if i == 0:
-            default_value = value
-            continue
-
-        block_index = 33  # how to get this one?
-
-        old = default_value
-        # if i > 1:
-        #    channel.data[i - 1]
-        delta = value - old
-        delta /= (scale_factor * scale * DELTA_TABLE[block_index])
-
-        delta = int(delta)
-        # print("delta: " + str(delta) + " index: " + str(block_index))
-        deltas[i - 1] = delta
-
-    deltas = set_deltas(deltas, num_bits)
-    return deltas
+def get_components(channel_type, values):
+    # frames x vector_len array of the channel values, quaternions in file order (x, y, z, w)
+    if channel_type != 6:
+        return np.asarray(values, dtype=np.float64).reshape(-1, 1)
+
+    quaternions = np.array([tuple(value) for value in values], dtype=np.float64).reshape(-1, 4)
+    # q and -q are the same rotation, keep consecutive quaternions in the same hemisphere to avoid huge deltas
+    flips = np.cumsum((quaternions[1:] * quaternions[:-1]).sum(axis=1) < 0) % 2
+    quaternions[1:][flips == 1] *= -1
+    return quaternions[:, [1, 2, 3, 0]]
+
+
+def encode_block(starts, targets, steps, low, high):
+    # quantizes the deltas of a block for all delta table entries at once, each step is based on the reconstructed
+    # value of the previous frame so the quantization errors do not add up
+    values = np.tile(starts, (len(steps), 1))
+    codes = np.empty((len(targets), len(steps), len(starts)), dtype=np.int64)
+    errors = np.zeros((len(steps), len(starts)))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j, target in enumerate(targets):
+            code = np.clip(np.nan_to_num(np.rint((target - values) / steps[:, None])), low, high)
+            values = values + code * steps[:, None]
+            codes[j] = code
+            errors = np.maximum(errors, np.abs(values - target))
+
+    best = np.argmin(errors, axis=0)
+    columns = np.arange(len(starts))
+    return best, codes[:, best, columns].T, values[best, columns], errors[best, columns]
+
+
+def encode(channel_type, vector_len, values, num_bits=4):
+    # returns the channel scale, the AdaptiveDeltaData of the values and the max error of the decoded values
+    # the scale maps the largest delta onto the largest code, so the sine part of the delta table (1.0 down to ~0.0)
+    # covers all blocks, the table entry of each block of 16 frames is the one with the smallest error
+    components = get_components(channel_type, values)
+    count = len(components)
+    (low, high) = (-8, 7) if num_bits == 4 else (-128, 127)
+    scale_factor = 1.0 if num_bits == 4 else 1.0 / 16.0
+
+    deltas = np.abs(np.diff(components, axis=0))
+    scale = float(np.float32(deltas.max() / (high * scale_factor))) if deltas.size else 0.0
+
+    # the initial value and the scale are stored as floats
+    current = components[0].astype(np.float32).astype(np.float64)
+    if channel_type == 6:
+        initial_value = Quaternion(tuple(current[[3, 0, 1, 2]]))
+    else:
+        initial_value = float(current[0])
+
+    num_blocks = (count + 15) >> 4
+    targets = np.empty((num_blocks * 16 + 1, vector_len))
+    targets[:count] = components
+    targets[count:] = components[-1]
+    steps = scale * scale_factor * np.array(DELTA_TABLE)
+
+    data = AdaptiveDeltaData(initial_value=initial_value, bit_count=num_bits)
+    max_error = 0.0
+    for i in range(num_blocks):
+        block_targets = targets[i * 16 + 1:i * 16 + 17]
+        valid = max(0, min(16, count - 1 - i * 16))
+        (indices, codes, current, errors) = encode_block(current, block_targets[:valid], steps, low, high)
+        for vector_index in range(vector_len):
+            block_codes = np.zeros(16, dtype=np.int64)
+            block_codes[:valid] = codes[vector_index]
+            data.delta_blocks.append(AdaptiveDeltaBlock(
+                vector_index=vector_index,
+                block_index=int(indices[vector_index]),
+                delta_bytes=set_deltas(block_codes.tolist(), num_bits)))
+        max_error = max(max_error, float(errors.max()))
+    return scale, data, max_error
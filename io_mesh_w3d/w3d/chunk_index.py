@@ -0,0 +1,118 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+from io_mesh_w3d.common.structs.animation import *
+from io_mesh_w3d.common.structs.collision_box import *
+from io_mesh_w3d.common.structs.hierarchy import *
+from io_mesh_w3d.common.structs.hlod import *
+from io_mesh_w3d.common.structs.mesh import *
+from io_mesh_w3d.w3d.structs.dazzle import *
+from io_mesh_w3d.w3d.structs.compressed_animation import *
+
+
+class ChunkEntry:
+    def __init__(self, chunk_type=0, offset=0, size=0):
+        self.chunk_type = chunk_type
+        self.offset = offset  # start of the payload, right after the chunk head
+        self.size = size
+
+    def end(self):
+        return self.offset + self.size
+
+
+chunk_readers = {
+    W3D_CHUNK_MESH: Mesh.read,
+    W3D_CHUNK_HIERARCHY: Hierarchy.read,
+    W3D_CHUNK_HLOD: HLod.read,
+    W3D_CHUNK_ANIMATION: Animation.read,
+    W3D_CHUNK_COMPRESSED_ANIMATION: CompressedAnimation.read,
+    W3D_CHUNK_BOX: lambda context, io_stream, chunk_end: CollisionBox.read(io_stream),
+    W3D_CHUNK_DAZZLE: Dazzle.read}
+
+header_readers = {
+    W3D_CHUNK_MESH: (W3D_CHUNK_MESH_HEADER, MeshHeader.read),
+    W3D_CHUNK_HIERARCHY: (W3D_CHUNK_HIERARCHY_HEADER, HierarchyHeader.read),
+    W3D_CHUNK_HLOD: (W3D_CHUNK_HLOD_HEADER, HLodHeader.read),
+    W3D_CHUNK_ANIMATION: (W3D_CHUNK_ANIMATION_HEADER, AnimationHeader.read),
+    W3D_CHUNK_COMPRESSED_ANIMATION: (W3D_CHUNK_COMPRESSED_ANIMATION_HEADER, CompressedAnimationHeader.read)}
+
+
+class W3DChunkIndex:
+    def __init__(self, context, path):
+        self.context = context
+        self.path = path
+        self.io_stream = MappedStream.open(path)
+        self.entries = []
+        self.structs = dict()
+        self.headers = dict()
+
+        while self.io_stream.tell() + HEAD <= self.io_stream.end:
+            chunk_type, chunk_size, chunk_end = read_chunk_head(self.io_stream)
+            self.entries.append(ChunkEntry(chunk_type, self.io_stream.tell(), chunk_size))
+            self.io_stream.seek(chunk_end)
+
+    def close(self):
+        self.io_stream.close()
+
+    def find(self, chunk_type):
+        return [entry for entry in self.entries if entry.chunk_type == chunk_type]
+
+    def contains(self, chunk_type):
+        return any(entry.chunk_type == chunk_type for entry in self.entries)
+
+    def get(self, entry):
+        if entry not in self.structs:
+            if entry.chunk_type not in chunk_readers:
+                self.context.warning(f'chunk_type {hex(entry.chunk_type)} can not be decoded by the chunk index')
+                return None
+            self.io_stream.seek(entry.offset)
+            chunk = self.io_stream.view(entry.end())
+            self.structs[entry] = chunk_readers[entry.chunk_type](self.context, chunk, entry.end())
+        return self.structs[entry]
+
+    def get_header(self, entry):
+        if entry in self.structs and entry.chunk_type in header_readers:
+            return self.structs[entry].header
+
+        if entry not in self.headers:
+            if entry.chunk_type not in header_readers:
+                return None
+            (header_type, read_func) = header_readers[entry.chunk_type]
+            self.io_stream.seek(entry.offset)
+            chunk = self.io_stream.view(entry.end())
+            self.headers[entry] = None
+
+            while chunk.tell() + HEAD <= entry.end():
+                (chunk_type, _, subchunk_end) = read_chunk_head(chunk)
+                if chunk_type == header_type:
+                    self.headers[entry] = read_func(chunk)
+                    break
+                chunk.seek(subchunk_end)
+        return self.headers[entry]
+
+    def first(self, chunk_type):
+        entries = self.find(chunk_type)
+        if not entries:
+            return None
+        return self.get(entries[0])
+
+    def first_header(self, chunk_type):
+        entries = self.find(chunk_type)
+        if not entries:
+            return None
+        return self.get_header(entries[0])
+
+    def meshes(self):
+        return [self.get(entry) for entry in self.find(W3D_CHUNK_MESH)]
+
+    def hierarchy(self):
+        return self.first(W3D_CHUNK_HIERARCHY)
+
+    def hlod(self):
+        return self.first(W3D_CHUNK_HLOD)
+
+    def animation(self):
+        return self.first(W3D_CHUNK_ANIMATION)
+
+    def compressed_animation(self):
+        return self.first(W3D_CHUNK_COMPRESSED_ANIMATION)
@@ -1,7 +1,16 @@
 # <pep8 compliant>
 # Written by Stephan Vedder and Michael Schnabel
 
-from io_mesh_w3d.import_utils import *
+import os
+
+try:
+    import bpy
+except ImportError:
+    # without blender only the files can be loaded, e.g. by the converter
+    bpy = None
+
+if bpy is not None:
+    from io_mesh_w3d.import_utils import *
 from io_mesh_w3d.common.structs.collision_box import *
 from io_mesh_w3d.common.structs.data_context import *
 from io_mesh_w3d.common.structs.hierarchy import *
@@ -9,6 +18,7 @@ from io_mesh_w3d.common.structs.hlod import *
 from io_mesh_w3d.common.structs.mesh import *
 from io_mesh_w3d.w3d.structs.dazzle import *
 from io_mesh_w3d.w3d.structs.compressed_animation import *
+from io_mesh_w3d.w3d.chunk_index import W3DChunkIndex
 
 
 def load_file(context, data_context, path=None):
@@ -22,81 +32,82 @@ def load_file(context, data_context, path=None):
         context.error(f'file not found: {path}')
         return
 
-    file = open(path, 'rb')
-    filesize = os.path.getsize(path)
+    file = MappedStream.open(path)
 
-    while file.tell() < filesize:
+    while file.tell() < file.end:
         chunk_type, chunk_size, chunk_end = read_chunk_head(file)
+        chunk = file.view(chunk_end)
 
         if chunk_type == W3D_CHUNK_MESH:
-            data_context.meshes.append(Mesh.read(context, file, chunk_end))
+            data_context.meshes.append(Mesh.read(context, chunk, chunk_end))
         elif chunk_type == W3D_CHUNK_HIERARCHY:
             if data_context.hierarchy is None:
-                data_context.hierarchy = Hierarchy.read(context, file, chunk_end)
+                data_context.hierarchy = Hierarchy.read(context, chunk, chunk_end)
             else:
                 context.warning('-> already got one hierarchy chunk (skipping this one)!')
-                file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_HLOD:
             if data_context.hlod is None:
-                data_context.hlod = HLod.read(context, file, chunk_end)
+                data_context.hlod = HLod.read(context, chunk, chunk_end)
             else:
                 context.warning('-> already got one hlod chunk (skipping this one)!')
-                file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_ANIMATION:
             if data_context.animation is None and data_context.compressed_animation is None:
-                data_context.animation = Animation.read(context, file, chunk_end)
+                data_context.animation = Animation.read(context, chunk, chunk_end)
             else:
                 context.warning('-> already got one animation chunk (skipping this one)!')
-                file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_COMPRESSED_ANIMATION:
             if data_context.animation is None and data_context.compressed_animation is None:
-                data_context.compressed_animation = CompressedAnimation.read(context, file, chunk_end)
+                data_context.compressed_animation = CompressedAnimation.read(context, chunk, chunk_end)
             else:
                 context.warning('-> already got one animation chunk (skipping this one)!')
-                file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_BOX:
-            data_context.collision_boxes.append(CollisionBox.read(file))
+            data_context.collision_boxes.append(CollisionBox.read(chunk))
         elif chunk_type == W3D_CHUNK_DAZZLE:
-            data_context.dazzles.append(Dazzle.read(context, file, chunk_end))
+            data_context.dazzles.append(Dazzle.read(context, chunk, chunk_end))
         elif chunk_type == W3D_CHUNK_MORPH_ANIMATION:
             context.info('-> morph animation chunk is not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_HMODEL:
             context.info('-> hmodel chnuk is not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_LODMODEL:
             context.info('-> lodmodel chunk is not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_COLLECTION:
             context.info('-> collection chunk not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_POINTS:
             context.info('-> points chunk is not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_LIGHT:
             context.info('-> light chunk is not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_EMITTER:
             context.info('-> emitter chunk is not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_AGGREGATE:
             context.info('-> aggregate chunk is not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_NULL_OBJECT:
             context.info('-> null object chunkt is not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_LIGHTSCAPE:
             context.info('-> lightscape chunk is not supported')
-            file.seek(chunk_size, 1)
         elif chunk_type == W3D_CHUNK_SOUNDROBJ:
             context.info('-> soundobj chunk is not supported')
-            file.seek(chunk_size, 1)
         else:
-            skip_unknown_chunk(context, file, chunk_type, chunk_size)
+            skip_unknown_chunk(context, chunk, chunk_type, chunk_size)
+
+        file.seek(chunk_end)
 
     file.close()
 
 
+def load_hierarchy(context, data_context, path):
+    # only the hierarchy is used from a skeleton file, so only its chunk is decoded
+    path = insensitive_path(path)
+    context.info(f'Loading file: {path}')
+
+    if not os.path.exists(path):
+        context.error(f'file not found: {path}')
+        return
+
+    index = W3DChunkIndex(context, path)
+    data_context.hierarchy = index.hierarchy()
+    index.close()
+
+
 ##########################################################################
 # Load
 ##########################################################################
@@ -128,7 +139,7 @@ def load(context):
                 compressed_animation.header.hierarchy_name.lower() + '.w3d'
 
         if sklpath:
-            load_file(context, data_context, sklpath)
+            load_hierarchy(context, data_context, sklpath)
             if data_context.hierarchy is None:
                 context.error(
                     f'hierarchy file not found: {sklpath}. Make sure it is right next to the file you are importing.')
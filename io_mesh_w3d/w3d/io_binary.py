@@ -1,7 +1,11 @@
 # <pep8 compliant>
 # Written by Stephan Vedder and Michael Schnabel
 
+import mmap
+import os
 import struct
+import sys
+from array import array
 
 from mathutils import Vector, Quaternion
 
@@ -214,6 +218,33 @@ def read_list(io_stream, chunk_end, read_func):
     return result
 
 
+def read_struct_array(io_stream, chunk_end, fmt):
+    # decode the whole payload with a single read instead of one read per field
+    data = read_buffer(io_stream, chunk_end - io_stream.tell())
+    return struct.iter_unpack(fmt, data[:len(data) - len(data) % struct.calcsize(fmt)])
+
+
+def read_typed_array(io_stream, chunk_end, typecode):
+    # w3d data is little endian, array uses the native byte order
+    data = read_buffer(io_stream, chunk_end - io_stream.tell())
+    result = array(typecode)
+    result.frombytes(data[:len(data) - len(data) % result.itemsize])
+    if sys.byteorder == 'big':
+        result.byteswap()
+    return result
+
+
+def write_typed_array(data, io_stream):
+    if sys.byteorder == 'big':
+        data = array(data.typecode, data)
+        data.byteswap()
+    io_stream.write(data.tobytes())
+
+
+def read_long_array(io_stream, chunk_end):
+    return [value for (value,) in read_struct_array(io_stream, chunk_end, '<l')]
+
+
 def read_fixed_list(io_stream, count, read_func, par1=None):
     result = []
     for _ in range(count):
@@ -231,3 +262,69 @@ def read_padding(io_stream, count):
 def write_padding(io_stream, count):
     for _ in range(count):
         write_ubyte(0, io_stream)
+
+
+def read_buffer(io_stream, size):
+    if isinstance(io_stream, MappedStream):
+        return io_stream.read_view(size)
+    return io_stream.read(size)
+
+
+def insensitive_path(path):
+    # find the io_stream on unix
+    directory = os.path.dirname(path)
+    name = os.path.basename(path)
+
+    for io_stream_name in os.listdir(directory):
+        if io_stream_name.lower() == name.lower():
+            path = os.path.join(directory, io_stream_name)
+    return path
+
+
+# read only io_stream on top of a memory mapped file, offsets are always absolute
+# so the chunk ends returned by read_chunk_head stay valid for the (zero-copy) views
+class MappedStream:
+    def __init__(self, buffer, position=0, end=None, mapping=None):
+        self.buffer = buffer
+        self.position = position
+        self.end = len(buffer) if end is None else end
+        self.mapping = mapping
+
+    @staticmethod
+    def open(path):
+        if os.path.getsize(path) == 0:
+            return MappedStream(memoryview(b''))
+
+        with open(path, 'rb') as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return MappedStream(memoryview(mapping), mapping=mapping)
+
+    def view(self, chunk_end):
+        return MappedStream(self.buffer, self.position, min(chunk_end, self.end))
+
+    def read_view(self, size=-1):
+        start = min(self.position, self.end)
+        stop = self.end if size < 0 else min(start + size, self.end)
+        self.position = stop
+        return self.buffer[start:stop]
+
+    def read(self, size=-1):
+        return self.read_view(size).tobytes()
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.position
+        elif whence == 2:
+            offset += self.end
+        self.position = offset
+        return self.position
+
+    def close(self):
+        if self.mapping is None:
+            return
+        self.buffer.release()
+        self.mapping.close()
+        self.mapping = None
@@ -384,7 +384,12 @@ class CompressedAnimation:
         self.motion_channels = motion_channels if motion_channels is not None else []
 
     def validate(self, context, w3x=False):
-        if not self.time_coded_channels:
+        if self.header.flavor == ADAPTIVE_DELTA_FLAVOR:
+            channels = self.adaptive_delta_channels + self.motion_channels + self.time_coded_bit_channels
+        else:
+            channels = self.time_coded_channels + self.time_coded_bit_channels
+
+        if not channels:
             context.error('Scene does not contain any animation data')
             return False
 
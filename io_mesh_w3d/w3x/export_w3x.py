@@ -14,8 +14,13 @@ def save(context, export_settings, data_context):
     export_mode = export_settings['mode']
     context.info(f'export mode: {export_mode}')
 
-    root = create_root()
-    includes = create_node(root, 'Includes')
+    if export_mode not in ['M', 'HM', 'HAM', 'A', 'H']:
+        context.error(f'unsupported export mode: \'{export_mode}\', aborting export!')
+        return {'CANCELLED'}
+
+    # the includes are collected first, since the xml data is streamed into the file in order
+    includes = []
+    structs = []
 
     directory = os.path.dirname(context.filepath) + os.path.sep
 
@@ -24,14 +29,13 @@ def save(context, export_settings, data_context):
             context.warning('Scene does contain multiple meshes, exporting only the first with export mode M!')
         data_context.meshes[0].header.container_name = ''
         data_context.meshes[0].header.mesh_name = data_context.container_name
-        data_context.meshes[0].create(root)
+        structs.append(data_context.meshes[0])
 
     elif export_mode == 'HM':
         if export_settings['use_existing_skeleton'] or export_settings['individual_files']:
-            hierarchy_include = Include(type='all', source='ART:' + data_context.hierarchy.name() + '.w3x')
-            hierarchy_include.create(includes)
+            includes.append(Include(type='all', source='ART:' + data_context.hierarchy.name() + '.w3x'))
         else:
-            data_context.hierarchy.create(root)
+            structs.append(data_context.hierarchy)
 
         if export_settings['individual_files']:
             if not export_settings['use_existing_skeleton']:
@@ -41,8 +45,7 @@ def save(context, export_settings, data_context):
 
         for texture in data_context.textures:
             id = texture.rsplit('.', 1)[0]
-            texture_include = Include(type='all', source='ART:' + id + '.xml')
-            texture_include.create(includes)
+            includes.append(Include(type='all', source='ART:' + id + '.xml'))
 
             if export_settings['create_texture_xmls']:
                 path = directory + id + '.xml'
@@ -51,28 +54,26 @@ def save(context, export_settings, data_context):
 
         for box in data_context.collision_boxes:
             if export_settings['individual_files']:
-                box_include = Include(type='all', source='ART:' + box.name_ + '.w3x')
-                box_include.create(includes)
+                includes.append(Include(type='all', source='ART:' + box.name_ + '.w3x'))
                 path = directory + box.name_ + context.filename_ext
                 context.info('Saving file :' + path)
                 write_struct(box, path)
             else:
-                box.create(root)
+                structs.append(box)
 
         for mesh in data_context.meshes:
             if export_settings['individual_files']:
-                mesh_include = Include(type='all', source='ART:' + mesh.identifier() + '.w3x')
-                mesh_include.create(includes)
+                includes.append(Include(type='all', source='ART:' + mesh.identifier() + '.w3x'))
                 path = directory + mesh.identifier() + context.filename_ext
                 context.info('Saving file :' + path)
                 write_struct(mesh, path)
             else:
-                mesh.create(root)
+                structs.append(mesh)
 
-        data_context.hlod.create(root)
+        structs.append(data_context.hlod)
 
     elif export_mode == 'HAM':
-        data_context.hierarchy.create(root)
+        structs.append(data_context.hierarchy)
 
         if export_settings['create_texture_xmls']:
             for texture in data_context.textures:
@@ -83,32 +84,25 @@ def save(context, export_settings, data_context):
 
         for texture in data_context.textures:
             id = texture.split('.')[0]
-            texture_include = Include(type='all', source='ART:' + id + '.xml')
-            texture_include.create(includes)
-
-        for box in data_context.collision_boxes:
-            box.create(root)
+            includes.append(Include(type='all', source='ART:' + id + '.xml'))
 
-        for mesh in data_context.meshes:
-            mesh.create(root)
-
-        data_context.hlod.create(root)
-        data_context.animation.create(root)
+        structs += data_context.collision_boxes
+        structs += data_context.meshes
+        structs.append(data_context.hlod)
+        structs.append(data_context.animation)
 
     elif export_mode == 'A':
-        hierarchy_include = Include(type='all', source='ART:' + data_context.hierarchy.header.name + '.w3x')
-        hierarchy_include.create(includes)
-        data_context.animation.create(root)
+        includes.append(Include(type='all', source='ART:' + data_context.hierarchy.header.name + '.w3x'))
+        structs.append(data_context.animation)
 
     elif export_mode == 'H':
         data_context.hierarchy.header.name = data_context.container_name.upper()
-        data_context.hierarchy.create(root)
-
-    else:
-        context.error(f'unsupported export mode: \'{export_mode}\', aborting export!')
-        return {'CANCELLED'}
+        structs.append(data_context.hierarchy)
 
-    write(root, filepath)
+    with writing_root(open_root(filepath)) as root:
+        create_object_list(root, 'Includes', includes, Include.create)
+        for struct in structs:
+            struct.create(root)
 
     context.info('finished')
     return {'FINISHED'}
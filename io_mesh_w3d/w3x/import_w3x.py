@@ -1,7 +1,16 @@
 # <pep8 compliant>
 # Written by Stephan Vedder and Michael Schnabel
 
-from io_mesh_w3d.import_utils import *
+import os
+
+try:
+    import bpy
+except ImportError:
+    # without blender only the files can be loaded, e.g. by the converter
+    bpy = None
+
+if bpy is not None:
+    from io_mesh_w3d.import_utils import *
 from io_mesh_w3d.common.structs.animation import *
 from io_mesh_w3d.common.structs.collision_box import *
 from io_mesh_w3d.common.structs.data_context import *
@@ -12,7 +21,7 @@ from io_mesh_w3d.common.structs.mesh_structs.texture import *
 from io_mesh_w3d.w3x.structs.include import *
 
 
-def load_file(context, data_context, path=None):
+def load_file(context, data_context, path=None, follow_includes=True):
     if path is None:
         path = context.filepath
 
@@ -22,17 +31,14 @@ def load_file(context, data_context, path=None):
         context.error(f'file not found: {path}')
         return
 
-    root = find_root(context, path)
-    if root is None:
-        return
-
-    directory = os.path.dirname(path)
-    for node in root:
+    for node in stream_assets(context, path):
         if node.tag == 'Includes':
+            if not follow_includes:
+                continue
             for xml_include in node:
                 include = Include.parse(xml_include)
                 source = include.source.replace('ART:', '')
-                load_file(context, data_context, os.path.join(directory, source))
+                load_file(context, data_context, os.path.join(os.path.dirname(path), source))
 
         elif node.tag == 'W3DMesh':
             data_context.meshes.append(Mesh.parse(context, node))
@@ -1,18 +1,23 @@
 # <pep8 compliant>
 # Written by Stephan Vedder and Michael Schnabel
 
+import os
 import xml.etree.ElementTree as ET
+from array import array
+from contextlib import contextmanager
 from mathutils import Vector, Quaternion, Matrix
+from io_mesh_w3d.common.structs.mesh_structs.vector_array import VectorArray
 
 
 def create_node(self, identifier):
+    if isinstance(self, StreamNode):
+        return self.create_child(identifier)
     return ET.SubElement(self, identifier)
 
 
 def write_struct(struct, path):
-    root = create_root()
-    struct.create(root)
-    write(root, path)
+    with writing_root(open_root(path)) as root:
+        struct.create(root)
 
 
 def pretty_print(elem, level=0):
@@ -38,6 +43,122 @@ def write(root, path):
     file.close()
 
 
+CHUNK_SIZE = 4096
+
+
+# streaming counterpart of an ET.Element, used to write the xml data directly into the file
+# a node is written as soon as its next sibling is created or its parent is closed,
+# so attributes and text have to be set before any sibling is created.
+# the output is identical to the one of 'pretty_print' and 'write'
+class StreamNode:
+    def __init__(self, file, tag, level=0):
+        self.file = file
+        self.tag = tag
+        self.level = level
+        self.attrib = dict()
+        self.text = None
+        self.child = None
+        self.closed = False
+
+    def set(self, key, value):
+        self.attrib[key] = value
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+    def write_start(self):
+        self.file.write('<' + self.tag)
+        for key, value in self.attrib.items():
+            self.file.write(' ' + key + '="' + ET._escape_attrib(value) + '"')
+
+    def create_child(self, identifier):
+        if self.child is None:
+            self.write_start()
+            self.file.write('>')
+        else:
+            self.child.close()
+        self.file.write('\n' + (self.level + 1) * '  ')
+        self.child = StreamNode(self.file, identifier, self.level + 1)
+        return self.child
+
+    def write_children(self, template, values, count):
+        # writes 'count' leaf children at once, 'values' contains the values of all children in order
+        if count == 0:
+            return
+        if self.child is None:
+            self.write_start()
+            self.file.write('>')
+        else:
+            self.child.close()
+
+        indent = '\n' + (self.level + 1) * '  '
+        per_child = len(values) // count
+        for start in range(0, count, CHUNK_SIZE):
+            end = min(start + CHUNK_SIZE, count)
+            self.file.write((indent + template) * (end - start) % tuple(values[start * per_child:end * per_child]))
+
+        self.child = StreamNode(self.file, None, self.level + 1)
+        self.child.closed = True
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        if self.child is not None:
+            self.child.close()
+            self.file.write('\n' + self.level * '  ' + '</' + self.tag + '>')
+            return
+
+        self.write_start()
+        if self.text:
+            self.file.write('>' + ET._escape_cdata(self.text) + '</' + self.tag + '>')
+        else:
+            self.file.write(' />')
+
+
+def open_named_root(path, name):
+    # ET.tostring uses the us-ascii encoding, non ascii characters end up as character references
+    file = open(path, 'w', encoding='ascii', errors='xmlcharrefreplace', newline='\n')
+    file.write('<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n')
+    return StreamNode(file, name)
+
+
+def open_root(path):
+    root = open_named_root(path, 'AssetDeclaration')
+    root.set('xmlns', 'uri:ea.com:eala:asset')
+    root.set('xmlns:xsi', 'http://www.w3.org/2001/XMLSchema-instance')
+    return root
+
+
+def close_root(root):
+    try:
+        has_children = root.child is not None
+        root.close()
+        if has_children:
+            root.file.write('\n')
+    finally:
+        root.file.close()
+
+
+def abort_root(root):
+    # the data is streamed into the file, so a failed export would leave a truncated file behind
+    root.file.close()
+    if os.path.exists(root.file.name):
+        os.remove(root.file.name)
+
+
+@contextmanager
+def writing_root(root):
+    # closes the root after the data is created, or removes the incomplete file if that fails
+    try:
+        yield root
+        close_root(root)
+    except BaseException:
+        abort_root(root)
+        raise
+
+
 def strip_namespaces(it):
     for _, el in it:
         el.tag = el.tag.split('}', 1)[-1]
@@ -58,6 +179,32 @@ def find_root(context, source):
     return root
 
 
+def stream_assets(context, source):
+    # yields the top level nodes one after another while the file is parsed,
+    # each node is freed as soon as it is processed, so only one asset is kept in memory at a time
+    root = None
+    depth = 0
+    try:
+        for event, el in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                el.tag = el.tag.split('}', 1)[-1]
+                if root is None:
+                    root = el
+                    if root.tag != 'AssetDeclaration':
+                        context.error(f'file: {source} does not contain a AssetDeclaration node!')
+                        return
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth == 1:
+                yield el
+                root.remove(el)
+                el.clear()
+    except ET.ParseError:
+        context.error(f'file: {source} does not contain valid XML data!')
+
+
 def create_named_root(name):
     root = ET.Element(name)
     return root
@@ -98,12 +245,64 @@ def format(value):
     return '{:.6f}'.format(value)
 
 
+VECTOR2 = ('X', 'Y')
+VECTOR = ('X', 'Y', 'Z')
+QUATERNION = ('W', 'X', 'Y', 'Z')
+
+
+def create_vectors(parent, vectors, identifier, components=VECTOR):
+    # formats all components of all vectors in one pass, like create_vector, create_vector2 or create_quaternion
+    if not isinstance(parent, StreamNode):
+        for vec in vectors:
+            vector = create_node(parent, identifier)
+            for i, component in enumerate(components):
+                vector.set(component, format(vec[i]))
+        return
+
+    template = '<' + identifier + ''.join(f' {component}="%.6f"' for component in components) + ' />'
+    if isinstance(vectors, VectorArray) and vectors.size == len(components):
+        values = vectors.flat()
+    else:
+        values = [vec[i] for vec in vectors for i in range(len(components))]
+    parent.write_children(template, values, len(vectors))
+
+
+def create_values(parent, values, identifier):
+    # like create_value for a list of numbers
+    if not isinstance(parent, StreamNode):
+        for value in values:
+            create_value(value, parent, identifier)
+        return
+
+    parent.write_children('<' + identifier + '>%s</' + identifier + '>', values, len(values))
+
+
+def create_vector_list(parent, name, vectors, identifier, components=VECTOR):
+    create_vectors(create_node(parent, name), vectors, identifier, components)
+
+
+def create_value_list(parent, name, values, identifier):
+    create_values(create_node(parent, name), values, identifier)
+
+
 def parse_int_value(xml_obj):
     return int(xml_obj.text)
 
 
 def get_float(str):
-    return float(str.replace(',', '.'))
+    try:
+        return float(str)
+    except ValueError:
+        return float(str.replace(',', '.'))
+
+
+def get_floats(strings):
+    # files written with a decimal comma are rare, so all values are converted at once
+    # and the separator is only replaced if that fails
+    try:
+        return list(map(float, strings))
+    except ValueError:
+        return [float(str.replace(',', '.')) for str in strings]
 
 
 def parse_float_value(xml_obj):
@@ -111,7 +310,34 @@ def parse_float_value(xml_obj):
 
 
 def parse_float(xml_obj, id, default=0.0):
-    return get_float(xml_obj.get(id, format(default)))
+    value = xml_obj.get(id)
+    if value is None:
+        return default
+    return get_float(value)
+
+
+def parse_values(parent, identifier):
+    return get_floats([child.text for child in parent.findall(identifier)])
+
+
+def parse_float_array(parent, identifier, components=VECTOR, defaults=None):
+    # parses the given components of all children into one flat float array
+    values = [child.get(component) for child in parent.findall(identifier) for component in components]
+    if None in values:
+        defaults = defaults if defaults is not None else [0.0] * len(components)
+        values = [format(defaults[i % len(components)]) if value is None else value for i, value in enumerate(values)]
+    return array('f', get_floats(values))
+
+
+def parse_vectors(parent, identifier, components=VECTOR):
+    values = parse_float_array(parent, identifier, components)
+    size = len(components)
+    return [Vector(values[i:i + size]) for i in range(0, len(values), size)]
+
+
+def parse_quaternions(parent, identifier):
+    values = parse_float_array(parent, identifier, QUATERNION, [1.0, 0.0, 0.0, 0.0])
+    return [Quaternion(values[i:i + 4]) for i in range(0, len(values), 4)]
 
 
 def parse_vector2(xml_vector2):
@@ -15,6 +15,29 @@ class TestAABBTree(TestCase):
 
         self.write_read_test(expected, W3D_CHUNK_AABBTREE, AABBTree.read, compare_aabbtrees, self, True)
 
+    def test_write_read_leaf_nodes(self):
+        expected = get_aabbtree(xml=True)
+
+        self.write_read_test(expected, W3D_CHUNK_AABBTREE, AABBTree.read, compare_aabbtrees, self, True)
+
+    def test_write_read_node(self):
+        for expected in [get_aabbtree_node(xml=True, i=0), get_aabbtree_node(xml=True, i=1)]:
+            io_stream = io.BytesIO()
+            expected.write(io_stream)
+            self.assertEqual(AABBTreeNode.size(), len(io_stream.getvalue()))
+
+            io_stream = io.BytesIO(io_stream.getvalue())
+            compare_aabbtree_nodes(self, expected, AABBTreeNode.read(io_stream))
+
+    def test_write_leaf_node_sets_leaf_flag(self):
+        io_stream = io.BytesIO()
+        get_aabbtree_node(xml=True, i=0).write(io_stream)
+
+        io_stream = io.BytesIO(io_stream.getvalue())
+        io_stream.seek(24)
+        self.assertEqual(3 | AABBTREE_LEAF_FLAG, read_ulong(io_stream))
+        self.assertEqual(44, read_ulong(io_stream))
+
     def test_write_read_empty(self):
         expected = get_aabbtree_empty()
 
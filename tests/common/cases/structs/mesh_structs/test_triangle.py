@@ -21,3 +21,32 @@ class TestTriangle(TestCase):
 
     def test_write_read_xml(self):
         self.write_read_xml_test(get_triangle(), 'T', Triangle.parse, compare_triangles)
+
+    def test_triangle_array_write_read_bin(self):
+        expecteds = [get_triangle(), get_triangle(vert_ids=[3, 4, 5], surface_type=2, distance=-0.5)]
+        triangles = TriangleArray.from_triangles(expecteds)
+
+        io_stream = io.BytesIO()
+        write_list(expecteds, io_stream, Triangle.write)
+        expected_data = io_stream.getvalue()
+
+        io_stream = io.BytesIO()
+        write_triangles(triangles, io_stream)
+        self.assertEqual(expected_data, io_stream.getvalue())
+
+        actuals = TriangleArray.read(io.BytesIO(expected_data), 64)
+
+        self.assertEqual(len(expecteds), len(actuals))
+        for i, expected in enumerate(expecteds):
+            compare_triangles(self, expected, actuals[i])
+        compare_triangles(self, expecteds[-1], actuals[-1])
+        self.assertEqual(2, len(list(actuals)))
+        with self.assertRaises(IndexError):
+            actuals[2]
+
+    def test_flat_vert_ids(self):
+        triangles = [get_triangle(vert_ids=[0, 1, 2]), get_triangle(vert_ids=[3, 4, 5])]
+
+        self.assertEqual(array('i', [0, 1, 2, 3, 4, 5]), flat_vert_ids(triangles))
+        self.assertEqual(array('i', [0, 1, 2, 3, 4, 5]), flat_vert_ids(TriangleArray.from_triangles(triangles)))
+        self.assertEqual(array('i'), flat_vert_ids([]))
@@ -0,0 +1,52 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import io
+from io_mesh_w3d.common.structs.mesh_structs.vector_array import *
+from tests.mathutils import *
+from tests.utils import *
+
+
+class TestVectorArray(TestCase):
+    def test_write_read_bin(self):
+        vectors = [get_vec(1.0, -2.0, 3.5), get_vec(0.25, 0.0, -1.0)]
+        expected = VectorArray.from_vectors(vectors)
+
+        io_stream = io.BytesIO()
+        write_list(vectors, io_stream, write_vector)
+        expected_data = io_stream.getvalue()
+
+        io_stream = io.BytesIO()
+        write_vectors(expected, io_stream)
+        self.assertEqual(expected_data, io_stream.getvalue())
+
+        actual = VectorArray.read(io.BytesIO(expected_data), 24)
+
+        self.assertEqual(2, len(actual))
+        for i, vec in enumerate(actual):
+            compare_vectors(self, vectors[i], vec)
+        compare_vectors(self, vectors[1], actual[-1])
+
+    def test_list_access(self):
+        vectors = VectorArray(2)
+        self.assertFalse(vectors)
+
+        vectors.append(get_vec2(1.0, 2.0))
+        vectors.append(get_vec2(3.0, 4.0))
+        copy = vectors.copy()
+        vectors[0] = get_vec2(5.0, 6.0)
+
+        self.assertEqual(2, len(vectors))
+        compare_vectors2(self, get_vec2(5.0, 6.0), vectors[0])
+        compare_vectors2(self, get_vec2(1.0, 2.0), copy[0])
+        self.assertEqual(array('f', [5.0, 6.0, 3.0, 4.0]), vectors.flat())
+        with self.assertRaises(IndexError):
+            vectors[2]
+
+    def test_flat_vectors(self):
+        vectors = [get_vec(1.0, 2.0, 3.0), get_vec(4.0, 5.0, 6.0)]
+        expected = array('f', [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+
+        self.assertEqual(expected, flat_vectors(vectors))
+        self.assertEqual(expected, flat_vectors(VectorArray.from_vectors(vectors)))
+        self.assertEqual(array('f', [1.0, 2.0, 4.0, 5.0]), flat_vectors(vectors, 2))
@@ -45,6 +45,25 @@ class TestMesh(TestCase):
 
         self.write_read_test(expected, W3D_CHUNK_MESH, Mesh.read, compare_meshes, self, True)
 
+    def test_read_uses_compact_storage(self):
+        expected = get_mesh()
+
+        io_stream = io.BytesIO()
+        expected.write(io_stream)
+        data = io_stream.getvalue()
+        io_stream = io.BytesIO(data)
+        (_, _, chunk_end) = read_chunk_head(io_stream)
+
+        actual = Mesh.read(self, io_stream, chunk_end)
+
+        self.assertTrue(isinstance(actual.verts, VectorArray))
+        self.assertTrue(isinstance(actual.normals, VectorArray))
+        self.assertTrue(isinstance(actual.triangles, TriangleArray))
+
+        io_stream = io.BytesIO()
+        actual.write(io_stream)
+        self.assertEqual(data, io_stream.getvalue())
+
     def test_validate(self):
         mesh = get_mesh()
         self.file_format = 'W3D'
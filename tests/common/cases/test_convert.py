@@ -0,0 +1,169 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import os
+import subprocess
+import sys
+from io_mesh_w3d.convert import *
+from tests.common.helpers.animation import get_animation, compare_animations
+from tests.common.helpers.collision_box import get_collision_box
+from tests.common.helpers.hierarchy import get_hierarchy, compare_hierarchy_headers
+from tests.common.helpers.hlod import get_hlod, compare_hlods
+from tests.common.helpers.mesh import get_mesh
+from tests.utils import *
+
+
+class TestConvert(TestCase):
+    def write_w3d(self, path, structs):
+        file = open(path, 'wb')
+        for struct in structs:
+            struct.write(file)
+        file.close()
+
+    def run_converter(self, args):
+        # runs the converter like from the command line, without blender and thus without bpy
+        root = os.path.dirname(os.path.dirname(os.path.abspath(sys.modules['io_mesh_w3d'].__file__)))
+        env = {key: value for (key, value) in os.environ.items() if key != 'PYTHONPATH'}
+        return subprocess.run([sys.executable, os.path.join(root, 'w3d_convert.py')] + args, env=env,
+                              cwd=self.outpath(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+
+    def test_converter_runs_without_blender(self):
+        self.write_w3d(self.outpath() + 'hiera.w3d', [get_hierarchy()])
+
+        result = self.run_converter(['--to', 'W3X', self.outpath() + 'hiera.w3d'])
+
+        self.assertEqual(0, result.returncode, result.stderr)
+        self.assertTrue(os.path.exists(self.outpath() + 'hiera.w3x'))
+
+    def test_converter_batch_converts_directory_without_blender(self):
+        os.makedirs(self.outpath() + os.path.join('art', 'units'))
+        self.write_w3d(self.outpath() + os.path.join('art', 'a.w3d'), [get_hierarchy()])
+        self.write_w3d(self.outpath() + os.path.join('art', 'b.w3d'), [get_hlod()])
+        self.write_w3d(self.outpath() + os.path.join('art', 'units', 'c.w3d'), [get_hierarchy(), get_mesh()])
+        self.write_w3d(self.outpath() + os.path.join('art', 'units', 'broken.w3d'), [get_mesh()])
+        os.truncate(self.outpath() + os.path.join('art', 'units', 'broken.w3d'), 100)
+
+        result = self.run_converter(['--to', 'W3X', self.outpath() + 'art', '-o', self.outpath() + 'out', '-j', '2'])
+
+        self.assertEqual(1, result.returncode, result.stderr)
+        self.assertTrue(os.path.exists(self.outpath() + os.path.join('out', 'a.w3x')))
+        self.assertTrue(os.path.exists(self.outpath() + os.path.join('out', 'b.w3x')))
+        self.assertTrue(os.path.exists(self.outpath() + os.path.join('out', 'units', 'c.w3x')))
+        self.assertFalse(os.path.exists(self.outpath() + os.path.join('out', 'units', 'broken.w3x')))
+        self.assertIn('failed: ' + self.outpath() + os.path.join('art', 'units', 'broken.w3d'), result.stdout)
+        self.assertIn('converted 3 of 4 files to W3X', result.stdout)
+
+        data_context = load_structs(ConvertContext(), self.outpath() + os.path.join('out', 'units', 'c.w3x'))
+        self.assertEqual(get_hierarchy().header.name, data_context.hierarchy.header.name)
+        self.assertEqual(1, len(data_context.meshes))
+
+    def test_convert_w3d_to_w3x_and_back(self):
+        hierarchy = get_hierarchy('testhiera_skl')
+        box = get_collision_box()
+        hlod = get_hlod('TestModelName', 'testhiera_skl')
+        animation = get_animation('testhiera_skl')
+
+        source = self.outpath() + 'source.w3d'
+        self.write_w3d(source, [hierarchy, box, get_mesh(name='sword'), hlod, animation])
+
+        context = convert_file(source, self.outpath() + 'source.w3x', 'W3X')
+        self.assertEqual([], context.errors())
+
+        context = convert_file(self.outpath() + 'source.w3x', self.outpath() + 'result.w3d', 'W3D')
+        self.assertEqual([], context.errors())
+
+        data_context = load_structs(ConvertContext(), self.outpath() + 'result.w3d')
+        compare_hierarchy_headers(self, hierarchy.header, data_context.hierarchy.header)
+        self.assertEqual([p.name for p in hierarchy.pivots], [p.name for p in data_context.hierarchy.pivots])
+        self.assertEqual(box.name_, data_context.collision_boxes[0].name_)
+        compare_hlods(self, hlod, data_context.hlod, xml=True)
+        compare_animations(self, animation, data_context.animation)
+        self.assertEqual(1, len(data_context.meshes))
+        self.assertEqual('sword', data_context.meshes[0].name())
+        self.assertEqual(len(get_mesh().verts), len(data_context.meshes[0].verts))
+        self.assertEqual(len(get_mesh().triangles), len(data_context.meshes[0].triangles))
+
+    def test_convert_w3x_with_too_long_names_to_w3d_fails(self):
+        hierarchy = get_hierarchy('a_very_long_hierarchy_name', xml=True)
+        source = self.outpath() + 'source.w3x'
+        write_struct(hierarchy, source)
+
+        context = convert_file(source, self.outpath() + 'source.w3d', 'W3D')
+
+        self.assertEqual(2, len(context.errors()))
+        self.assertFalse(os.path.exists(self.outpath() + 'source.w3d'))
+
+    def test_find_files_keeps_directory_structure(self):
+        os.makedirs(self.outpath() + os.path.join('art', 'units'))
+        self.write_w3d(self.outpath() + os.path.join('art', 'a.w3d'), [get_hierarchy()])
+        self.write_w3d(self.outpath() + os.path.join('art', 'units', 'b.w3d'), [get_hierarchy()])
+        write_struct(get_hierarchy(), self.outpath() + os.path.join('art', 'c.w3x'))
+
+        files = find_files([self.outpath() + 'art'], self.outpath() + 'out', 'W3X')
+
+        self.assertEqual([
+            (self.outpath() + os.path.join('art', 'a.w3d'), self.outpath() + os.path.join('out', 'a.w3x')),
+            (self.outpath() + os.path.join('art', 'units', 'b.w3d'),
+             self.outpath() + os.path.join('out', 'units', 'b.w3x'))],
+            files)
+
+    def test_main_does_not_convert_files_of_the_target_format(self):
+        write_struct(get_hierarchy(), self.outpath() + 'hiera.w3x')
+        self.write_w3d(self.outpath() + 'other.w3d', [get_hierarchy()])
+        modified = os.path.getmtime(self.outpath() + 'hiera.w3x')
+
+        self.assertEqual([], find_files([self.outpath() + 'hiera.w3x'], None, 'W3X'))
+        self.assertEqual(1, main(['--to', 'W3X', self.outpath() + 'hiera.w3x', self.outpath() + 'other.w3d']))
+
+        self.assertEqual(modified, os.path.getmtime(self.outpath() + 'hiera.w3x'))
+        self.assertTrue(os.path.exists(self.outpath() + 'other.w3x'))
+
+    def test_save_w3d_removes_incomplete_file(self):
+        data_context = DataContext(hierarchy=get_hierarchy())
+        data_context.meshes = [get_mesh()]
+        data_context.meshes[0].write = None
+
+        with self.assertRaises(TypeError):
+            save_w3d(ConvertContext(), data_context, self.outpath() + 'broken.w3d')
+
+        self.assertFalse(os.path.exists(self.outpath() + 'broken.w3d'))
+
+    def test_main_converts_directory(self):
+        os.makedirs(self.outpath() + 'art')
+        self.write_w3d(self.outpath() + os.path.join('art', 'a.w3d'), [get_hierarchy()])
+        self.write_w3d(self.outpath() + os.path.join('art', 'b.w3d'), [get_hlod()])
+
+        self.assertEqual(0, main(['--to', 'w3x', self.outpath() + 'art', '-o', self.outpath() + 'out']))
+
+        self.assertTrue(os.path.exists(self.outpath() + os.path.join('out', 'a.w3x')))
+        self.assertTrue(os.path.exists(self.outpath() + os.path.join('out', 'b.w3x')))
+
+    def test_convert_files_isolates_failing_files(self):
+        os.makedirs(self.outpath() + 'art')
+        self.write_w3d(self.outpath() + os.path.join('art', 'a.w3d'), [get_hierarchy()])
+        self.write_w3d(self.outpath() + os.path.join('art', 'b.w3d'), [get_hlod()])
+        self.write_w3d(self.outpath() + os.path.join('art', 'broken.w3d'), [get_mesh()])
+        os.truncate(self.outpath() + os.path.join('art', 'broken.w3d'), 100)
+
+        files = find_files([self.outpath() + 'art'], self.outpath() + 'out', 'W3X')
+        report = convert_files(files, 'W3X', workers=2)
+
+        self.assertEqual(3, len(report.results))
+        self.assertEqual([self.outpath() + os.path.join('art', 'broken.w3d')],
+                         [source for (source, _) in report.failed()])
+        self.assertTrue(os.path.exists(self.outpath() + os.path.join('out', 'a.w3x')))
+        self.assertTrue(os.path.exists(self.outpath() + os.path.join('out', 'b.w3x')))
+        self.assertTrue(
+            report.summary().endswith(f'converted 2 of 3 files to W3X in {report.duration:.2f}s (0 warnings)'))
+
+    def test_convert_files_sequential_and_parallel_give_same_results(self):
+        os.makedirs(self.outpath() + 'art')
+        for i in range(4):
+            self.write_w3d(self.outpath() + os.path.join('art', f'{i}.w3d'), [get_hierarchy(), get_mesh()])
+
+        files = find_files([self.outpath() + 'art'], self.outpath() + 'out', 'W3X')
+        sequential = convert_files(files, 'W3X', workers=1)
+        parallel = convert_files(files, 'W3X', workers=2)
+
+        self.assertEqual(sequential.results, parallel.results)
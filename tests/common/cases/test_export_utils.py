@@ -129,3 +129,68 @@ class TestExportUtils(TestCase):
             report_func.assert_called_with('aborting export!')
 
         validate.assert_called()
+
+    @patch('io_mesh_w3d.export_utils.retrieve_hierarchy', return_value=(get_hierarchy(), None))
+    @patch('io_mesh_w3d.export_utils.create_hlod', return_value=None)
+    @patch('io_mesh_w3d.export_utils.retrieve_boxes', return_value=[])
+    @patch('io_mesh_w3d.export_utils.retrieve_dazzles', return_value=[])
+    @patch('io_mesh_w3d.export_utils.remove_redundant_channels')
+    @patch('io_mesh_w3d.export_utils.compress_adaptive_delta')
+    @patch.object(Animation, 'validate', return_value=True)
+    def test_retrieve_data_exports_uncompressed_animation_if_w3x_and_adaptive_delta(
+            self, validate, compress, remove_redundant, dazzles, boxes, hlod, hiera):
+        self.file_format = 'W3X'
+        self.filepath = r'C:dir' + os.path.sep + 'dir.dir' + os.path.sep + 'filename'
+        animation = Animation(channels=[AnimationChannel()])
+
+        with (patch('io_mesh_w3d.export_utils.retrieve_animation', return_value=animation)) as retrieve_animation:
+            with (patch.object(self, 'warning')) as report_func:
+                data_context = retrieve_data(self, {'mode': 'A', 'compression': 'AD', 'animation_max_error': 0.1})
+                report_func.assert_called_with('adaptive delta compression is not supported in W3X file format, '
+                                               'exporting uncompressed animation!')
+
+        self.assertEqual(animation, data_context.animation)
+        retrieve_animation.assert_called_with(self, 'filename', hiera.return_value[0], None, False, 0.0)
+        compress.assert_not_called()
+
+    @patch('io_mesh_w3d.export_utils.retrieve_hierarchy', return_value=(get_hierarchy(), None))
+    @patch('io_mesh_w3d.export_utils.create_hlod', return_value=None)
+    @patch('io_mesh_w3d.export_utils.retrieve_boxes', return_value=[])
+    @patch('io_mesh_w3d.export_utils.retrieve_dazzles', return_value=[])
+    @patch('io_mesh_w3d.export_utils.remove_redundant_channels')
+    @patch('io_mesh_w3d.export_utils.compress_auto')
+    @patch.object(Animation, 'validate', return_value=True)
+    def test_retrieve_data_exports_uncompressed_animation_if_w3x_and_auto(
+            self, validate, compress, remove_redundant, dazzles, boxes, hlod, hiera):
+        self.file_format = 'W3X'
+        self.filepath = r'C:dir' + os.path.sep + 'dir.dir' + os.path.sep + 'filename'
+        animation = Animation(channels=[AnimationChannel()])
+
+        with (patch('io_mesh_w3d.export_utils.retrieve_animation', return_value=animation)) as retrieve_animation:
+            with (patch.object(self, 'warning')) as report_func:
+                data_context = retrieve_data(self, {'mode': 'A', 'compression': 'AUTO', 'animation_max_error': 0.1})
+                report_func.assert_called_with('automatic compression is not supported in W3X file format, '
+                                               'exporting uncompressed animation!')
+
+        self.assertEqual(animation, data_context.animation)
+        retrieve_animation.assert_called_with(self, 'filename', hiera.return_value[0], None, False, 0.0)
+        remove_redundant.assert_called_with(self, animation, hiera.return_value[0], 0.0)
+        compress.assert_not_called()
+
+    @patch('io_mesh_w3d.export_utils.retrieve_hierarchy', return_value=(get_hierarchy(), None))
+    @patch('io_mesh_w3d.export_utils.create_hlod', return_value=None)
+    @patch('io_mesh_w3d.export_utils.retrieve_boxes', return_value=[])
+    @patch('io_mesh_w3d.export_utils.retrieve_dazzles', return_value=[])
+    @patch('io_mesh_w3d.export_utils.remove_redundant_channels')
+    @patch.object(Animation, 'validate', return_value=True)
+    def test_retrieve_data_timecoded_animation_is_only_lossless_with_max_error_zero(
+            self, validate, remove_redundant, dazzles, boxes, hlod, hiera):
+        self.filepath = r'C:dir' + os.path.sep + 'dir.dir' + os.path.sep + 'filename'
+
+        with (patch('io_mesh_w3d.export_utils.retrieve_animation', return_value=Animation())) as retrieve_animation:
+            retrieve_data(self, {'mode': 'A', 'compression': 'TC'})
+            retrieve_animation.assert_called_with(self, 'filename', hiera.return_value[0], None, True,
+                                                  ANIMATION_MAX_ERROR)
+
+            retrieve_data(self, {'mode': 'A', 'compression': 'TC', 'animation_max_error': 0.0})
+            retrieve_animation.assert_called_with(self, 'filename', hiera.return_value[0], None, True, 0.0)
@@ -0,0 +1,133 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import io
+import time
+import numpy as np
+from io_mesh_w3d.common.utils.aabbtree_query import *
+from io_mesh_w3d.common.utils.mesh_export import create_aabbtree
+from tests.common.helpers.mesh import *
+from tests.utils import *
+
+
+class TestAABBTreeQuery(TestCase):
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(42)
+        centers = rng.uniform(-10.0, 10.0, size=(2000, 1, 3))
+        self.positions = (centers + rng.normal(scale=0.5, size=(2000, 3, 3))).reshape(-1, 3)
+        self.triangles = np.arange(len(self.positions)).reshape(-1, 3)
+        self.corners = self.positions[self.triangles]
+        self.query = AABBTreeQuery(self.positions, self.triangles, *build_aabbtree(self.positions, self.triangles))
+        self.rng = np.random.default_rng(7)
+
+    def test_ray_cast_finds_closest_hit(self):
+        for _ in range(100):
+            origin = self.rng.uniform(-15.0, 15.0, 3)
+            direction = self.rng.normal(size=3)
+
+            (index, distance) = self.query.ray_cast(origin, direction)
+
+            distances = ray_triangles(origin, direction, self.corners, np.inf)
+            if np.isfinite(distances.min()):
+                self.assertEqual(np.argmin(distances), index)
+                self.assertAlmostEqual(distances.min(), distance)
+            else:
+                self.assertIsNone(index)
+            self.assertTrue(0 < self.query.nodes_visited < len(self.query.leaves))
+
+    def test_ray_cast_along_axis(self):
+        query = AABBTreeQuery([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], [[0, 1, 2]], [0],
+                              [[[0.0, 0.0, 0.0], [1.0, 1.0, 0.0]]], [[AABBTREE_LEAF_FLAG, 1]])
+
+        self.assertEqual((0, 2.0), query.ray_cast([0.25, 0.25, 4.0], [0.0, 0.0, -2.0]))
+        self.assertEqual((None, np.inf), query.ray_cast([0.25, 0.25, 4.0], [0.0, 0.0, 2.0]))
+        self.assertEqual((None, 1.0), query.ray_cast([0.25, 0.25, 4.0], [0.0, 0.0, -2.0], max_distance=1.0))
+        self.assertEqual((None, np.inf), query.ray_cast([2.0, 0.25, 4.0], [0.0, 0.0, -1.0]))
+
+    def test_segment_test(self):
+        for _ in range(100):
+            start = self.rng.uniform(-15.0, 15.0, 3)
+            end = start + self.rng.normal(size=3) * 3
+
+            expected = (ray_triangles(start, end - start, self.corners, 1.0) < np.inf).any()
+            self.assertEqual(expected, self.query.segment_test(start, end))
+
+    def test_box_overlap(self):
+        for _ in range(100):
+            low = self.rng.uniform(-10.0, 10.0, 3)
+            high = low + self.rng.uniform(0.0, 3.0, 3)
+
+            expected = np.flatnonzero(triangles_overlap_box(self.corners, low, high)).tolist()
+            self.assertEqual(expected, self.query.box_overlap(low, high))
+
+    def test_triangles_overlap_box(self):
+        corners = np.array([[[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]])
+
+        self.assertTrue(triangles_overlap_box(corners, np.array([0.4, 0.4, -0.1]), np.array([0.9, 0.9, 0.1]))[0])
+        self.assertFalse(triangles_overlap_box(corners, np.array([0.6, 0.6, -0.1]), np.array([0.9, 0.9, 0.1]))[0])
+        self.assertFalse(triangles_overlap_box(corners, np.array([0.1, 0.1, 0.1]), np.array([0.2, 0.2, 0.2]))[0])
+
+    def test_closest_triangle(self):
+        for _ in range(100):
+            point = self.rng.uniform(-12.0, 12.0, 3)
+
+            (index, closest, distance) = self.query.closest_triangle(point)
+
+            distances = np.linalg.norm(closest_points_on_triangles(point, self.corners) - point, axis=1)
+            self.assertAlmostEqual(distances.min(), distance)
+            self.assertAlmostEqual(distances[index], distance)
+            self.assertAlmostEqual(np.linalg.norm(closest - point), distance)
+
+    def test_closest_points_on_triangles(self):
+        corners = np.array([[[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]])
+
+        for (point, expected) in [([0.2, 0.2, 5.0], [0.2, 0.2, 0.0]),
+                                  ([2.0, 2.0, 0.0], [0.5, 0.5, 0.0]),
+                                  ([-1.0, -1.0, 1.0], [0.0, 0.0, 0.0])]:
+            self.assertTrue(np.allclose([expected], closest_points_on_triangles(np.array(point), corners)))
+
+    def test_queries_on_empty_tree(self):
+        query = AABBTreeQuery(np.empty((0, 3)), np.empty((0, 3)), [], np.empty((0, 2, 3)), np.empty((0, 2)))
+
+        self.assertEqual((None, np.inf), query.ray_cast([0.0, 0.0, 0.0], [1.0, 0.0, 0.0]))
+        self.assertFalse(query.segment_test([0.0, 0.0, 0.0], [1.0, 0.0, 0.0]))
+        self.assertEqual([], query.box_overlap([0.0, 0.0, 0.0], [1.0, 1.0, 1.0]))
+        self.assertEqual((None, None, np.inf), query.closest_triangle([0.0, 0.0, 0.0]))
+
+    def test_query_from_written_mesh(self):
+        mesh = get_mesh()
+        create_aabbtree(mesh)
+
+        io_stream = io.BytesIO()
+        mesh.write(io_stream)
+        io_stream = io.BytesIO(io_stream.getvalue())
+        (_, _, chunk_end) = read_chunk_head(io_stream)
+        query = AABBTreeQuery.from_mesh(Mesh.read(self, io_stream, chunk_end))
+
+        positions = np.array([tuple(vert) for vert in mesh.verts])
+        corners = positions[[triangle.vert_ids for triangle in mesh.triangles]]
+        for corner in corners:
+            center = corner.mean(axis=0)
+            (index, distance) = query.ray_cast(center + [0.0, 0.0, 10.0], [0.0, 0.0, -1.0])
+            self.assertIsNotNone(index)
+            self.assertTrue(distance <= 10.0 + 1e-5)
+            self.assertAlmostEqual(0.0, query.closest_triangle(center)[2], 5)
+
+    # run with: blender -b --python ./tests/runner.py -- --prefix benchmark
+    def benchmark_ray_casts(self):
+        rng = np.random.default_rng(42)
+        centers = rng.uniform(-10.0, 10.0, size=(100000, 1, 3))
+        positions = (centers + rng.normal(scale=0.1, size=(100000, 3, 3))).reshape(-1, 3)
+        triangles = np.arange(len(positions)).reshape(-1, 3)
+        rays = [(rng.uniform(-15.0, 15.0, 3), rng.normal(size=3)) for _ in range(1000)]
+
+        for method in ['SAH', 'MEDIAN']:
+            query = AABBTreeQuery(positions, triangles, *build_aabbtree(positions, triangles, method=method))
+            visited = 0
+            start = time.perf_counter()
+            for (origin, direction) in rays:
+                query.ray_cast(origin, direction)
+                visited += query.nodes_visited
+            print(f'{method}: {visited / len(rays):.1f} nodes visited per ray, '
+                  f'{(time.perf_counter() - start) / len(rays) * 1000:.3f}ms per ray')
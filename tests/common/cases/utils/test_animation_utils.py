@@ -2,6 +2,7 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import bpy
+import io
 from unittest.mock import patch
 from mathutils import Vector
 from io_mesh_w3d.common.utils.mesh_import import *
@@ -144,3 +145,292 @@ class TestAnimationUtils(TestCase):
         self.assertEqual(3, len(channel.time_codes))
         for tc in channel.time_codes:
             self.assertAlmostEqual(1.0, tc.value.magnitude, 1)
+
+    def test_animation_channels_are_created_as_fcurves(self):
+        hierarchy = get_hierarchy()
+        animation = get_animation()
+        name = hierarchy.pivots[1].name
+
+        animation.channels = [get_animation_channel(type=CHANNEL_X, pivot=1),
+                              get_animation_channel(type=CHANNEL_Q, pivot=1),
+                              get_animation_bit_channel(pivot=1)]
+
+        rig = get_or_create_skeleton(hierarchy, get_collection())
+        create_animation(self, rig, animation, hierarchy)
+
+        fcurves = rig.animation_data.action.fcurves
+        location = fcurves.find(f'pose.bones["{name}"].location', index=0)
+        self.assertEqual([3.0, 3.5, 2.0, 1.0, -1.0], [round(key.co.y, 5) for key in location.keyframe_points])
+        self.assertEqual(name, location.group.name)
+
+        for index in range(4):
+            rotation = fcurves.find(f'pose.bones["{name}"].rotation_quaternion', index=index)
+            self.assertEqual([0, 1, 2, 3, 4], [int(key.co.x) for key in rotation.keyframe_points])
+
+        visibility = rig.data.animation_data.action.fcurves.find(f'bones["{name}"].visibility')
+        self.assertEqual([0, 1, 3, 4, 5, 6, 9], [int(key.co.x) for key in visibility.keyframe_points])
+        self.assertTrue(all(key.interpolation == 'CONSTANT' for key in visibility.keyframe_points))
+
+    def test_sampled_fcurves_match_evaluate(self):
+        hiera = get_hierarchy()
+        rig = get_or_create_skeleton(hiera, get_collection())
+        bone = rig.pose.bones[0]
+        for (frame, value) in [(0, 1.0), (4, 3.5), (5, -2.0), (12, 0.25)]:
+            bone.location = Vector((value, value, value))
+            bone.keyframe_insert(data_path='location', frame=frame)
+
+        fcurves = rig.animation_data.action.fcurves
+        fcurves[1].keyframe_points[1].interpolation = 'LINEAR'
+        fcurves[2].keyframe_points[2].interpolation = 'CONSTANT'
+
+        samples = sample_fcurves(fcurves, -2, 15)
+
+        for i, fcu in enumerate(fcurves):
+            for frame in range(-2, 16):
+                self.assertAlmostEqual(fcu.evaluate(frame), samples[frame + 2, i], 4)
+
+    def test_timecoded_export_reduces_keyframes(self):
+        hiera = get_hierarchy()
+        rig = get_or_create_skeleton(hiera, get_collection())
+        bone = rig.pose.bones[0]
+        for frame in range(11):
+            bone.location = Vector((frame * 0.5, 1.0, 0.0 if frame < 5 else 2.0))
+            bone.keyframe_insert(data_path='location', frame=frame)
+        rig.animation_data.action.fcurves[2].keyframe_points[4].interpolation = 'CONSTANT'
+
+        ani = retrieve_animation(self, 'ani_name', hiera, rig, True, max_error=0.01)
+
+        self.assertEqual(3, len(ani.time_coded_channels))
+        (x, y, z) = sorted(ani.time_coded_channels, key=lambda channel: channel.type)
+        self.assertEqual([0, 10], [datum.time_code for datum in x.time_codes])
+        self.assertEqual([0, 10], [datum.time_code for datum in y.time_codes])
+        self.assertEqual([(0, True), (4, True), (5, False), (10, True)],
+                         [(datum.time_code, datum.interpolated) for datum in z.time_codes])
+
+    def test_timecoded_export_keeps_all_keyframes_without_max_error(self):
+        hiera = get_hierarchy()
+        rig = get_or_create_skeleton(hiera, get_collection())
+        bone = rig.pose.bones[0]
+        for frame in range(11):
+            bone.location = Vector((frame * 0.5, 1.0, 0.0 if frame < 5 else 2.0))
+            bone.keyframe_insert(data_path='location', frame=frame)
+
+        ani = retrieve_animation(self, 'ani_name', hiera, rig, True, max_error=0.0)
+
+        (x, y, z) = sorted(ani.time_coded_channels, key=lambda channel: channel.type)
+        self.assertEqual(list(range(11)), [datum.time_code for datum in x.time_codes])
+        self.assertEqual([frame * 0.5 for frame in range(11)], [datum.value for datum in x.time_codes])
+
+    def test_reduce_keyframes_of_translation(self):
+        values = [0.5 * i for i in range(10)] + [4.5] * 10 + [4.5 + np.sin(i) for i in range(10)]
+        channel = TimeCodedAnimationChannel(
+            num_time_codes=len(values), type=CHANNEL_X, vector_len=1,
+            time_codes=[TimeCodedDatum(time_code=i, interpolated=True, value=value) for i, value in enumerate(values)])
+
+        reduce_keyframes(channel, max_error=0.01)
+
+        self.assertEqual(len(channel.time_codes), channel.num_time_codes)
+        self.assertEqual([0, 9, 20], [datum.time_code for datum in channel.time_codes[:3]])
+        frames = [datum.time_code for datum in channel.time_codes]
+        interpolated = np.interp(range(len(values)), frames, [datum.value for datum in channel.time_codes])
+        self.assertTrue(np.allclose(values, interpolated, atol=0.01))
+
+    def test_reduce_keyframes_of_rotation(self):
+        start = Quaternion((1.0, 0.0, 0.0, 0.0))
+        end = Quaternion((0.7, 0.7, 0.1, 0.0)).normalized()
+        values = [start.slerp(end, i / 30) for i in range(31)] + [end.slerp(start, i / 10) for i in range(1, 11)]
+        values[10].negate()
+        channel = TimeCodedAnimationChannel(
+            num_time_codes=len(values), type=CHANNEL_Q, vector_len=4,
+            time_codes=[TimeCodedDatum(time_code=2 * i, interpolated=True, value=value)
+                        for i, value in enumerate(values)])
+
+        reduce_keyframes(channel, max_error=0.001)
+
+        self.assertEqual([0, 60, 80], [datum.time_code for datum in channel.time_codes])
+
+    def test_reduce_keyframes_keeps_steps(self):
+        values = [0.0, 0.0, 0.0, 1.0, 1.0, 1.0]
+        channel = TimeCodedAnimationChannel(
+            num_time_codes=len(values), type=CHANNEL_Y, vector_len=1,
+            time_codes=[TimeCodedDatum(time_code=i, interpolated=i != 3, value=value)
+                        for i, value in enumerate(values)])
+
+        reduce_keyframes(channel, max_error=0.5)
+
+        self.assertEqual([(0, True), (2, True), (3, False), (5, True)],
+                         [(datum.time_code, datum.interpolated) for datum in channel.time_codes])
+
+    def test_create_time_coded_bit_channel(self):
+        channel = create_time_coded_bit_channel(3, [2, 5, 6, 9, 12], [0.0, 0.0, 1.0, 1.0, 0.0])
+
+        self.assertEqual(3, channel.pivot)
+        self.assertEqual(0, channel.default_value)
+        self.assertEqual(2, channel.num_time_codes)
+        self.assertEqual([(6, True), (12, False)], [(datum.time_code, datum.value) for datum in channel.time_codes])
+
+    def test_apply_timecoded_bit_inserts_default_value_only_before_first_time_code(self):
+        channel = TimeCodedBitChannel(default_value=True, time_codes=[
+            TimeCodedBitDatum(time_code=3, value=False), TimeCodedBitDatum(time_code=5, value=True)])
+
+        with (patch('io_mesh_w3d.common.utils.animation_import.set_keyframes')) as set_keys:
+            apply_timecoded_bit(None, channel)
+            set_keys.assert_called_with(None, channel, [0, 3, 5], [True, False, True])
+
+            channel.time_codes[0].time_code = 0
+            apply_timecoded_bit(None, channel)
+            set_keys.assert_called_with(None, channel, [0, 5], [False, True])
+
+    def test_remove_redundant_channels_uncompressed(self):
+        animation = get_animation()
+        rest_translation = get_animation_channel(type=1, pivot=4)
+        rest_translation.data = [0.0] * 5
+        rest_rotation = get_animation_channel(type=6, pivot=4)
+        rest_rotation.data = [get_quat(1, 0, 0, 0), get_quat(-1, 0, 0, 0)] * 2 + [get_quat(1, 0, 0, 0)]
+        constant = get_animation_channel(type=2, pivot=4)
+        constant.data = [1.5] * 5
+        animation.channels += [rest_translation, rest_rotation, constant]
+        saved = rest_translation.size() + rest_rotation.size()
+
+        with (patch.object(self, 'info')) as info_func:
+            remove_redundant_channels(self, animation, get_hierarchy())
+            info_func.assert_called_once_with(
+                f'removed redundant animation channels of pivot \'arml\': {saved} bytes saved')
+
+        self.assertEqual(len(get_animation().channels) + 1, len(animation.channels))
+        self.assertEqual([1.5] * 5, animation.channels[-1].data)
+
+    def test_remove_redundant_channels_timecoded(self):
+        animation = get_compressed_animation(bit_channels=False, motion_tc=False, motion_ad4=False, motion_ad8=False)
+        constant = get_time_coded_animation_channel(type_=0)
+        constant.pivot = 5
+        for datum in constant.time_codes:
+            datum.value = 2.0
+        rest_rotation = get_time_coded_animation_channel(type_=6)
+        rest_rotation.pivot = 5
+        for datum in rest_rotation.time_codes:
+            datum.value = get_quat(1, 0, 0, 0)
+        animation.time_coded_channels += [constant, rest_rotation]
+        saved = rest_rotation.size() + constant.size()
+
+        with (patch.object(self, 'info')) as info_func:
+            remove_redundant_channels(self, animation, get_hierarchy(), max_error=0.01)
+            saved -= constant.size()
+            info_func.assert_called_once_with(
+                f'removed redundant animation channels of pivot \'armr\': {saved} bytes saved')
+
+        self.assertEqual(5, len(animation.time_coded_channels))
+        self.assertEqual(1, constant.num_time_codes)
+        self.assertEqual([(0, 2.0)], [(datum.time_code, datum.value) for datum in constant.time_codes])
+
+    def test_remove_redundant_channels_keeps_one_channel(self):
+        channel = get_animation_channel(type=0, pivot=1)
+        channel.data = [0.0] * 5
+        animation = Animation(header=get_animation_header(), channels=[channel])
+
+        remove_redundant_channels(self, animation, get_hierarchy())
+
+        self.assertEqual([channel], animation.channels)
+
+    def test_compress_adaptive_delta(self):
+        animation = get_animation()
+
+        compressed = compress_adaptive_delta(self, animation, max_error=0.1)
+
+        self.assertTrue(compressed.validate(self))
+        self.assertEqual(ADAPTIVE_DELTA_FLAVOR, compressed.header.flavor)
+        self.assertEqual(animation.header.num_frames, compressed.header.num_frames)
+        self.assertEqual(2, len(compressed.time_coded_bit_channels))
+        self.assertEqual(11, len(compressed.adaptive_delta_channels) + len(compressed.motion_channels))
+
+        io_stream = io.BytesIO()
+        compressed.write(io_stream)
+        io_stream = io.BytesIO(io_stream.getvalue())
+        (_, _, chunk_end) = read_chunk_head(io_stream)
+        actual = CompressedAnimation.read(self, io_stream, chunk_end)
+
+        for channel in actual.adaptive_delta_channels:
+            expected = next(c for c in animation.channels if c.pivot == channel.pivot and c.type == channel.type)
+            values = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.scale, channel.data)
+            for (value, expected_value) in zip(values, expected.data):
+                if channel.type == 6:
+                    self.assertTrue(abs(Quaternion(value).dot(expected_value.normalized())) > 0.99)
+                else:
+                    self.assertTrue(abs(value[0] - expected_value) <= 0.1 + 1e-5)
+
+        bit_channel = actual.time_coded_bit_channels[0]
+        self.assertEqual(6, bit_channel.pivot)
+        self.assertEqual(0, bit_channel.default_value)
+        self.assertEqual([(1, True), (4, False), (6, True)],
+                         [(datum.time_code, datum.value) for datum in bit_channel.time_codes])
+
+    def test_compress_adaptive_delta_falls_back_to_motion_channels(self):
+        channel = get_animation_channel(type=0, pivot=1)
+        animation = Animation(header=get_animation_header(), channels=[channel])
+
+        compressed = compress_adaptive_delta(self, animation, max_error=0.0)
+
+        self.assertEqual([], compressed.adaptive_delta_channels)
+        self.assertEqual(1, len(compressed.motion_channels))
+        self.assertEqual(0, compressed.motion_channels[0].delta_type)
+        self.assertEqual(channel.data, [datum.value for datum in compressed.motion_channels[0].data])
+
+    def test_compress_auto_keeps_short_animation_uncompressed(self):
+        animation = get_animation()
+
+        self.assertIs(animation, compress_auto(self, animation, get_hierarchy(), max_error=0.0))
+
+    @patch('io_mesh_w3d.common.utils.animation_export.MOTION_CHANNEL_MAX_TIME_CODE', 10)
+    def test_compress_auto_skips_adaptive_delta_if_a_channel_has_no_encoding_within_max_error(self):
+        channel = get_animation_channel(type=CHANNEL_X, pivot=1)
+        channel.last_frame = 39
+        channel.data = [0.0] * 10 + [5.0] * 10 + [-3.0] * 10 + [7.0] * 10
+        animation = Animation(header=get_animation_header(), channels=[channel])
+
+        self.assertEqual([], channel_encodings(channel, 0.0)[1])
+
+        compressed = compress_auto(self, animation, get_hierarchy(), max_error=0.0)
+
+        self.assertEqual(TIME_CODED_FLAVOR, compressed.header.flavor)
+        self.assertEqual(1, len(compressed.time_coded_channels))
+        self.assertEqual([], compressed.motion_channels)
+
+    def test_compress_auto(self):
+        start = Quaternion((1.0, 0.0, 0.0, 0.0))
+        end = Quaternion((0.7, 0.7, 0.0, 0.0)).normalized()
+        channels = []
+        for pivot in range(1, 5):
+            channel = get_animation_channel(type=CHANNEL_X, pivot=pivot)
+            channel.last_frame = 199
+            channel.data = (np.sin(np.linspace(0.0, 6.0, 200)) * pivot).tolist()
+            channels.append(channel)
+            channel = get_animation_channel(type=CHANNEL_Q, pivot=pivot)
+            channel.last_frame = 199
+            channel.data = [start.slerp(end, i / 199) for i in range(200)]
+            channels.append(channel)
+        channels.append(get_animation_bit_channel(pivot=6))
+        animation = Animation(header=get_animation_header(), channels=channels)
+
+        with (patch.object(self, 'info')) as info_func:
+            compressed = compress_auto(self, animation, get_hierarchy(), max_error=0.01)
+
+            size = compressed.size() + HEAD
+            info_func.assert_called_with(f'animation size: {size} bytes (AD), uncompressed: {animation.size()} bytes '
+                                         f'({100.0 * size / animation.size():.1f}%)')
+            info_func.assert_any_call('animation channel \'b_waist\' Q: MOTION_TC (52 bytes)')
+
+        self.assertTrue(compressed.validate(self))
+        self.assertEqual(ADAPTIVE_DELTA_FLAVOR, compressed.header.flavor)
+        self.assertEqual(1, compressed.header.version.major)
+        self.assertEqual(1, len(compressed.time_coded_bit_channels))
+        self.assertEqual(8, len(compressed.motion_channels) + len(compressed.adaptive_delta_channels))
+
+        io_stream = io.BytesIO()
+        compressed.write(io_stream)
+        self.assertEqual(size, len(io_stream.getvalue()))
+        io_stream = io.BytesIO(io_stream.getvalue())
+        (_, _, chunk_end) = read_chunk_head(io_stream)
+        actual = CompressedAnimation.read(self, io_stream, chunk_end)
+        for channel in actual.motion_channels:
+            if channel.delta_type == 0:
+                self.assertEqual([0, 199], [datum.time_code for datum in channel.data])
@@ -0,0 +1,136 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import time
+import numpy as np
+from io_mesh_w3d.common.utils.bounding_volume import *
+from tests.utils import *
+
+
+class TestBoundingVolume(TestCase):
+    def assert_encloses(self, center, radius, points):
+        distances = np.linalg.norm(np.asarray(points) - center, axis=1)
+        self.assertTrue((distances <= radius + 1e-5).all())
+
+    def test_spheres_enclose_all_points(self):
+        points = np.random.default_rng(42).normal(size=(5000, 3)) * [4.0, 1.0, 0.5] + [10.0, -3.0, 2.0]
+
+        (ritter_center, ritter_radius) = ritter_sphere(points)
+        (center, radius) = minimal_sphere(points)
+
+        self.assert_encloses(ritter_center, ritter_radius, points)
+        self.assert_encloses(center, radius, points)
+        self.assertTrue(radius <= ritter_radius)
+
+    def test_minimal_sphere_of_cube(self):
+        points = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)] + [[0.5, 0.2, -0.3]])
+
+        (center, radius) = minimal_sphere(points)
+
+        self.assertTrue(np.allclose([0.0, 0.0, 0.0], center))
+        self.assertAlmostEqual(3 ** 0.5, radius, 5)
+
+    def test_minimal_sphere_of_triangle(self):
+        points = np.array([[0.0, 0.0, 0.0], [2.0, 0.0, 0.0], [0.0, 2.0, 0.0]])
+
+        (center, radius) = minimal_sphere(points)
+
+        self.assertTrue(np.allclose([1.0, 1.0, 0.0], center))
+        self.assertAlmostEqual(2 ** 0.5, radius, 5)
+
+    def test_minimal_sphere_of_obtuse_triangle_uses_longest_edge(self):
+        points = np.array([[0.0, 0.0, 0.0], [4.0, 0.0, 0.0], [2.0, 0.5, 0.0]])
+
+        (center, radius) = minimal_sphere(points)
+
+        self.assertTrue(np.allclose([2.0, 0.0, 0.0], center))
+        self.assertAlmostEqual(2.0, radius, 5)
+
+    def test_minimal_sphere_of_degenerated_points(self):
+        points = np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 1.0], [2.0, 2.0, 2.0], [2.0, 2.0, 2.0], [0.5, 0.5, 0.5]])
+
+        (center, radius) = minimal_sphere(points)
+
+        self.assertTrue(np.allclose([1.0, 1.0, 1.0], center))
+        self.assertAlmostEqual(3 ** 0.5, radius, 5)
+
+    def test_sphere_of_single_and_no_points(self):
+        for exact in [False, True]:
+            (center, radius) = bounding_sphere(np.array([[1.0, 2.0, 3.0]]), exact)
+            self.assertTrue(np.allclose([1.0, 2.0, 3.0], center))
+            self.assertEqual(0.0, radius)
+
+            (center, radius) = bounding_sphere(np.empty((0, 3)), exact)
+            self.assertEqual(0.0, radius)
+
+    def random_triangles(self, count, seed=42):
+        rng = np.random.default_rng(seed)
+        centers = rng.uniform(-10.0, 10.0, size=(count, 1, 3))
+        positions = (centers + rng.normal(scale=0.1, size=(count, 3, 3))).reshape(-1, 3)
+        return positions, np.arange(3 * count).reshape(-1, 3)
+
+    def assert_valid_aabbtree(self, positions, triangles, order, bounds, links, leaf_size):
+        self.assertEqual(list(range(len(triangles))), sorted(order.tolist()))
+        leaves = (links[:, 0] & AABBTREE_LEAF_FLAG) != 0
+        begins = links[leaves, 0] & ~AABBTREE_LEAF_FLAG
+        counts = links[leaves, 1]
+
+        self.assertTrue((counts <= leaf_size).all())
+        covered = np.zeros(len(triangles), dtype=np.int32)
+        for (node, begin, count) in zip(np.flatnonzero(leaves), begins, counts):
+            covered[begin:begin + count] += 1
+            corners = positions[triangles[order[begin:begin + count]]].reshape(-1, 3)
+            self.assertTrue((corners >= bounds[node, 0]).all() and (corners <= bounds[node, 1]).all())
+        self.assertTrue((covered == 1).all())
+
+        inner = np.flatnonzero(~leaves)
+        for child in links[inner].T:
+            self.assertTrue((bounds[child, 0] >= bounds[inner, 0]).all())
+            self.assertTrue((bounds[child, 1] <= bounds[inner, 1]).all())
+        self.assertEqual(len(bounds) - 1, len(np.unique(links[inner])))
+
+    def test_aabbtree_bounds_all_triangles(self):
+        (positions, triangles) = self.random_triangles(2000)
+
+        for method in ['SAH', 'MEDIAN']:
+            for leaf_size in [1, 4, 16]:
+                (order, bounds, links) = build_aabbtree(positions, triangles, leaf_size, method)
+                self.assert_valid_aabbtree(positions, triangles, order, bounds, links, leaf_size)
+
+    def test_aabbtree_of_identical_triangles(self):
+        positions = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+        triangles = np.zeros((10, 3), dtype=np.int64) + [0, 1, 2]
+
+        (order, bounds, links) = build_aabbtree(positions, triangles, 2)
+
+        self.assert_valid_aabbtree(positions, triangles, order, bounds, links, 2)
+        self.assertTrue(np.allclose([[0.0, 0.0, 0.0], [1.0, 1.0, 0.0]], bounds[0]))
+
+    def test_aabbtree_of_single_and_no_triangles(self):
+        (order, bounds, links) = build_aabbtree(np.eye(3), [[0, 1, 2]])
+        self.assertEqual([0], order.tolist())
+        self.assertEqual([[AABBTREE_LEAF_FLAG, 1]], links.tolist())
+
+        (order, bounds, links) = build_aabbtree(np.empty((0, 3)), np.empty((0, 3)))
+        self.assertEqual(0, len(order))
+        self.assertEqual(0, len(links))
+
+    def test_sah_aabbtree_has_smaller_surface_area_than_median(self):
+        (positions, triangles) = self.random_triangles(2000)
+        positions[:3000] *= [1.0, 0.01, 1.0]
+
+        areas = []
+        for method in ['SAH', 'MEDIAN']:
+            (_, bounds, _) = build_aabbtree(positions, triangles, method=method)
+            areas.append(surface_area(bounds[:, 1] - bounds[:, 0]).sum())
+        self.assertTrue(areas[0] < areas[1])
+
+    # run with: blender -b --python ./tests/runner.py -- --prefix benchmark
+    def benchmark_aabbtree_build(self):
+        (positions, triangles) = self.random_triangles(100000)
+
+        for method in ['SAH', 'MEDIAN']:
+            for leaf_size in [1, 4, 16]:
+                start = time.perf_counter()
+                (_, bounds, _) = build_aabbtree(positions, triangles, leaf_size, method)
+                print(f'{method} leaf size {leaf_size}: {len(bounds)} nodes in {time.perf_counter() - start:.2f}s')
@@ -6,6 +6,7 @@ import bmesh
 import io
 from mathutils import Vector
 from os.path import dirname as up
+from types import SimpleNamespace
 from unittest.mock import patch
 from shutil import copyfile
 
@@ -69,6 +70,46 @@ class TestMeshExportUtils(TestCase):
         self.assertEqual(62, len(meshes[0].verts))
         self.assertEqual(120, len(meshes[0].triangles))
 
+    def test_aabbtree_of_sphere(self):
+        mesh = bpy.data.meshes.new('sphere')
+        sphere = bpy.data.objects.new('sphere', mesh)
+
+        b_mesh = bmesh.new()
+        if bpy.app.version < (3, 0, 0):
+            bmesh.ops.create_uvsphere(b_mesh, u_segments=12, v_segments=6, diameter=35)
+        else:
+            bmesh.ops.create_uvsphere(b_mesh, u_segments=12, v_segments=6, radius=17.5)
+        b_mesh.to_mesh(mesh)
+        b_mesh.free()
+
+        coll = get_collection()
+        coll.objects.link(sphere)
+
+        meshes, _ = retrieve_meshes(self, None, None, 'container_name', create_aabbtrees=True)
+
+        aabbtree = meshes[0].aabbtree
+        self.assertEqual(120, aabbtree.header.poly_count)
+        self.assertEqual(len(aabbtree.nodes), aabbtree.header.node_count)
+        self.assertEqual(list(range(120)), aabbtree.poly_indices)
+        self.assertEqual(120, sum(node.polys.count for node in aabbtree.nodes if node.polys is not None))
+        compare_vectors(self, Vector((-17.5, -17.5, -17.5)), aabbtree.nodes[0].min)
+        compare_vectors(self, Vector((17.5, 17.5, 17.5)), aabbtree.nodes[0].max)
+
+    def test_create_aabbtree_reorders_triangles(self):
+        mesh = get_mesh()
+        triangles = list(mesh.triangles)
+
+        create_aabbtree(mesh, leaf_size=1)
+
+        self.assertEqual(sorted(triangles, key=id), sorted(mesh.triangles, key=id))
+        for node in mesh.aabbtree.nodes:
+            if node.polys is None:
+                continue
+            self.assertEqual(1, node.polys.count)
+            for vert_id in mesh.triangles[node.polys.begin].vert_ids:
+                for i in range(3):
+                    self.assertTrue(node.min[i] <= mesh.verts[vert_id][i] <= node.max[i])
+
     def test_used_texture_file_ending_is_correct(self):
         create_mesh(self, get_mesh(), get_collection())
 
@@ -230,6 +271,45 @@ class TestMeshExportUtils(TestCase):
 
         self.fail('expected exception was not thrown')
 
+    def test_get_bone_indices(self):
+        hierarchy = get_hierarchy()
+        mesh_object = SimpleNamespace(vertex_groups=[SimpleNamespace(name='ARMR'), SimpleNamespace(name='b_hip'),
+                                                     SimpleNamespace(name='invalid')])
+        groups = np.array([[0, -1], [1, 0], [1, -1]], dtype=np.int32)
+
+        self.assertEqual([[5, 0], [2, 5], [2, 0]], get_bone_indices(hierarchy, mesh_object, groups).tolist())
+
+        with self.assertRaises(Exception) as context:
+            get_bone_indices(hierarchy, mesh_object, np.array([[0, 2]], dtype=np.int32))
+        self.assertEqual('no matching armature bone found for vertex group \'invalid\'', str(context.exception))
+
+    def test_retrieve_meshes_skinned_bone_indices_and_weights(self):
+        coll = get_collection()
+        mesh = get_mesh(skin=True)
+        mesh.vert_infs = [get_vertex_influence(1, 0, 1.0, 0.0),
+                          get_vertex_influence(2, 0, 0.0, 0.0),
+                          get_vertex_influence(2, 1, 0.75, 0.25),
+                          get_vertex_influence(2, 1, 0.75, 0.25),
+                          get_vertex_influence(3, 2, 0.5, 0.5),
+                          get_vertex_influence(3, 2, 0.5, 0.5),
+                          get_vertex_influence(4, 3, 0.25, 0.75),
+                          get_vertex_influence(4, 3, 0.4, 0.4)]
+        create_mesh(self, mesh, coll)
+
+        hierarchy = get_hierarchy()
+        rig = get_or_create_skeleton(hierarchy, coll)
+        rig_mesh(mesh, hierarchy, rig)
+
+        mesh_structs, _ = retrieve_meshes(self, hierarchy, rig, 'container_name')
+
+        # vertices without weights are fully bound to their bone, the weights of each vertex add up to 1
+        expected = {(1, 0, 1.0, 0.0), (2, 0, 1.0, 0.0), (2, 1, 0.75, 0.25), (3, 2, 0.5, 0.5), (4, 3, 0.25, 0.75),
+                    (4, 3, 0.5, 0.5)}
+        self.assertTrue(mesh_structs[0].multi_bone_skinned)
+        self.assertEqual(len(mesh_structs[0].verts), len(mesh_structs[0].vert_infs))
+        self.assertEqual(expected, {(inf.bone_idx, inf.xtra_idx, round(inf.bone_inf, 3), round(inf.xtra_inf, 3))
+                                    for inf in mesh_structs[0].vert_infs})
+
     def test_retrieve_meshes_with_mesh_name_identical_to_bone_name_but_bone_is_not_parent_of_mesh_nor_is_mesh_skin(
             self):
         coll = get_collection()
@@ -338,10 +418,11 @@ class TestMeshExportUtils(TestCase):
         for i, datum in enumerate(uv_layer.data):
             datum.uv = tx_coords[i]
 
-        _mesh = prepare_bmesh(self, mesh)
+        prepare_bmesh(self, mesh)
+        (source_vertices, _) = split_multi_uv_vertices(self, mesh, get_loop_vertex_indices(mesh))
 
-        self.assertEqual(8, len(_mesh.verts))
-        self.assertEqual(12, len(_mesh.faces))
+        self.assertEqual(8, len(source_vertices))
+        self.assertEqual(12, len(mesh.polygons))
 
     def test_multi_uv_vertex_splitting(self):
         mesh = bpy.data.meshes.new('mesh')
@@ -379,10 +460,13 @@ class TestMeshExportUtils(TestCase):
         for i, datum in enumerate(uv_layer.data):
             datum.uv = tx_coords[i]
 
-        _mesh = prepare_bmesh(self, mesh)
+        prepare_bmesh(self, mesh)
+        (source_vertices, loop_vertices) = split_multi_uv_vertices(self, mesh, get_loop_vertex_indices(mesh))
 
-        self.assertEqual(36, len(_mesh.verts))
-        self.assertEqual(12, len(_mesh.faces))
+        # the two triangles of each quad share the uv coordinates of the diagonal
+        self.assertEqual(24, len(source_vertices))
+        self.assertEqual(12, len(mesh.polygons))
+        self.assertEqual(list(range(24)), sorted(set(loop_vertices.tolist())))
 
     def test_multi_uv_vertex_splitting_triangulated(self):
         mesh = bpy.data.meshes.new('mesh')
@@ -434,10 +518,35 @@ class TestMeshExportUtils(TestCase):
         for i, datum in enumerate(uv_layer.data):
             datum.uv = tx_coords[i]
 
-        _mesh = prepare_bmesh(self, mesh)
+        prepare_bmesh(self, mesh)
+        (source_vertices, _) = split_multi_uv_vertices(self, mesh, get_loop_vertex_indices(mesh))
+
+        self.assertEqual(36, len(source_vertices))
+        self.assertEqual(12, len(mesh.polygons))
+
+    def test_multi_uv_vertex_splitting_keeps_vertex_normals(self):
+        mesh = bpy.data.meshes.new('mesh_cube')
+        mesh.materials.append(bpy.data.materials.new('material'))
+
+        b_mesh = bmesh.new()
+        bmesh.ops.create_cube(b_mesh, size=1)
+        bmesh.ops.triangulate(b_mesh, faces=b_mesh.faces)
+        b_mesh.to_mesh(mesh)
+
+        uv_layer = mesh.uv_layers.new(do_init=False)
+        for i, datum in enumerate(uv_layer.data):
+            datum.uv = Vector((i * 0.01, 0.0))
+
+        mesh_ob = bpy.data.objects.new('mesh_object', mesh)
+        mesh_ob.data.object_type = 'MESH'
+        bpy.context.scene.collection.objects.link(mesh_ob)
+
+        meshes, _ = retrieve_meshes(self, None, None, 'container_name')
 
-        self.assertEqual(36, len(_mesh.verts))
-        self.assertEqual(12, len(_mesh.faces))
+        # every corner is split, but the split vertices keep the smooth normal of their source vertex
+        self.assertEqual(36, len(meshes[0].verts))
+        for vert, normal in zip(meshes[0].verts, meshes[0].normals):
+            compare_vectors(self, Vector(vert).normalized(), Vector(normal))
 
     def test_mesh_with_unconnected_vertex_export(self):
         self.file_format = 'W3X'
@@ -149,6 +149,51 @@ class TestMeshImportUtils(TestCase):
         self.assertEqual('', mesh.parent_bone)
         self.assertEqual('OBJECT', mesh.parent_type)
 
+    def test_skinned_mesh_vertex_groups_and_weights(self):
+        mesh_name = 'soldier'
+        mesh_struct = get_mesh(mesh_name, skin=True)
+        mesh_struct.vert_infs = [get_vertex_influence(2, 0, 0.0, 0.0),
+                                 get_vertex_influence(2, 1, 0.25, 0.75),
+                                 get_vertex_influence(1, 0, 1.0, 0.0),
+                                 get_vertex_influence(1, 2, 0.5, 0.5),
+                                 get_vertex_influence(1, 2, 0.6, 0.4),
+                                 get_vertex_influence(2, 1, 0.25, 0.75),
+                                 get_vertex_influence(1, 0, 0.0, 0.0),
+                                 get_vertex_influence(2, 1, 0.9, 0.1)]
+
+        hierarchy = get_hierarchy()
+        hierarchy.header.name = 'containerName'
+        hierarchy.pivots = [get_roottransform(),
+                            get_hierarchy_pivot(name='hip', parent=0),
+                            get_hierarchy_pivot(name='arm', parent=1)]
+        hierarchy.header.num_pivots = len(hierarchy.pivots)
+
+        create_mesh(self, mesh_struct, bpy.context.scene.collection)
+        get_or_create_skeleton(hierarchy, bpy.context.scene.collection)
+
+        rig = bpy.data.objects[hierarchy.name()]
+        rig_mesh(mesh_struct, hierarchy, rig)
+
+        # the result of assigning the weights vertex by vertex: the groups are created in the order the bones
+        # are referenced and vertices without any influence are fully weighted to their bone
+        expected = [{'arm': 1.0},
+                    {'arm': 0.25, 'hip': 0.75},
+                    {'hip': 1.0},
+                    {'hip': 0.5, 'arm': 0.5},
+                    {'hip': 0.6, 'arm': 0.4},
+                    {'arm': 0.25, 'hip': 0.75},
+                    {'hip': 1.0},
+                    {'arm': 0.9, 'hip': 0.1}]
+
+        mesh_ob = bpy.data.objects[mesh_name]
+        self.assertEqual(['arm', 'hip'], [group.name for group in mesh_ob.vertex_groups])
+
+        for i, vertex in enumerate(mesh_ob.data.vertices):
+            actual = {mesh_ob.vertex_groups[group.group].name: group.weight for group in vertex.groups}
+            self.assertEqual(expected[i].keys(), actual.keys())
+            for name, weight in expected[i].items():
+                self.assertAlmostEqual(weight, actual[name], 5)
+
     def test_mesh_has_bone_as_parent(self):
         mesh_name = 'soldier'
         mesh_struct = get_mesh(mesh_name)
@@ -40,8 +40,9 @@ def compare_aabbtree_nodes(self, expected, actual):
     compare_vectors(self, expected.max, actual.max)
     if expected.children is not None:
         self.assertEqual(expected.children.front, actual.children.front)
-        self.assertEqual(expected.children.front, actual.children.front)
+        self.assertEqual(expected.children.back, actual.children.back)
     if expected.polys is not None:
+        self.assertIsNone(actual.children)
         self.assertEqual(expected.polys.begin, actual.polys.begin)
         self.assertEqual(expected.polys.count, actual.polys.count)
 
@@ -72,6 +72,9 @@ class TestCompressedAnimation(TestCase):
 
         ani = get_compressed_animation()
         ani.time_coded_channels = []
+        self.assertTrue(ani.validate(self))
+
+        ani.time_coded_bit_channels = []
         self.assertFalse(ani.validate(self))
         self.assertFalse(ani.validate(self, w3x=True))
 
@@ -2,6 +2,7 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import unittest
+import numpy as np
 
 from io_mesh_w3d.w3d.adaptive_delta import *
 from tests.common.helpers.animation import *
@@ -36,6 +37,14 @@ class TestAdaptiveDelta(TestCase):
 
         self.assertEqual(expected, actual)
 
+    def test_unpack_deltas(self):
+        for num_bits in [4, 8]:
+            delta_bytes = np.random.default_rng(num_bits).integers(-128, 128, size=(10, 2 * num_bits)).tolist()
+
+            actual = unpack_deltas(delta_bytes, num_bits)
+
+            self.assertEqual([get_deltas(block, num_bits) for block in delta_bytes], actual.tolist())
+
     def test_decode_channel_ad(self):
         channel = get_adaptive_delta_animation_channel(type=0)
         expected = [4.3611, 15.5264, 29.4832, 49.0226, 68.5621]
@@ -44,7 +53,7 @@ class TestAdaptiveDelta(TestCase):
 
         self.assertEqual(len(expected), len(actual))
         for i, value in enumerate(expected):
-            self.assertAlmostEqual(value, actual[i], 3)
+            self.assertAlmostEqual(value, actual[i, 0], 3)
 
     def test_decode_motion_channel_ad(self):
         channel = get_motion_channel(type=0, delta_type=1, num_time_codes=5)
@@ -54,34 +63,72 @@ class TestAdaptiveDelta(TestCase):
 
         self.assertEqual(len(expected), len(actual))
         for i, value in enumerate(expected):
-            self.assertAlmostEqual(value, actual[i], 3)
-
-    def test_encode_8bit(self):
-        channel = AnimationChannel(
-            first_frame=0,
-            last_frame=7,
-            type=1,
-            pivot=2,
-            unknown=0,
-            data=[4.3611, 4.3611, 4.6254, 4.9559, 5.4186, 5.8812])
-        expected = [95, 44, 12, 2, 12, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-
-        actual = encode(channel, num_bits=8)
-
-        # self.assertEqual(len(expected), len(actual))
-        # self.assertEqual(expected, actual)
-
-    def test_encode_4bit(self):
-        channel = AnimationChannel(
-            first_frame=0,
-            last_frame=7,
-            type=1,
-            pivot=2,
-            unknown=0,
-            data=[4.3611, 4.3611, 4.6254, 4.9559, 5.4186, 5.8812])
-        expected = []  # ?
-
-        actual = encode(channel, num_bits=4)
-
-        # self.assertEqual(len(expected), len(actual))
-        # self.assertEqual(expected, actual)
+            self.assertAlmostEqual(value, actual[i, 0], 3)
+
+    def test_set_deltas_8bit_zero_and_limits(self):
+        deltas = [0, -128, 127, -1, 1] + [0] * 11
+
+        self.assertEqual(deltas, get_deltas(set_deltas(deltas, 8), 8))
+
+    def test_encode_decode_4bit(self):
+        values = (np.sin(np.linspace(0.0, 4.0 * np.pi, 50)) * 2.0).tolist()
+
+        (scale, data, error) = encode(1, 1, values, num_bits=4)
+        actual = decode(1, 1, len(values), scale, data)
+
+        self.assertEqual(4, data.bit_count)
+        self.assertEqual(4, len(data.delta_blocks))
+        self.assertTrue(error < 0.05)
+        for i, value in enumerate(values):
+            self.assertTrue(abs(value - actual[i, 0]) <= error + 1e-6)
+
+    def test_encode_decode_8bit(self):
+        values = [4.3611, 4.3611, 4.6254, 4.9559, 5.4186, 5.8812]
+
+        (scale, data, error) = encode(1, 1, values, num_bits=8)
+        actual = decode(1, 1, len(values), scale, data)
+
+        self.assertEqual(8, data.bit_count)
+        self.assertEqual(1, len(data.delta_blocks))
+        self.assertEqual(16, len(data.delta_blocks[0].delta_bytes))
+        self.assertTrue(error < 0.002)
+        for i, value in enumerate(values):
+            self.assertTrue(abs(value - actual[i, 0]) <= error + 1e-6)
+
+    def test_encode_8bit_is_more_precise_than_4bit(self):
+        values = (np.cumsum(np.random.default_rng(42).normal(size=100)) * 0.1).tolist()
+
+        (_, _, error_4bit) = encode(0, 1, values, num_bits=4)
+        (_, _, error_8bit) = encode(0, 1, values, num_bits=8)
+
+        self.assertTrue(error_8bit < error_4bit)
+
+    def test_encode_decode_quaternions(self):
+        start = get_quat(1.0, 0.0, 0.0, 0.0)
+        end = get_quat(0.7, 0.7, 0.1, 0.0).normalized()
+        values = [start.slerp(end, i / 40) for i in range(41)]
+        values[5].negate()
+
+        (scale, data, error) = encode(6, 4, values, num_bits=4)
+        actual = decode(6, 4, len(values), scale, data)
+
+        self.assertEqual(3 * 4, len(data.delta_blocks))
+        self.assertEqual([0, 1, 2, 3] * 3, [block.vector_index for block in data.delta_blocks])
+        self.assertTrue(error < 0.01)
+        for i, value in enumerate(values):
+            self.assertTrue(abs(value.dot(Quaternion(actual[i]))) > 0.999)
+
+    def test_encode_constant_values(self):
+        (scale, data, error) = encode(0, 1, [1.5] * 20, num_bits=4)
+
+        self.assertEqual(0.0, error)
+        self.assertEqual([[1.5]] * 20, decode(0, 1, 20, scale, data).tolist())
+
+    def test_encoded_channel_write_read(self):
+        values = (np.linspace(0.0, 3.0, 33) ** 2).tolist()
+        (scale, data, _) = encode(2, 1, values)
+        expected = AdaptiveDeltaAnimationChannel(
+            num_time_codes=len(values), pivot=3, vector_len=1, type=2, scale=scale, data=data)
+
+        self.write_read_test(expected, W3D_CHUNK_COMPRESSED_ANIMATION_CHANNEL, AdaptiveDeltaAnimationChannel.read,
+                             compare_adaptive_delta_animation_channels)
@@ -0,0 +1,93 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+from io_mesh_w3d.w3d.chunk_index import *
+from tests.common.helpers.collision_box import *
+from tests.common.helpers.hierarchy import *
+from tests.common.helpers.hlod import *
+from tests.common.helpers.mesh import *
+from tests.w3d.helpers.compressed_animation import *
+from tests.utils import *
+
+
+class TestChunkIndex(TestCase):
+    def write_file(self, structs):
+        path = self.outpath() + 'output.w3d'
+        file = open(path, 'wb')
+        for struct in structs:
+            struct.write(file)
+        file.close()
+        return path
+
+    def test_index_records_chunk_heads(self):
+        hierarchy = get_hierarchy()
+        mesh = get_mesh(name='sword')
+        box = get_collision_box()
+        hlod = get_hlod()
+        path = self.write_file([hierarchy, mesh, box, hlod])
+
+        index = W3DChunkIndex(self, path)
+
+        self.assertEqual([W3D_CHUNK_HIERARCHY, W3D_CHUNK_MESH, W3D_CHUNK_BOX, W3D_CHUNK_HLOD],
+                         [entry.chunk_type for entry in index.entries])
+        self.assertEqual(HEAD, index.entries[0].offset)
+        self.assertEqual(hierarchy.size(False), index.entries[0].size)
+        self.assertEqual(hierarchy.size() + HEAD, index.entries[1].offset)
+        self.assertEqual(mesh.size(False), index.entries[1].size)
+        self.assertTrue(index.contains(W3D_CHUNK_BOX))
+        self.assertFalse(index.contains(W3D_CHUNK_ANIMATION))
+        self.assertEqual({}, index.structs)
+        index.close()
+
+    def test_structs_are_decoded_on_demand(self):
+        hierarchy = get_hierarchy()
+        meshes = [get_mesh(name='sword'), get_mesh(name='soldier', skin=True)]
+        hlod = get_hlod()
+        animation = get_compressed_animation()
+        path = self.write_file([hierarchy] + meshes + [hlod, animation])
+
+        index = W3DChunkIndex(self, path)
+
+        compare_hlods(self, hlod, index.hlod())
+        self.assertEqual(1, len(index.structs))
+
+        actual_meshes = index.meshes()
+        self.assertEqual(len(meshes), len(actual_meshes))
+        for i, mesh in enumerate(meshes):
+            compare_meshes(self, mesh, actual_meshes[i])
+
+        compare_hierarchies(self, hierarchy, index.hierarchy())
+        compare_compressed_animations(self, animation, index.compressed_animation())
+        self.assertIsNone(index.animation())
+        self.assertIs(index.hlod(), index.hlod())
+        index.close()
+
+    def test_headers_are_read_without_decoding_the_struct(self):
+        hierarchy = get_hierarchy()
+        mesh = get_mesh(name='sword')
+        hlod = get_hlod('TestModelName', 'TestHiera_SKL')
+        path = self.write_file([hierarchy, mesh, hlod])
+
+        index = W3DChunkIndex(self, path)
+
+        self.assertEqual('TestHiera_SKL', index.first_header(W3D_CHUNK_HLOD).hierarchy_name)
+        self.assertEqual(hierarchy.header.name, index.first_header(W3D_CHUNK_HIERARCHY).name)
+        self.assertEqual('sword', index.first_header(W3D_CHUNK_MESH).mesh_name)
+        self.assertIsNone(index.first_header(W3D_CHUNK_ANIMATION))
+        self.assertEqual({}, index.structs)
+        index.close()
+
+    def test_unsupported_chunk_is_not_decoded(self):
+        path = self.outpath() + 'output.w3d'
+        file = open(path, 'wb')
+        write_chunk_head(0x01, file, 1)
+        write_ubyte(0x00, file)
+        file.close()
+
+        index = W3DChunkIndex(self, path)
+        self.assertEqual(1, len(index.entries))
+
+        self.warning = lambda text: self.assertEqual('chunk_type 0x1 can not be decoded by the chunk index', text)
+        self.assertIsNone(index.get(index.entries[0]))
+        self.assertIsNone(index.get_header(index.entries[0]))
+        index.close()
@@ -34,6 +34,28 @@ class TestImport(TestCase):
         self.filepath = self.outpath() + 'base_skn.w3d'
         load(self)
 
+    def test_import_decodes_only_the_hierarchy_of_the_skeleton_file(self):
+        hierarchy_name = 'TestHiera_SKL'
+        hlod = get_hlod('TestModelName', hierarchy_name)
+
+        skn = open(self.outpath() + 'base_skn.w3d', 'wb')
+        get_mesh(name='sword').write(skn)
+        hlod.write(skn)
+        skn.close()
+
+        skl = open(self.outpath() + hierarchy_name.lower() + '.w3d', 'wb')
+        get_hierarchy(hierarchy_name).write(skl)
+        get_mesh(name='skeleton_mesh').write(skl)
+        skl.close()
+
+        self.filepath = self.outpath() + 'base_skn.w3d'
+        with (patch('io_mesh_w3d.w3d.import_w3d.create_data')) as create_data:
+            load(self)
+
+        (_, meshes, _, hierarchy, _, _, _, _) = create_data.call_args[0]
+        self.assertEqual(['sword'], [mesh.name() for mesh in meshes])
+        self.assertEqual(hierarchy_name, hierarchy.name())
+
     def test_skips_multiple_hlod_chunks(self):
         hlod = get_hlod()
         skn = open(self.outpath() + 'output.w3d', 'wb')
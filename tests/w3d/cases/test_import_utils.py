@@ -28,13 +28,11 @@ class TestImportUtilsW3D(TestCase):
         mesh.from_pydata(verts, [], triangles)
         mesh.update()
         mesh.validate()
-        b_mesh = bmesh.new()
-        b_mesh.from_mesh(mesh)
 
         mesh_struct.material_passes[0].tx_stages.append(get_texture_stage())
 
         for mat_pass in mesh_struct.material_passes:
-            create_uvlayer(self, mesh, b_mesh, triangles, mat_pass)
+            create_uvlayer(self, mesh, mat_pass)
 
     def test_mesh_import_2_textures_1_vertex_material(self):
         mesh = get_mesh_two_textures()
@@ -346,3 +346,63 @@ class TestIOBinary(TestCase):
 
             self.assertEqual(expecteds[i][0], chunk_type)
             self.assertEqual(expecteds[i][1], chunk_size)
+
+    def test_read_long_array(self):
+        inputs = [0, 1, 200, 999999, 123456, -5, -500]
+
+        io_stream = io.BytesIO()
+        write_list(inputs, io_stream, write_long)
+        io_stream = io.BytesIO(io_stream.getvalue())
+
+        self.assertEqual(inputs, read_long_array(io_stream, len(inputs) * 4))
+
+    def test_mapped_stream_read_seek_tell(self):
+        stream = MappedStream(memoryview(struct.pack('<lLf', -5, 200, 3.5)))
+
+        self.assertEqual(-5, read_long(stream))
+        self.assertEqual(4, stream.tell())
+        stream.seek(4, 1)
+        self.assertAlmostEqual(3.5, read_float(stream), 5)
+        stream.seek(4)
+        self.assertEqual(200, read_ulong(stream))
+        stream.seek(-4, 2)
+        self.assertEqual(8, stream.tell())
+        self.assertEqual(b'', stream.read(0))
+
+    def test_mapped_stream_view_is_bounded(self):
+        io_stream = io.BytesIO()
+        write_chunk_head(0x02, io_stream, 12)
+        write_vector(get_vec(1, 2, 3), io_stream)
+        write_chunk_head(0x03, io_stream, 4)
+        write_long(7, io_stream)
+
+        stream = MappedStream(memoryview(io_stream.getvalue()))
+        (_, _, chunk_end) = read_chunk_head(stream)
+        chunk = stream.view(chunk_end)
+
+        self.assertEqual(8, chunk.tell())
+        compare_vectors(self, get_vec(1, 2, 3), read_vector(chunk))
+        self.assertEqual(chunk_end, chunk.tell())
+        self.assertEqual(b'', chunk.read(4))
+        self.assertEqual(8, stream.tell())
+
+    def test_mapped_stream_open(self):
+        path = self.outpath() + 'mapped.w3d'
+        file = open(path, 'wb')
+        write_chunk_head(0x20, file, 4)
+        write_long(-500, file)
+        file.close()
+
+        stream = MappedStream.open(path)
+        self.assertEqual(12, stream.end)
+        self.assertEqual((0x20, 4, 12), read_chunk_head(stream))
+        self.assertEqual([-500], read_long_array(stream, 12))
+        stream.close()
+
+    def test_mapped_stream_open_empty_file(self):
+        path = self.outpath() + 'empty.w3d'
+        open(path, 'wb').close()
+
+        stream = MappedStream.open(path)
+        self.assertEqual(0, stream.end)
+        stream.close()
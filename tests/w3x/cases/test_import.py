@@ -61,8 +61,8 @@ class TestObjectImport(TestCase):
         load(self)
 
     @patch('io_mesh_w3d.w3x.import_w3x.os.path.dirname', return_value='')
-    @patch('io_mesh_w3d.w3x.import_w3x.find_root', return_value=None)
-    def test_load_file_root_is_none(self, root, dirname):
+    @patch('io_mesh_w3d.w3x.import_w3x.stream_assets', return_value=[])
+    def test_load_file_root_is_none(self, assets, dirname):
         path = self.outpath() + 'output.w3x'
 
         file = open(path, 'w')
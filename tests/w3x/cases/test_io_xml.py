@@ -1,8 +1,15 @@
 # <pep8 compliant>
 # Written by Stephan Vedder and Michael Schnabel
 
+import numpy as np
 from tests.utils import *
 from tests.mathutils import *
+from tests.common.helpers.animation import *
+from tests.common.helpers.collision_box import *
+from tests.common.helpers.hierarchy import *
+from tests.common.helpers.hlod import *
+from tests.common.helpers.mesh import *
+from tests.w3x.helpers.include import *
 
 
 class FakeStruct():
@@ -10,6 +17,12 @@ class FakeStruct():
         obj = create_node(parent, 'obj')
 
 
+class FailingStruct():
+    def create(self, parent):
+        create_node(parent, 'obj')
+        raise ValueError('failed to create')
+
+
 class TestIOXML(TestCase):
     def test_create_node(self):
         root = ET.Element('root')
@@ -34,6 +47,119 @@ class TestIOXML(TestCase):
         for i, exp in enumerate(expected):
             self.assertEqual(exp, actual[i])
 
+    def test_write_struct_removes_incomplete_file_if_create_fails(self):
+        with self.assertRaises(ValueError):
+            write_struct(FailingStruct(), self.outpath() + 'test.xml')
+
+        self.assertFalse(os.path.exists(self.outpath() + 'test.xml'))
+
+    def test_writing_root_closes_file_if_create_fails(self):
+        root = open_root(self.outpath() + 'test.xml')
+
+        with self.assertRaises(ValueError):
+            with writing_root(root):
+                FailingStruct().create(root)
+
+        self.assertTrue(root.file.closed)
+        self.assertFalse(os.path.exists(self.outpath() + 'test.xml'))
+
+    def test_writing_root_closes_root(self):
+        root = open_root(self.outpath() + 'test.xml')
+
+        with writing_root(root):
+            FakeStruct().create(root)
+
+        self.assertTrue(root.file.closed)
+        file = open(self.outpath() + 'test.xml', mode='r')
+        self.assertEqual('</AssetDeclaration>\n', file.readlines()[-1])
+        file.close()
+
+    def test_write_struct_is_identical_to_write(self):
+        structs = [get_mesh(), get_mesh(skin=True, shader_mats=True), get_hierarchy(), get_animation(),
+                   get_hlod(), get_collision_box(name='äöü.BOUNDINGBOX'), get_include(), FakeStruct()]
+
+        for i, struct in enumerate(structs):
+            root = create_root()
+            struct.create(root)
+            write(root, self.outpath() + 'expected.xml')
+            write_struct(struct, self.outpath() + 'actual.xml')
+
+            file = open(self.outpath() + 'expected.xml', mode='rb')
+            expected = file.read()
+            file.close()
+            file = open(self.outpath() + 'actual.xml', mode='rb')
+            actual = file.read()
+            file.close()
+
+            self.assertEqual(expected, actual, f'struct {i}')
+
+    def test_create_vectors_and_values_write_large_lists_identical(self):
+        vectors = [get_vec(i * 0.1, -i * 0.3, 1.0 / (i + 1)) for i in range(CHUNK_SIZE + 10)]
+        quats = [get_quat(1.0, 0.0, -0.5, i * 0.01) for i in range(20)]
+        values = [i * 0.25 for i in range(CHUNK_SIZE * 2)]
+
+        for root, path in [(create_root(), 'expected.xml'), (open_root(self.outpath() + 'actual.xml'), None)]:
+            vertices = create_node(root, 'Vertices')
+            for vec in vectors:
+                create_vector(vec, vertices, 'V')
+            create_vector_list(root, 'Empty', [], 'V')
+            channel = create_node(root, 'Channel')
+            channel.set('Pivot', '1')
+            for quat in quats:
+                create_quaternion(quat, channel, 'Frame')
+            frames = create_node(root, 'Frames')
+            for value in values:
+                create_value(value, frames, 'Frame')
+            if path is not None:
+                write(root, self.outpath() + path)
+            else:
+                close_root(root)
+
+        for root in [create_root(), open_root(self.outpath() + 'batched.xml')]:
+            create_vector_list(root, 'Vertices', vectors, 'V')
+            create_vector_list(root, 'Empty', [], 'V')
+            channel = create_node(root, 'Channel')
+            channel.set('Pivot', '1')
+            create_vectors(channel, quats, 'Frame', QUATERNION)
+            create_value_list(root, 'Frames', values, 'Frame')
+            if isinstance(root, StreamNode):
+                close_root(root)
+            else:
+                write(root, self.outpath() + 'batched_tree.xml')
+
+        file = open(self.outpath() + 'expected.xml', mode='rb')
+        expected = file.read()
+        file.close()
+        for path in ['actual.xml', 'batched.xml', 'batched_tree.xml']:
+            file = open(self.outpath() + path, mode='rb')
+            self.assertEqual(expected, file.read(), path)
+            file.close()
+
+    def test_create_vectors_of_vector_array_and_other_sequences(self):
+        vectors = [get_vec(0.5, -1.0, 2.0)]
+        expected = '<Vertices>\n    <V X="0.500000" Y="-1.000000" Z="2.000000" />\n  </Vertices>'
+
+        # a numpy array of a single vector has a 'size' of 3 as well, but is no VectorArray
+        for vecs in [VectorArray.from_vectors(vectors), vectors, np.array([tuple(vec) for vec in vectors])]:
+            root = open_root(self.outpath() + 'test.xml')
+            create_vectors(create_node(root, 'Vertices'), vecs, 'V')
+            close_root(root)
+
+            file = open(self.outpath() + 'test.xml', mode='r')
+            self.assertIn(expected, file.read())
+            file.close()
+
+    def test_stream_node_without_children(self):
+        root = open_named_root(self.outpath() + 'test.xml', 'Root')
+        root.set('Name', 'a < "b"')
+        close_root(root)
+
+        file = open(self.outpath() + 'test.xml', mode='r')
+        actual = file.read()
+        file.close()
+
+        self.assertEqual('<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<Root Name="a &lt; &quot;b&quot;" />', actual)
+
     def test_pretty_print(self):
         expected = '<AssetDeclaration xmlns="uri:ea.com:eala:asset" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">\n  <Child1 />\n  <Child2 />\n</AssetDeclaration>\n'
         root = create_root()
@@ -104,6 +230,53 @@ class TestIOXML(TestCase):
         root = find_root(self, path)
         self.assertIsNone(root)
 
+    def test_stream_assets(self):
+        data = '<AssetDeclaration xmlns="uri:ea.com:eala:asset" ' \
+               'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">' \
+               '<W3DMesh id="a"><Vertices><V X="1.0"/></Vertices></W3DMesh>' \
+               '<W3DHierarchy id="b"><Pivot/><Pivot/></W3DHierarchy></AssetDeclaration>'
+        file = open(self.outpath() + 'test.xml', 'w')
+        file.write(data)
+        file.close()
+
+        nodes = []
+        for node in stream_assets(self, self.outpath() + 'test.xml'):
+            self.assertEqual(node.tag, 'W3DMesh' if not nodes else 'W3DHierarchy')
+            self.assertEqual('a' if not nodes else 'b', node.get('id'))
+            if node.tag == 'W3DMesh':
+                self.assertEqual('Vertices', node[0].tag)
+                self.assertEqual('V', node[0][0].tag)
+            else:
+                self.assertEqual(2, len(node))
+            nodes.append(node)
+
+        self.assertEqual(2, len(nodes))
+        for node in nodes:
+            self.assertEqual(0, len(node))
+            self.assertIsNone(node.get('id'))
+
+    def test_stream_assets_none_found(self):
+        path = self.outpath() + 'test.xml'
+        self.error = lambda text: self.assertEqual('file: ' + path + ' does not contain a AssetDeclaration node!', text)
+
+        data = '<?xml version=\'1.0\' encoding=\'utf8\'?><root><W3DMesh/></root>'
+        file = open(path, 'w')
+        file.write(data)
+        file.close()
+
+        self.assertEqual([], list(stream_assets(self, path)))
+
+    def test_stream_assets_parse_error(self):
+        path = self.outpath() + 'test.xml'
+        self.error = lambda text: self.assertEqual('file: ' + path + ' does not contain valid XML data!', text)
+
+        data = 'Invalid Data'
+        file = open(path, 'w')
+        file.write(data)
+        file.close()
+
+        self.assertEqual([], list(stream_assets(self, path)))
+
     def test_create_root(self):
         root = create_root()
         create_node(root, 'Test')
@@ -139,6 +312,43 @@ class TestIOXML(TestCase):
         actual = parse_float(obj, 'X')
         self.assertEqual(expected, actual)
 
+    def test_parse_float_decimal_comma(self):
+        root = ET.fromstring('<root><Vector X="3,14"/></root>')
+
+        self.assertEqual(3.14, parse_float(root.find('Vector'), 'X'))
+        self.assertEqual(1.0, parse_float(root.find('Vector'), 'W', 1.0))
+
+    def test_parse_values(self):
+        root = ET.fromstring('<root><F>3.14</F><F>-2</F><F>1e-3</F></root>')
+        self.assertEqual([3.14, -2.0, 0.001], parse_values(root, 'F'))
+
+        root = ET.fromstring('<root><F>3,14</F><F>-2</F></root>')
+        self.assertEqual([3.14, -2.0], parse_values(root, 'F'))
+
+    def test_parse_vectors(self):
+        root = ET.fromstring('<root><V X="1.5" Y="2" Z="-3"/><V X="0,25" Z="1"/><Other X="4"/></root>')
+
+        actual = parse_vectors(root, 'V')
+
+        self.assertEqual(2, len(actual))
+        compare_vectors(self, get_vec(1.5, 2.0, -3.0), actual[0])
+        compare_vectors(self, get_vec(0.25, 0.0, 1.0), actual[1])
+        self.assertEqual([], parse_vectors(root, 'N'))
+
+    def test_parse_vectors_vector2(self):
+        root = ET.fromstring('<root><T X="0.5" Y="0.25"/><T X="1" Y="0"/></root>')
+
+        self.assertEqual(array('f', [0.5, 0.25, 1.0, 0.0]), parse_float_array(root, 'T', VECTOR2))
+        self.assertEqual([get_vec2(0.5, 0.25), get_vec2(1.0, 0.0)], parse_vectors(root, 'T', VECTOR2))
+
+    def test_parse_quaternions_no_attributes(self):
+        root = ET.fromstring('<root><Q/><Q W="0" X="1" Y="0" Z="0"/></root>')
+
+        actual = parse_quaternions(root, 'Q')
+
+        compare_quats(self, get_quat(1.0, 0.0, 0.0, 0.0), actual[0])
+        compare_quats(self, get_quat(0.0, 1.0, 0.0, 0.0), actual[1])
+
     def test_create_value(self):
         expected = '3.14'
         root = ET.Element('root')
@@ -0,0 +1,21 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+# runs the converter of io_mesh_w3d/convert.py without blender
+# usage: python w3d_convert.py --to W3X <file or directory>... [-o <output directory>] [-j <workers>]
+
+import os
+import sys
+import types
+
+# the __init__ of io_mesh_w3d registers the blender addon and thus needs bpy,
+# the converter only uses the struct level modules, so the package is set up without running it
+if 'io_mesh_w3d' not in sys.modules:
+    package = types.ModuleType('io_mesh_w3d')
+    package.__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'io_mesh_w3d')]
+    sys.modules['io_mesh_w3d'] = package
+
+from io_mesh_w3d.convert import main
+
+if __name__ == '__main__':
+    sys.exit(main())